@@ -0,0 +1,276 @@
+# Attachments for Interactive Feedback MCP
+# 大段粘贴内容（日志、代码）不直接插入回答框：超过阈值时保存为附件文件，回答框下方只显示一个附件标签，
+# 工具结果中以 MCP 资源链接返回，智能体可以读取全部内容，也可以只读取需要的行。
+# 附件按块写入和读取，占用的内存与附件大小无关。
+# 粘贴或拖入的图片（截图）在界面中先缩小到最大边长并重新编码，再保存为图片附件，以 MCP 图片内容返回。
+#
+# FEEDBACK_ATTACHMENT_THRESHOLD_KB  粘贴内容超过该大小（KiB）时保存为附件，默认 16，0 表示总是直接插入
+# FEEDBACK_ATTACHMENT_DIR           附件目录，默认为 ~/.cursor-usage-opt/attachments
+# FEEDBACK_ATTACHMENT_TTL_HOURS     附件保留时间（小时），默认 72，服务器启动时删除过期的附件
+# FEEDBACK_IMAGE_MAX_DIMENSION      图片缩小后的最大边长（像素），默认 1568
+# FEEDBACK_IMAGE_QUALITY            图片编码为 JPEG 时的质量（1-100），默认 80
+# FEEDBACK_RESOURCE_MAX_MB          智能体一次读取附件内容（全文或行范围）的大小上限（MiB），默认 10
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import secrets
+from typing import BinaryIO, Iterable, Optional
+
+ATTACHMENT_URI_PREFIX = "feedback://attachments/"
+
+# 读写附件的块大小
+CHUNK_SIZE = 64 * 1024
+
+# 附件预览（结果中附带的开头几行）的字符数
+PREVIEW_LENGTH = 200
+
+# 界面可以提交的图片格式，以及缩小编码后单张图片的大小上限
+IMAGE_MIME_TYPES = ('image/png', 'image/jpeg', 'image/webp')
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+# Web 页面提交的粘贴文本附件的大小上限
+MAX_TEXT_BYTES = 64 * 1024 * 1024
+
+_ID_PATTERN = re.compile(r'^[0-9a-f]{16}$')
+
+class AttachmentNotFound(Exception):
+    """附件不存在、已过期或编号无效"""
+
+class AttachmentTooLarge(Exception):
+    """附件超过大小上限：写入时已写入的部分已删除，读取时不返回内容"""
+
+def get_attachment_threshold() -> Optional[int]:
+    """读取 FEEDBACK_ATTACHMENT_THRESHOLD_KB 环境变量，返回字节数，0 表示不使用附件"""
+    try:
+        threshold = float(os.environ.get('FEEDBACK_ATTACHMENT_THRESHOLD_KB', '16'))
+    except ValueError:
+        threshold = 16.0
+    return int(threshold * 1024) if threshold > 0 else None
+
+def get_attachment_dir() -> str:
+    """读取 FEEDBACK_ATTACHMENT_DIR 环境变量"""
+    return os.environ.get('FEEDBACK_ATTACHMENT_DIR') or os.path.join(os.path.expanduser('~'), '.cursor-usage-opt', 'attachments')
+
+def get_attachment_ttl() -> float:
+    """读取 FEEDBACK_ATTACHMENT_TTL_HOURS 环境变量，返回秒数"""
+    try:
+        return max(0.0, float(os.environ.get('FEEDBACK_ATTACHMENT_TTL_HOURS', '72'))) * 3600
+    except ValueError:
+        return 72 * 3600.0
+
+def get_resource_max_bytes() -> int:
+    """读取 FEEDBACK_RESOURCE_MAX_MB 环境变量，返回字节数"""
+    try:
+        limit = float(os.environ.get('FEEDBACK_RESOURCE_MAX_MB', '10'))
+    except ValueError:
+        limit = 10.0
+    return int(limit * 1024 * 1024) if limit > 0 else 10 * 1024 * 1024
+
+def get_image_max_dimension() -> int:
+    """读取 FEEDBACK_IMAGE_MAX_DIMENSION 环境变量"""
+    try:
+        return max(64, int(os.environ.get('FEEDBACK_IMAGE_MAX_DIMENSION', '1568')))
+    except ValueError:
+        return 1568
+
+def get_image_quality() -> int:
+    """读取 FEEDBACK_IMAGE_QUALITY 环境变量"""
+    try:
+        return min(100, max(1, int(os.environ.get('FEEDBACK_IMAGE_QUALITY', '80'))))
+    except ValueError:
+        return 80
+
+def scaled_size(width: int, height: int, max_dimension: Optional[int] = None) -> tuple:
+    """按最大边长等比缩小后的尺寸（不放大）"""
+    max_dimension = max_dimension or get_image_max_dimension()
+    scale = min(1.0, max_dimension / max(width, height, 1))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+def is_large_paste(text: str) -> bool:
+    """粘贴内容是否应保存为附件（先按字符数判断，避免为短文本编码）"""
+    threshold = get_attachment_threshold()
+    if threshold is None or len(text) * 4 <= threshold:
+        return False
+    return len(text) > threshold or len(text.encode('utf-8')) > threshold
+
+def attachment_uri(attachment_id: str) -> str:
+    return ATTACHMENT_URI_PREFIX + attachment_id
+
+def _paths(attachment_id: str) -> tuple:
+    if not _ID_PATTERN.match(attachment_id or ''):
+        raise AttachmentNotFound(f"Invalid attachment id: {attachment_id!r}")
+    base = os.path.join(get_attachment_dir(), attachment_id)
+    return base + '.data', base + '.json'
+
+def save_attachment(chunks: Iterable[bytes], name: str, mime_type: str = 'text/plain',
+                    max_size: Optional[int] = None, **extra) -> dict:
+    """把内容逐块写入新附件，返回附件信息（编号、名称、大小、资源URI，文本附件还有行数和预览）
+
+    超过 max_size 时删除已写入的部分并抛出 AttachmentTooLarge。extra 中的字段（例如图片尺寸）一并保存。
+    """
+    directory = get_attachment_dir()
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    attachment_id = secrets.token_hex(8)
+    data_path, meta_path = _paths(attachment_id)
+    text = mime_type.startswith('text/')
+    size = lines = 0
+    head = b''
+    last = b''
+    try:
+        with open(data_path, 'wb') as f:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise AttachmentTooLarge(f"Attachment exceeds {describe_size(max_size)}")
+                f.write(chunk)
+                if text:
+                    lines += chunk.count(b'\n')
+                    if len(head) < PREVIEW_LENGTH * 4:
+                        head += chunk[:PREVIEW_LENGTH * 4]
+                    last = chunk
+    except BaseException:
+        delete_attachment(attachment_id)
+        raise
+    meta = {
+        'id': attachment_id,
+        'name': name,
+        'mime_type': mime_type,
+        'size': size,
+        'uri': attachment_uri(attachment_id),
+        **extra,
+    }
+    if text:
+        meta['lines'] = lines + (1 if last and not last.endswith(b'\n') else 0)  # 最后一行可能没有换行符
+        meta['preview'] = head.decode('utf-8', errors='ignore')[:PREVIEW_LENGTH]
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    return meta
+
+def register_attachment(path: str, name: str, mime_type: str, **extra) -> dict:
+    """把已经写好的文件（例如上传完成的文件）移入附件目录，附件信息中带有文件的本地路径"""
+    directory = get_attachment_dir()
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    attachment_id = secrets.token_hex(8)
+    data_path, meta_path = _paths(attachment_id)
+    shutil.move(path, data_path)
+    meta = {
+        'id': attachment_id,
+        'name': name,
+        'mime_type': mime_type,
+        'size': os.path.getsize(data_path),
+        'uri': attachment_uri(attachment_id),
+        'path': data_path,
+        **extra,
+    }
+    if mime_type.startswith('text/'):
+        with open(data_path, 'rb') as f:
+            meta['preview'] = f.read(PREVIEW_LENGTH * 4).decode('utf-8', errors='ignore')[:PREVIEW_LENGTH]
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    return meta
+
+def save_text_attachment(text: str, name: str = 'paste.txt') -> dict:
+    """把粘贴的文本保存为附件"""
+    encoded = (text[i:i + CHUNK_SIZE].encode('utf-8') for i in range(0, len(text), CHUNK_SIZE))
+    return save_attachment(encoded, name)
+
+def save_stream_attachment(stream: BinaryIO, name: str, mime_type: str = 'text/plain',
+                           max_size: Optional[int] = None, **extra) -> dict:
+    """把请求体等文件流保存为附件，不把全部内容读入内存"""
+    return save_attachment(iter(lambda: stream.read(CHUNK_SIZE), b''), name, mime_type, max_size, **extra)
+
+def save_image_attachment(data: bytes, name: str, mime_type: str, width: int, height: int) -> dict:
+    """保存界面中已经缩小并编码的图片"""
+    return save_attachment([data], name, mime_type, MAX_IMAGE_BYTES, width=width, height=height)
+
+def load_attachment_meta(attachment_id: str) -> dict:
+    _, meta_path = _paths(attachment_id)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        raise AttachmentNotFound(f"Attachment {attachment_id} not found") from e
+
+def read_attachment(attachment_id: str, start_line: Optional[int] = None, end_line: Optional[int] = None,
+                    max_chars: Optional[int] = None) -> str:
+    """读取附件文本；给出行号（从 1 开始，包含 end_line）时只读取这些行。
+    内容超过 max_chars 个字符时抛出 AttachmentTooLarge，逐块读取，很长的一行也不会整行读入内存"""
+    data_path, _ = _paths(attachment_id)
+    try:
+        with open(data_path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+            if start_line is None:
+                text = f.read(-1 if max_chars is None else max_chars + 1)
+                if max_chars is not None and len(text) > max_chars:
+                    raise AttachmentTooLarge(f"Attachment {attachment_id} exceeds {max_chars} characters")
+                return text
+            start = max(1, start_line)
+            parts = []
+            total = 0
+            line = 1
+            while end_line is None or line <= end_line:
+                piece = f.readline(CHUNK_SIZE)
+                if not piece:
+                    break
+                if line >= start:
+                    total += len(piece)
+                    if max_chars is not None and total > max_chars:
+                        raise AttachmentTooLarge(f"Lines {start_line}-{end_line} of attachment {attachment_id} "
+                                                 f"exceed {max_chars} characters")
+                    parts.append(piece)
+                if piece.endswith('\n'):  # 与保存时的行数一致，只按换行符分行
+                    line += 1
+            return "".join(parts)
+    except FileNotFoundError as e:
+        raise AttachmentNotFound(f"Attachment {attachment_id} not found") from e
+
+def read_attachment_bytes(attachment_id: str, max_bytes: Optional[int] = None) -> bytes:
+    """读取图片等二进制附件，超过 max_bytes 时抛出 AttachmentTooLarge"""
+    data_path, _ = _paths(attachment_id)
+    try:
+        with open(data_path, 'rb') as f:
+            data = f.read(-1 if max_bytes is None else max_bytes + 1)
+    except FileNotFoundError as e:
+        raise AttachmentNotFound(f"Attachment {attachment_id} not found") from e
+    if max_bytes is not None and len(data) > max_bytes:
+        raise AttachmentTooLarge(f"Attachment {attachment_id} exceeds {max_bytes} bytes")
+    return data
+
+def delete_attachment(attachment_id: str):
+    for path in _paths(attachment_id):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+def sweep_attachments() -> int:
+    """删除超过保留时间的附件，返回删除的数量"""
+    directory = get_attachment_dir()
+    cutoff = time.time() - get_attachment_ttl()
+    removed = 0
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return 0
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.unlink(path)
+                removed += name.endswith('.json')
+        except OSError:
+            continue
+    if removed:
+        print(f"🧹 删除了 {removed} 个过期附件", file=sys.stderr)
+    return removed
+
+def describe_size(size: int) -> str:
+    """附件标签中显示的大小"""
+    if size < 1024:
+        return f"{size} B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} KB"
+    return f"{size / 1024 / 1024:.1f} MB"
@@ -0,0 +1,307 @@
+# Rule-based auto-responder for Interactive Feedback MCP
+# 智能体经常提出固定格式的问题（例如"是否继续？"并附带"继续"选项），每次都打开界面既浪费时间
+# 也打断用户。用户可以在规则文件中把这类问题映射到固定回答，匹配的请求直接返回，不启动任何界面。
+#
+# FEEDBACK_RULES_FILE   规则文件（JSON）路径，未设置时不启用自动回复
+#
+# 规则文件是规则列表（或 {"rules": [...]}），每条规则的条件同时满足才算匹配，按文件顺序取第一条：
+#   {"name": "continue", "pattern": "是否继续|should I (continue|proceed)", "answer": "继续"}
+#   {"name": "tests", "keywords": ["run", "tests"], "answer": "yes"}
+#   {"name": "yes-no", "options": ["是", "否"], "answer": "{first_option}"}
+# pattern 为不区分大小写的正则表达式，keywords 要求全部出现（不区分大小写），options 要求预定义选项
+# 与之完全相同（不计顺序）。answer 可以使用 {message} 和 {first_option} 占位符。
+#
+# 规则在加载时编译成一个字面量索引：每条正则规则取出匹配时必然出现的字面量（例如 "是否继续"、
+# "should i "），关键词规则直接使用关键词，全部放入同一个 Aho-Corasick 自动机。匹配时只扫描一遍
+# 问题文本就能找出可能匹配的规则，再对这些候选规则逐条确认；大多数问题不含任何字面量，
+# 不用执行任何正则表达式。只有选项条件的规则按选项集合建立索引，无法取出字面量的规则每次都检查。
+import os
+import re
+import sys
+import json
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+try:
+    from re import _parser as sre_parse, _constants as sre_constants
+except ImportError:  # Python 3.10 及更早版本
+    import sre_parse
+    import sre_constants
+
+# 作为索引的字面量最短长度，更短的字面量几乎出现在每个问题中，起不到筛选作用
+MIN_LITERAL_LENGTH = 2
+
+_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT, getattr(sre_constants, 'POSSESSIVE_REPEAT', None)}
+
+def _required_literals(items) -> Optional[Set[str]]:
+    """返回正则匹配时必然出现的一组字面量（至少出现其中一个），无法确定时返回None"""
+    best = None
+
+    def consider(candidate):
+        nonlocal best
+        if candidate and min(map(len, candidate)) >= MIN_LITERAL_LENGTH:
+            # 最短的字面量越长，筛选效果越好
+            if best is None or min(map(len, candidate)) > min(map(len, best)):
+                best = candidate
+
+    run = []
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            run.append(chr(av))
+            continue
+        consider({"".join(run)} if run else None)
+        run = []
+        if op is sre_constants.SUBPATTERN:
+            consider(_required_literals(av[-1]))
+        elif op is sre_constants.BRANCH:
+            branches = [_required_literals(branch) for branch in av[1]]
+            if all(branches):
+                consider(set().union(*branches))
+        elif op in _REPEATS and av[0] >= 1:
+            consider(_required_literals(av[2]))
+        elif op is getattr(sre_constants, 'ATOMIC_GROUP', None):
+            consider(_required_literals(av))
+    consider({"".join(run)} if run else None)
+    return best
+
+class _LiteralIndex:
+    """Aho-Corasick 自动机：一次扫描找出文本中出现的全部字面量"""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        self.literals: List[str] = []
+        self._ids: Dict[str, int] = {}
+
+    def add(self, literal: str) -> int:
+        """加入字面量，返回它的编号（相同的字面量编号相同）"""
+        if literal in self._ids:
+            return self._ids[literal]
+        literal_id = self._ids[literal] = len(self.literals)
+        self.literals.append(literal)
+        node = 0
+        for char in literal:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = next_node
+        self._out[node].append(literal_id)
+        return literal_id
+
+    def build(self):
+        """计算失配转移，加入全部字面量后调用"""
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+                queue.append(child)
+
+    def scan(self, text: str) -> Set[int]:
+        found = set()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+class Rule:
+    __slots__ = ('index', 'name', 'pattern', 'keywords', 'options', 'answer', 'hits', '_compiled')
+
+    def __init__(self, index: int, name: str, pattern: Optional[str], keywords: List[str],
+                 options: Optional[frozenset], answer: str):
+        self.index = index
+        self.name = name
+        self.pattern = pattern
+        self.keywords = keywords
+        self.options = options
+        self.answer = answer
+        self.hits = 0
+        self._compiled = None
+
+    def matches(self, message: str, lowered: str, options: frozenset) -> bool:
+        if self.options is not None and self.options != options:
+            return False
+        if any(keyword not in lowered for keyword in self.keywords):
+            return False
+        if self.pattern is not None:
+            # 只有成为候选时才编译，加载上千条规则时不必全部编译
+            if self._compiled is None:
+                self._compiled = re.compile(self.pattern, re.IGNORECASE)
+            return self._compiled.search(message) is not None
+        return True
+
+def _is_string_list(value) -> bool:
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+def _option_key(options) -> frozenset:
+    return frozenset(str(option).strip().lower() for option in options)
+
+class RuleSet:
+    """编译后的规则集合"""
+
+    def __init__(self, specs: List[dict]):
+        self.rules: List[Rule] = []
+        self._literals = _LiteralIndex()
+        self._any_of: Dict[int, List[Rule]] = defaultdict(list)  # 字面量 -> 出现即成为候选的规则
+        self._all_of: Dict[int, List[Rule]] = defaultdict(list)  # 关键词 -> 需要全部关键词出现的规则
+        self._by_options: Dict[frozenset, List[Rule]] = defaultdict(list)  # 只有选项条件的规则
+        self._unindexed: List[Rule] = []  # 无法取出字面量、每次都要检查的规则
+        for position, spec in enumerate(specs):
+            self._add(position, spec)
+        self._literals.build()
+
+    def _add(self, position: int, spec: dict):
+        try:
+            if not isinstance(spec, dict) or not isinstance(spec.get('answer'), str):
+                raise ValueError("each rule needs a string 'answer'")
+            pattern = spec.get('pattern') or None
+            if pattern is not None and not isinstance(pattern, str):
+                raise ValueError("'pattern' must be a string")
+            # 字符串会被逐字拆开，几乎匹配所有问题，必须写成列表
+            for key in ('keywords', 'options'):
+                if spec.get(key) is not None and not _is_string_list(spec[key]):
+                    raise ValueError(f"'{key}' must be a list of strings")
+            keywords = sorted({keyword.lower() for keyword in spec.get('keywords') or [] if keyword})
+            options = _option_key(spec['options']) if spec.get('options') else None
+            if pattern is None and not keywords and options is None:
+                raise ValueError("a rule needs 'pattern', 'keywords' or 'options'")
+            literals = _required_literals(sre_parse.parse(pattern, re.IGNORECASE)) if pattern is not None else None
+        except (ValueError, TypeError, re.error) as e:
+            print(f"⚠️ 忽略自动回复规则 #{position + 1}: {e}", file=sys.stderr)
+            return
+
+        rule = Rule(len(self.rules), str(spec.get('name') or f"rule-{position + 1}"), pattern, keywords, options, spec['answer'])
+        self.rules.append(rule)
+        if keywords:
+            for keyword in keywords:
+                self._all_of[self._literals.add(keyword)].append(rule)
+        elif literals:
+            for literal in {literal.lower() for literal in literals}:
+                self._any_of[self._literals.add(literal)].append(rule)
+        elif pattern is None:
+            self._by_options[options].append(rule)
+        else:
+            self._unindexed.append(rule)
+
+    def match(self, message: str, predefined_options: Optional[List[str]] = None) -> Optional[Rule]:
+        """返回第一条匹配的规则（按文件顺序），没有匹配时返回None"""
+        lowered = message.lower()
+        options = _option_key(predefined_options) if predefined_options else frozenset()
+        candidates = set(self._unindexed)
+        candidates.update(self._by_options.get(options, ()))
+        found = self._literals.scan(lowered) if self._literals.literals else ()
+        keyword_counts = defaultdict(int)
+        for literal_id in found:
+            candidates.update(self._any_of.get(literal_id, ()))
+            for rule in self._all_of.get(literal_id, ()):
+                keyword_counts[rule] += 1
+                if keyword_counts[rule] == len(rule.keywords):
+                    candidates.add(rule)
+        for rule in sorted(candidates, key=lambda rule: rule.index):
+            if rule.matches(message, lowered, options):
+                return rule
+        return None
+
+    def hit_counts(self) -> Dict[str, int]:
+        return {rule.name: rule.hits for rule in self.rules if rule.hits}
+
+def render_answer(rule: Rule, message: str, predefined_options: Optional[List[str]]) -> str:
+    first_option = predefined_options[0] if predefined_options else ""
+    try:
+        return rule.answer.format(message=message, first_option=first_option)
+    except (KeyError, IndexError, ValueError):
+        return rule.answer
+
+class AutoResponder:
+    """按 FEEDBACK_RULES_FILE 自动回答请求；规则文件修改后下一次调用时重新编译"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._path = None
+        self._mtime = None
+        self._rules: Optional[RuleSet] = None
+
+    def load(self) -> Optional[RuleSet]:
+        """加载并编译规则文件（文件未修改时直接返回已编译的规则）"""
+        path = os.environ.get('FEEDBACK_RULES_FILE')
+        if not path:
+            return None
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        with self._lock:
+            if path != self._path or mtime != self._mtime:
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        specs = json.load(f)
+                    if isinstance(specs, dict):
+                        specs = specs.get('rules', [])
+                    rules = RuleSet(specs if isinstance(specs, list) else [])
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ 读取自动回复规则失败: {e}", file=sys.stderr)
+                    rules = None
+                # 重新加载后保留同名规则的命中次数
+                if rules is not None and self._rules is not None:
+                    counts = {rule.name: rule.hits for rule in self._rules.rules}
+                    for rule in rules.rules:
+                        rule.hits = counts.get(rule.name, 0)
+                self._path, self._mtime, self._rules = path, mtime, rules
+            return self._rules
+
+    def _hit(self, rule: Rule):
+        with self._lock:
+            rule.hits += 1
+            hits = rule.hits
+        print(f"🤖 自动回复规则 \"{rule.name}\" 命中（累计 {hits} 次）", file=sys.stderr)
+
+    def respond(self, request: dict) -> Optional[dict]:
+        """请求匹配规则时返回自动回答（格式与界面返回的结果相同），否则返回None"""
+        rules = self.load()
+        if rules is None:
+            return None
+        if request.get('questions'):
+            # 批量提问只有每个问题都匹配时才跳过界面
+            matched = []
+            for question in request['questions']:
+                rule = rules.match(question['question'], question['predefined_options'])
+                if rule is None:
+                    return None
+                matched.append(rule)
+            answers = []
+            for question, rule in zip(request['questions'], matched):
+                self._hit(rule)
+                answer = render_answer(rule, question['question'], question['predefined_options'])
+                selected = [answer] if answer in question['predefined_options'] else []
+                answers.append({'question': question['question'], 'selected_options': selected,
+                                'feedback': "" if selected else answer})
+            result = {'answers': answers}
+            names = ", ".join(dict.fromkeys(rule.name for rule in matched))
+        else:
+            rule = rules.match(request['summary'], request['predefined_options'])
+            if rule is None:
+                return None
+            self._hit(rule)
+            result = {'cursor_usage_opt': render_answer(rule, request['summary'], request['predefined_options'])}
+            names = rule.name
+        result['auto_resolved'] = True
+        result['auto_resolved_reason'] = f"Answered by the user's auto-response rule(s): {names}"
+        return result
+
+    def hit_counts(self) -> Dict[str, int]:
+        """当前规则的命中次数"""
+        return self._rules.hit_counts() if self._rules is not None else {}
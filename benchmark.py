@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Cursor Usage Opt MCP 性能基准工具
+无需图形界面即可运行，用于对比优化前后的耗时
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import tempfile
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SAMPLE_PROMPT = """
+# 🍎 冷启动基准测试
+
+这是一段用于测量 **窗口可见时间** 的示例内容。
+
+```python
+def hello(name: str) -> str:
+    return f"Hello, {name}!"
+```
+
+- 列表项一
+- 列表项二
+"""
+
+def run_gui_once(env: dict, prompt: str, options: str) -> dict:
+    """启动一次GUI子进程，返回其输出的启动耗时"""
+    args = [
+        sys.executable, "-u", os.path.join(SCRIPT_DIR, "feedback_ui.py"),
+        "--prompt", prompt,
+        "--predefined-options", options,
+        "--benchmark",
+    ]
+    result = subprocess.run(args, env=env, capture_output=True, text=True, timeout=60)
+    for line in reversed(result.stdout.splitlines()):
+        line = line.strip()
+        if line.startswith('{'):
+            return json.loads(line)
+    raise RuntimeError(f"GUI子进程没有输出耗时数据: {result.stderr.strip()[-500:]}")
+
+def bench_gui_startup(runs: int):
+    """对比禁用/启用启动缓存时的窗口可见时间
+
+    两种模式都运行当前代码，只对比启动缓存的作用；合并样式表、推迟输入法重置等改动在两种模式下都生效。
+    优化前的启动路径强制使用 xcb/wayland 平台，也没有 --benchmark 计时，无法在 offscreen 下与之对比。
+    """
+    options = "|||".join(["继续", "修改方案", "停止"])
+    with tempfile.TemporaryDirectory() as cache_home:
+        base_env = dict(os.environ, QT_QPA_PLATFORM="offscreen", XDG_CACHE_HOME=cache_home)
+
+        variants = [
+            ("无启动缓存", dict(base_env, FEEDBACK_QT_STARTUP_CACHE="0")),
+            ("启动缓存", dict(base_env, FEEDBACK_QT_STARTUP_CACHE="1")),
+        ]
+        # 预热一次，生成启动缓存并让系统缓存Qt库文件
+        run_gui_once(variants[1][1], SAMPLE_PROMPT, options)
+
+        print(f"🚀 GUI冷启动基准（{runs} 次，offscreen，当前代码下对比启动缓存，不是与优化前的代码对比）")
+        print(f"{'模式':<12}{'窗口可见(ms)':>16}{'内容渲染(ms)':>16}")
+        for name, env in variants:
+            samples = [run_gui_once(env, SAMPLE_PROMPT, options) for _ in range(runs)]
+            visible = statistics.median(s['window_visible_ms'] for s in samples)
+            rendered = statistics.median(s.get('content_rendered_ms', s['window_visible_ms']) for s in samples)
+            print(f"{name:<12}{visible:>16.1f}{rendered:>16.1f}")
+
+def generate_large_prompt(size_kb: int) -> str:
+    """生成指定大小的Markdown文档，混合标题、段落和代码块"""
+    parts = []
+    total = 0
+    index = 0
+    while total < size_kb * 1024:
+        part = (
+            f"## 第 {index} 节\n\n这是一段 **示例** 文本，包含 `行内代码` 和序号 {index}。\n\n"
+            f"```python\ndef handler_{index}(value):\n    return value * {index}\n```\n"
+        )
+        parts.append(part)
+        total += len(part.encode('utf-8'))
+        index += 1
+    return "\n".join(parts)
+
+def bench_render(size_kb: int):
+    """对比整篇渲染与流式渲染首个分片的耗时"""
+    sys.path.insert(0, SCRIPT_DIR)
+    from renderer import BlockRenderer, TIER_FULL, classify_markdown, create_markdown
+
+    # 常见的简短问题：分级渲染与完整扩展链的对比
+    short_questions = ["请确认是否继续执行下一步？", "已修改 server.py，是否运行 `pytest`？"]
+    full_md = create_markdown(TIER_FULL)
+    tiered = BlockRenderer()
+    print("💬 简短问题渲染（每次平均）")
+    for question in short_questions:
+        start = time.perf_counter()
+        for _ in range(1000):
+            full_md.reset()
+            full_md.convert(question)
+        full_us = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        for _ in range(1000):
+            tiered.render(question)
+        tiered_us = (time.perf_counter() - start) * 1000
+        print(f"{classify_markdown(question):<8}完整 {full_us:>8.1f} µs  分级 {tiered_us:>8.1f} µs")
+
+    prompt = generate_large_prompt(size_kb)
+    print(f"🧱 Markdown渲染基准（{len(prompt.encode('utf-8')) / 1024:.0f} KB）")
+
+    start = time.perf_counter()
+    BlockRenderer().render(prompt)
+    print(f"{'整篇渲染':<12}{(time.perf_counter() - start) * 1000:>12.1f} ms")
+
+    start = time.perf_counter()
+    chunks = BlockRenderer().iter_chunks(prompt)
+    next(chunks)
+    first_ms = (time.perf_counter() - start) * 1000
+    count = 1 + sum(1 for _ in chunks)
+    total_ms = (time.perf_counter() - start) * 1000
+    print(f"{'流式首个分片':<12}{first_ms:>12.1f} ms")
+    print(f"{'流式全部分片':<12}{total_ms:>12.1f} ms（{count} 个分片）")
+
+    # 进程池按块并行渲染（第一次包含启动渲染进程的时间）
+    for label in ("进程池（冷）", "进程池（热）"):
+        renderer = BlockRenderer(use_pool=True)
+        start = time.perf_counter()
+        renderer.render_blocks(prompt)
+        slowest = max((timing['ms'] for timing in renderer.last_timings), default=0.0)
+        print(f"{label:<12}{(time.perf_counter() - start) * 1000:>12.1f} ms（最慢的块 {slowest:.1f} ms）")
+
+# 按块渲染容易出错的结构：空行分隔的引用、松散列表、嵌套列表、列表项中的缩进内容
+BLOCK_CASES = [
+    "> q\n\n> q2\n\ntext",
+    "> a\n> b\n\n> c\nlazy\n\npara",
+    "# H\n> q\n\n> q2",
+    "> * a\n\n> * b",
+    "> ```\n> code\n> ```\n\n> after",
+    "Term\n\n* a\n\n  * nested\n\n* b",
+    "* a\n\n  continuation para\n\n* b\n\nafter",
+    "1. one\n\n2. two\n\n   more\n\n3. three",
+    "* a\n\n    code in item\n\n* b",
+    "text\n\n  * indented item\n\n* item",
+    "* a\n* b\n\n- c\n\n1. d",
+    "```\n> x\n\n> y\n```\n\n> z",
+    "para\n\n> quote\n\n    indented\n\n> again",
+    "<!--\n\ncomment\n\n-->\n\nafter",
+    "before\n\n<div>\n\n<div>\n\ninner\n\n</div>\n\nouter\n\n</div>\n\nafter",
+    "<img src=\"a.png\">\n\ntext\n\n<br>\n\nmore",
+    "# a\n\ntext\n\n# a\n\n## a_1\n\n# a",
+    "## 问题\n\n说明\n\n## 方案\n\n# [链接](u)\n\n## 问题",
+    "[TOC]\n\n# one\n\ntext\n\n# two",
+]
+
+def check_blocks() -> int:
+    """检查按块渲染拼接的结果与整篇渲染一致（忽略标签之间的空白），返回不一致的数量"""
+    import re
+    sys.path.insert(0, SCRIPT_DIR)
+    from renderer import BlockRenderer
+
+    def normalize(html_content: str) -> str:
+        return re.sub(r'>\s+<', '><', html_content.strip())
+
+    renderer = BlockRenderer(use_pool=False)
+    failures = 0
+    for case in BLOCK_CASES + [generate_large_prompt(64)]:
+        whole = normalize(renderer.render(case))
+        blocks = normalize("\n".join(html_content for _, html_content in renderer.iter_blocks(case)))
+        if whole != blocks:
+            failures += 1
+            print(f"❌ {case[:60]!r}\n  整篇: {whole[:200]}\n  按块: {blocks[:200]}")
+    print(f"🧱 按块渲染一致性：{len(BLOCK_CASES) + 1 - failures} / {len(BLOCK_CASES) + 1} 通过")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="运行性能基准测试")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    gui_parser = subparsers.add_parser("gui-startup", help="GUI窗口冷启动耗时（当前代码下禁用/启用启动缓存的对比）")
+    gui_parser.add_argument("--runs", type=int, default=5, help="每种模式的运行次数")
+
+    render_parser = subparsers.add_parser("render", help="超长Markdown的渲染耗时")
+    render_parser.add_argument("--size-kb", type=int, default=2048, help="生成文档的大小（KB）")
+
+    subparsers.add_parser("blocks", help="检查按块渲染与整篇渲染的结果一致")
+
+    args = parser.parse_args()
+    if args.command == "gui-startup":
+        bench_gui_startup(args.runs)
+    elif args.command == "render":
+        bench_render(args.size_kb)
+    elif args.command == "blocks":
+        sys.exit(1 if check_blocks() else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+# Local feedback broker for Interactive Feedback MCP
+# 每个智能体（每个 Cursor / Cline / Windsurf 窗口）仍然通过 stdio 启动自己的 server.py，
+# 启用代理后各个服务器把反馈请求转发给本机唯一的代理进程：代理统一排队、持有唯一的
+# 常驻 Web 会话，并把回答送回对应的服务器。单个服务器退出只会撤下它自己的问题，
+# 代理继续为其他服务器工作。
+# 只有 Web 会话是常驻共享的：GUI 模式下代理仍为每个请求启动一个 feedback_ui.py 窗口进程，
+# 代理只保证这些窗口依次出现（不会同时弹出多个），不省去每次启动 Qt 的开销。
+#
+# FEEDBACK_BROKER               设为 1 时服务器把请求转发给代理，代理未运行时自动启动
+# FEEDBACK_BROKER_SOCKET        代理监听的 Unix 套接字路径，默认为运行目录（只属于当前用户）下的 broker.sock
+# FEEDBACK_BROKER_IDLE_TIMEOUT  没有请求时代理自动退出的时间（秒），默认 1800，0 表示一直运行
+#
+# 协议：每个连接处理一个请求，双方各发送以换行结尾的 JSON。服务器发送请求后，代理在界面进入
+# 新阶段时发送 {"type": "status"}，最后发送 {"type": "result"} 或 {"type": "error"}。
+# 服务器关闭连接即表示取消请求。
+# 套接字所在目录必须属于当前用户且其他用户不能写入，连接前还确认套接字（以及 Linux 上对端进程）
+# 属于当前用户，其他用户无法冒充代理接收问题或伪造回答。
+import os
+import sys
+import json
+import time
+import signal
+import stat
+import socket
+import struct
+import select
+import argparse
+import threading
+import subprocess
+import socketserver
+from typing import Optional
+
+from lifecycle import get_runtime_dir
+from scheduler import Cancellation, FeedbackCancelled, RequestStatus, interprocess_lock
+
+# 代理检查请求进度和连接状态的间隔（秒）
+STATUS_POLL_INTERVAL = 0.2
+
+# 自动启动代理后等待套接字可用的时间（秒）
+STARTUP_TIMEOUT = 10.0
+
+class BrokerUnavailable(Exception):
+    """无法连接或启动代理，调用方改为在本进程内显示界面"""
+
+def broker_enabled() -> bool:
+    """检查 FEEDBACK_BROKER 环境变量（需要 Unix 套接字支持）"""
+    return hasattr(socket, 'AF_UNIX') and os.environ.get('FEEDBACK_BROKER', '').lower() in ('1', 'true', 'yes', 'on')
+
+def get_broker_socket() -> str:
+    """读取 FEEDBACK_BROKER_SOCKET 环境变量"""
+    return os.environ.get('FEEDBACK_BROKER_SOCKET') or os.path.join(get_runtime_dir(), 'broker.sock')
+
+def get_idle_timeout() -> Optional[float]:
+    """读取 FEEDBACK_BROKER_IDLE_TIMEOUT 环境变量，0 表示一直运行"""
+    try:
+        timeout = float(os.environ.get('FEEDBACK_BROKER_IDLE_TIMEOUT', '1800'))
+    except ValueError:
+        timeout = 1800.0
+    return timeout if timeout > 0 else None
+
+def _send(sock: socket.socket, message: dict):
+    sock.sendall((json.dumps(message, ensure_ascii=False) + "\n").encode('utf-8'))
+
+def _check_socket_dir(path: str):
+    """套接字所在目录必须属于当前用户且其他用户不能写入，否则别人可以替换套接字"""
+    directory = os.path.dirname(os.path.abspath(path))
+    info = os.stat(directory)
+    if info.st_uid != os.getuid() or info.st_mode & 0o022:
+        raise PermissionError(f"Broker socket directory {directory} must be owned by the current user "
+                              f"and not writable by others")
+
+def _connect(path: str) -> socket.socket:
+    """连接代理；套接字或对端进程不属于当前用户时抛出 PermissionError，套接字不存在时抛出其他 OSError"""
+    _check_socket_dir(path)
+    info = os.lstat(path)
+    if not stat.S_ISSOCK(info.st_mode) or info.st_uid != os.getuid():
+        raise PermissionError(f"{path} is not a socket owned by the current user")
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        if hasattr(socket, 'SO_PEERCRED'):
+            _, uid, _ = struct.unpack('3i', sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i')))
+            if uid != os.getuid():
+                raise PermissionError(f"Broker on {path} runs as another user")
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+def _shutdown(sock: socket.socket):
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass  # 连接已经关闭
+
+def start_broker(path: str):
+    """在后台启动代理进程；代理不与任何MCP服务器绑定，服务器退出后继续运行"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "broker.py")
+    subprocess.Popen(
+        [sys.executable, "-u", script, "--socket", path],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        close_fds=True,
+        start_new_session=True,
+    )
+
+def connect_broker() -> socket.socket:
+    """连接代理，代理未运行时启动它并等待套接字可用"""
+    path = get_broker_socket()
+    try:
+        return _connect(path)
+    except PermissionError:
+        raise
+    except OSError:
+        pass
+    start_broker(path)
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(0.1)
+        try:
+            return _connect(path)
+        except PermissionError:
+            raise
+        except OSError:
+            continue
+    raise BrokerUnavailable(f"Feedback broker did not start listening on {path}")
+
+def ask_broker(request: dict, priority: int = 0, workspace: str = '',
+               cancellation: Optional[Cancellation] = None, status: Optional[RequestStatus] = None) -> dict:
+    """把反馈请求转发给代理并阻塞等待回答；请求被取消时关闭连接，代理随之撤下问题"""
+    try:
+        sock = connect_broker()
+    except OSError as e:
+        raise BrokerUnavailable(f"Cannot connect to the feedback broker: {e}") from e
+
+    # 关闭连接会让下面阻塞的读取立即返回
+    remove_callback = cancellation.add_callback(lambda: _shutdown(sock)) if cancellation is not None else None
+    try:
+        with sock, sock.makefile('r', encoding='utf-8') as reader:
+            try:
+                _send(sock, {'type': 'ask', 'request': request, 'priority': priority, 'workspace': workspace,
+                             'client_pid': os.getpid()})
+                for line in reader:
+                    message = json.loads(line)
+                    if message['type'] == 'status':
+                        if status is not None and message.get('state') in RequestStatus.STATES:
+                            status.set(message['state'])
+                    elif message['type'] == 'result':
+                        return message['result']
+                    else:
+                        raise Exception(f"Feedback broker failed: {message.get('message')}")
+            except OSError:
+                pass
+        if cancellation is not None and cancellation.cancelled:
+            raise FeedbackCancelled("Feedback request was cancelled by the client")
+        raise Exception("Feedback broker closed the connection before the user answered")
+    finally:
+        if remove_callback is not None:
+            remove_callback()
+
+class _BrokerHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        broker = self.server.broker
+        try:
+            message = json.loads(self.rfile.readline() or b'null')
+            request = message['request']
+        except (ValueError, KeyError, TypeError):
+            return
+        broker.request_started()
+        try:
+            self._serve(broker, request, int(message.get('priority') or 0), str(message.get('workspace') or ''))
+        finally:
+            broker.request_finished()
+
+    def _serve(self, broker: 'FeedbackBroker', request: dict, priority: int, workspace: str):
+        cancellation = Cancellation()
+        status = RequestStatus()
+        outcome = {}
+        done = threading.Event()
+
+        def work():
+            try:
+                outcome['result'] = broker.answer(request, priority, workspace, cancellation, status)
+            except FeedbackCancelled:
+                pass
+            except Exception as e:
+                outcome['error'] = str(e)
+            finally:
+                done.set()
+
+        threading.Thread(target=work, name="broker-request", daemon=True).start()
+        reported = None
+        while not done.wait(STATUS_POLL_INTERVAL):
+            # 服务器不会再发送数据，连接可读即表示对方已关闭（服务器退出或请求被取消）
+            readable, _, _ = select.select([self.connection], [], [], 0)
+            if readable and not self.connection.recv(1):
+                cancellation.cancel()
+                done.wait()
+                return
+            state = status.current()
+            if state != reported:
+                reported = state
+                try:
+                    _send(self.connection, {'type': 'status', 'state': state})
+                except OSError:
+                    cancellation.cancel()
+        try:
+            if 'result' in outcome:
+                _send(self.connection, {'type': 'result', 'result': outcome['result']})
+            elif 'error' in outcome:
+                _send(self.connection, {'type': 'error', 'message': outcome['error']})
+        except OSError:
+            pass  # 服务器在用户回答的同时退出了
+
+if hasattr(socket, 'AF_UNIX'):
+    class _BrokerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+class FeedbackBroker:
+    """本机唯一的代理：接收各个MCP服务器转发的请求，使用本进程的排队队列和界面回答"""
+
+    def __init__(self, path: str, idle_timeout: Optional[float] = None):
+        self.path = path
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._active = 0
+        self._last_active = time.monotonic()
+        self._server = None
+
+    def answer(self, request: dict, priority: int, workspace: str,
+               cancellation: Cancellation, status: RequestStatus) -> dict:
+        # 界面、排队队列和常驻Web会话都复用 server.py 的实现，代理进程相当于所有服务器共用的那一个；
+        # GUI 模式下 answer_request 每次启动新的窗口进程，代理不保留常驻的 Qt 窗口
+        import server
+        return server.feedback_scheduler.run(
+            lambda: server.answer_request(request, cancellation, status), priority, workspace, cancellation)
+
+    def request_started(self):
+        with self._lock:
+            self._active += 1
+
+    def request_finished(self):
+        with self._lock:
+            self._active -= 1
+            self._last_active = time.monotonic()
+
+    def _idle_watch(self):
+        while True:
+            time.sleep(min(self.idle_timeout, 30.0))
+            with self._lock:
+                idle = self._active == 0 and time.monotonic() - self._last_active >= self.idle_timeout
+            if idle:
+                self._server.shutdown()
+                return
+
+    def serve_forever(self):
+        # 同一时间只运行一个代理：多个服务器同时自动启动代理时，只有第一个开始监听，其余直接退出；
+        # 套接字文件可能是上一个代理异常退出后留下的
+        _check_socket_dir(self.path)
+        with interprocess_lock("broker"):
+            try:
+                _connect(self.path).close()
+                return
+            except PermissionError:
+                raise
+            except OSError:
+                pass
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+            self._server = _BrokerServer(self.path, _BrokerHandler)
+            self._server.broker = self
+            os.chmod(self.path, 0o600)
+        if self.idle_timeout is not None:
+            threading.Thread(target=self._idle_watch, name="broker-idle", daemon=True).start()
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="运行本机反馈代理，为所有MCP服务器共用一个界面")
+    parser.add_argument("--socket", default=get_broker_socket(), help="监听的 Unix 套接字路径")
+    args = parser.parse_args()
+
+    # 代理持有常驻Web会话，整个机器只需要打开一个页面
+    os.environ.setdefault('FEEDBACK_WEB_PERSISTENT', '1')
+    # 代理本身就是转发目标，不能再转发给自己
+    os.environ.pop('FEEDBACK_BROKER', None)
+
+    from lifecycle import sweep_stale_sessions
+    sweep_stale_sessions()
+    import server  # 预先加载界面和渲染相关的模块，第一个请求不用再等待导入
+    # 被结束时正常退出，删除套接字文件
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    FeedbackBroker(args.socket, get_idle_timeout()).serve_forever()
@@ -5,21 +5,391 @@
 import os
 import sys
 import json
+import time
 import argparse
-from typing import Optional, TypedDict, List
+from collections import deque
+from typing import NotRequired, Optional, TypedDict, List
+
+# 进程启动时间，用于计算窗口可见和内容渲染完成的耗时
+_PROCESS_STARTED_AT = time.perf_counter()
 
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QLineEdit, QPushButton, QCheckBox, QTextEdit, QGroupBox,
-    QFrame, QTextBrowser
+    QFrame, QTextBrowser, QListView, QAbstractItemView, QScrollArea, QDialog, QListWidget, QListWidgetItem, QCompleter
 )
-from PySide6.QtCore import Qt, Signal, QObject, QTimer, QSettings
-from PySide6.QtGui import QTextCursor, QIcon, QKeyEvent, QPalette, QColor, QFont, QClipboard
-import markdown
-from markdown.extensions import codehilite, fenced_code, tables, toc
+from PySide6.QtCore import Qt, Signal, QObject, QTimer, QSettings, QEvent, QRunnable, QThreadPool, QLibraryInfo, QByteArray, QModelIndex, QStringListModel, QBuffer, QIODevice, QSize, qVersion
+from PySide6.QtGui import QTextCursor, QIcon, QKeyEvent, QPalette, QColor, QFont, QFontInfo, QClipboard, QTextDocument, QStandardItemModel, QStandardItem, QImage, QPixmap
+from attachments import (AttachmentTooLarge, delete_attachment, describe_size, get_image_quality, is_large_paste,
+                         save_image_attachment, save_text_attachment, scaled_size)
+from profiling import ProfileSession, get_profile_kinds, profile_enabled, summarize_durations, write_report
+from renderer import get_renderer, should_stream
+from suggestions import MAX_SUGGESTION_LENGTH, loaded_suggestion_index, preload_suggestion_index
+
+# 首次绘制时显示的纯文本预览长度，完整渲染在后台线程中进行
+PREVIEW_CHARS = 2000
+
+# 描述区域Markdown内容的样式，流式渲染时作为文档默认样式表
+MARKDOWN_STYLESHEET = """
+body {
+    font-family: "Microsoft YaHei", "PingFang SC", "SF Pro Display", "SF Pro Text", "Helvetica Neue", Arial, sans-serif;
+    color: #f5f5f7;
+    line-height: 1.6;
+    letter-spacing: -0.022em;
+    font-size: 22px;
+    margin: 0;
+    padding: 0;
+}
+h1, h2, h3, h4, h5, h6 {
+    color: #ffffff;
+    font-weight: 600;
+    margin: 1em 0 0.5em 0;
+}
+p {
+    margin: 0.8em 0;
+    line-height: 1.6;
+}
+code {
+    background-color: #2c2c2e;
+    color: #ff6b6b;
+    padding: 2px 6px;
+    border-radius: 4px;
+    font-family: "SF Mono", "Monaco", "Consolas", "Liberation Mono", "Courier New", monospace;
+    font-size: 20px;
+    font-weight: 500;
+}
+pre {
+    background-color: #1c1c1e;
+    border: 1px solid #3a3a3c;
+    border-radius: 8px;
+    padding: 16px;
+    margin: 1em 0;
+    overflow-x: auto;
+    font-family: "SF Mono", "Monaco", "Consolas", "Liberation Mono", "Courier New", monospace;
+    font-size: 18px;
+    line-height: 1.4;
+}
+pre code {
+    background-color: transparent;
+    color: inherit;
+    padding: 0;
+    border-radius: 0;
+    font-size: inherit;
+}
+ul, ol {
+    margin: 0.8em 0;
+    padding-left: 2em;
+}
+li {
+    margin: 0.4em 0;
+    line-height: 1.5;
+}
+blockquote {
+    border-left: 3px solid #0a84ff;
+    margin: 1em 0;
+    padding-left: 1em;
+    color: #d1d1d6;
+    font-style: italic;
+}
+strong {
+    color: #ffffff;
+    font-weight: 600;
+}
+em {
+    color: #d1d1d6;
+    font-style: italic;
+}
+"""
+
+# 选项数量超过该值时使用虚拟化列表和筛选框，而不是逐个创建QCheckBox
+VIRTUAL_OPTIONS_THRESHOLD = 50
+
+# 界面字体候选列表，优先中文字体
+UI_FONT_FAMILIES = ["Microsoft YaHei", "PingFang SC", "SF Pro Display", "SF Pro Text", "Helvetica Neue", "Arial", "sans-serif"]
+
+# 启动缓存版本，结构变化时递增使旧缓存失效
+STARTUP_CACHE_VERSION = 1
+
+# Apple风格的全局样式表，启动时只设置一次，避免每个控件单独解析样式
+APP_STYLESHEET = """
+    QMainWindow {
+        background-color: #1c1c1e;
+    }
+    QGroupBox {
+        font-family: "Microsoft YaHei", "PingFang SC", "SF Pro Display", "SF Pro Text", "Helvetica Neue", Arial, sans-serif;
+        font-size: 22px;
+        font-weight: 600;
+        color: #ffffff;
+        border: 1px solid #3a3a3c;
+        border-radius: 12px;
+        margin-top: 8px;
+        padding-top: 8px;
+        background-color: rgba(44, 44, 46, 0.6);
+    }
+    QGroupBox::title {
+        subcontrol-origin: margin;
+        left: 12px;
+        padding: 0 8px 0 8px;
+        color: #ffffff;
+        background-color: transparent;
+    }
+    QTextEdit#feedbackText {
+        background-color: #2c2c2e;
+        border: 1px solid #3a3a3c;
+        border-radius: 8px;
+        padding: 12px;
+        font-family: "Microsoft YaHei", "PingFang SC", "SF Pro Text", "Helvetica Neue", Arial, sans-serif;
+        font-size: 22px;
+        line-height: 1.5;
+        color: #ffffff;
+        selection-background-color: #0a84ff;
+    }
+    QTextEdit#feedbackText:focus {
+        border: 2px solid #0a84ff;
+        background-color: #2c2c2e;
+    }
+    QTextBrowser#descriptionBrowser {
+        background-color: #2c2c2e;
+        border: 1px solid #3a3a3c;
+        border-radius: 8px;
+        padding: 12px;
+        font-family: "Microsoft YaHei", "PingFang SC", "SF Pro Text", "Helvetica Neue", Arial, sans-serif;
+        font-size: 16px;
+        line-height: 1.4;
+        color: #ffffff;
+        selection-background-color: #0a84ff;
+    }
+    QScrollBar:vertical {
+        background-color: transparent;
+        width: 8px;
+        border-radius: 4px;
+    }
+    QScrollBar::handle:vertical {
+        background-color: rgba(255, 255, 255, 0.3);
+        border-radius: 4px;
+        min-height: 20px;
+    }
+    QScrollBar::handle:vertical:hover {
+        background-color: rgba(255, 255, 255, 0.5);
+    }
+    QCheckBox {
+        font-family: "Microsoft YaHei", "PingFang SC", "SF Pro Text", "Helvetica Neue", Arial, sans-serif;
+        font-size: 22px;
+        color: #ffffff;
+        spacing: 8px;
+        padding: 4px;
+    }
+    QCheckBox::indicator {
+        width: 18px;
+        height: 18px;
+        border-radius: 4px;
+        border: 2px solid #3a3a3c;
+        background-color: transparent;
+    }
+    QCheckBox::indicator:hover {
+        border-color: #0a84ff;
+    }
+    QCheckBox::indicator:checked {
+        background-color: #0a84ff;
+        border-color: #0a84ff;
+        image: url(data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iMTIiIGhlaWdodD0iOSIgdmlld0JveD0iMCAwIDEyIDkiIGZpbGw9Im5vbmUiIHhtbG5zPSJodHRwOi8vd3d3LnczLm9yZy8yMDAwL3N2ZyI+CjxwYXRoIGQ9Ik0xMC42IDEuNEw0LjMgNy43TDEuNCA0LjgiIHN0cm9rZT0id2hpdGUiIHN0cm9rZS13aWR0aD0iMiIgc3Ryb2tlLWxpbmVjYXA9InJvdW5kIiBzdHJva2UtbGluZWpvaW49InJvdW5kIi8+Cjwvc3ZnPgo=);
+    }
+    QCheckBox::indicator:checked:hover {
+        background-color: #0071e3;
+        border-color: #0071e3;
+    }
+    QLineEdit#optionFilter {
+        background-color: #2c2c2e;
+        border: 1px solid #3a3a3c;
+        border-radius: 8px;
+        padding: 8px 12px;
+        font-size: 20px;
+        color: #ffffff;
+        selection-background-color: #0a84ff;
+    }
+    QLineEdit#optionFilter:focus {
+        border: 1px solid #0a84ff;
+    }
+    QListView#optionList {
+        background-color: transparent;
+        border: 1px solid #3a3a3c;
+        border-radius: 8px;
+        font-size: 22px;
+        color: #ffffff;
+        outline: none;
+    }
+    QListView#optionList::item {
+        padding: 4px;
+    }
+    QListView#optionList::item:hover {
+        background-color: rgba(255, 255, 255, 0.06);
+    }
+    QListView#optionList::indicator {
+        border-radius: 4px;
+        border: 2px solid #3a3a3c;
+        background-color: transparent;
+    }
+    QListView#optionList::indicator:checked {
+        background-color: #0a84ff;
+        border-color: #0a84ff;
+        image: url(data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iMTIiIGhlaWdodD0iOSIgdmlld0JveD0iMCAwIDEyIDkiIGZpbGw9Im5vbmUiIHhtbG5zPSJodHRwOi8vd3d3LnczLm9yZy8yMDAwL3N2ZyI+CjxwYXRoIGQ9Ik0xMC42IDEuNEw0LjMgNy43TDEuNCA0LjgiIHN0cm9rZT0id2hpdGUiIHN0cm9rZS13aWR0aD0iMiIgc3Ryb2tlLWxpbmVjYXA9InJvdW5kIiBzdHJva2UtbGluZWpvaW49InJvdW5kIi8+Cjwvc3ZnPgo=);
+    }
+    QFrame#separator {
+        color: #3a3a3c;
+        background-color: #3a3a3c;
+        border: none;
+        height: 1px;
+        margin: 8px 0;
+    }
+    QPushButton {
+        background-color: #0a84ff;
+        color: #ffffff;
+        border: none;
+        border-radius: 8px;
+        padding: 10px 20px;
+        font-family: "Microsoft YaHei", "PingFang SC", "SF Pro Text", "Helvetica Neue", Arial, sans-serif;
+        font-size: 20px;
+        font-weight: 600;
+        min-height: 20px;
+    }
+    QPushButton:hover {
+        background-color: #0071e3;
+    }
+    QPushButton:pressed {
+        background-color: #0056b3;
+    }
+    QPushButton:disabled {
+        background-color: #3a3a3c;
+        color: #8e8e93;
+    }
+    QPushButton[secondary="true"] {
+        background-color: #48484a;
+        font-weight: 500;
+    }
+    QPushButton[secondary="true"]:hover {
+        background-color: #5a5a5c;
+    }
+    QPushButton[secondary="true"]:pressed {
+        background-color: #3a3a3c;
+    }
+    QPushButton#attachmentChip {
+        background-color: #2c2c2e;
+        color: #f5f5f7;
+        border: 1px solid #48484a;
+        border-radius: 12px;
+        padding: 4px 12px;
+        font-size: 16px;
+        font-weight: 400;
+    }
+    QPushButton#attachmentChip:hover {
+        border-color: #ff453a;
+    }
+"""
 
 class FeedbackResult(TypedDict):
     cursor_usage_opt: str
+    attachments: NotRequired[List[dict]]  # 保存为附件的大段粘贴内容
+
+class BatchAnswer(TypedDict):
+    question: str
+    selected_options: List[str]
+    feedback: str
+    attachments: NotRequired[List[dict]]  # 该问题的回答中附加的附件
+
+class BatchFeedbackResult(TypedDict):
+    answers: List[BatchAnswer]
+
+def get_startup_cache_path() -> Optional[str]:
+    """获取Qt启动缓存文件路径，FEEDBACK_QT_STARTUP_CACHE=0 时禁用缓存"""
+    if os.environ.get('FEEDBACK_QT_STARTUP_CACHE', '1') == '0':
+        return None
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'cursor-usage-opt', 'qt_startup.json')
+
+def load_startup_cache() -> dict:
+    """读取上次启动时解析好的环境变量、字体和窗口状态"""
+    path = get_startup_cache_path()
+    if not path:
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # Qt版本变化后插件和字体解析结果可能不同，直接丢弃旧缓存
+    if cache.get('version') != STARTUP_CACHE_VERSION or cache.get('qt_version') != qVersion():
+        return {}
+    return cache
+
+def save_startup_cache(cache: dict):
+    """保存启动缓存（写入临时文件后原子替换）"""
+    path = get_startup_cache_path()
+    if not path:
+        return
+    cache = dict(cache, version=STARTUP_CACHE_VERSION, qt_version=qVersion())
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass  # 缓存写入失败不影响使用
+
+def resolve_qt_environment(cache: dict) -> dict:
+    """计算输入法和平台相关的环境变量，结果会缓存到下次启动"""
+    wayland = bool(os.environ.get('WAYLAND_DISPLAY'))
+    cached = cache.get('environment')
+    if cached and cached.get('wayland') == wayland:
+        return cached['values']
+
+    if wayland:
+        # Wayland 环境
+        values = {
+            'QT_IM_MODULE': 'wayland',
+            'XMODIFIERS': '@im=fcitx5',
+            'GTK_IM_MODULE': 'fcitx5',
+            'QT_QPA_PLATFORM': 'wayland',
+        }
+    else:
+        # X11 环境
+        values = {
+            'QT_IM_MODULE': 'fcitx5',
+            'XMODIFIERS': '@im=fcitx5',
+            'GTK_IM_MODULE': 'fcitx5',
+            'QT_QPA_PLATFORM': 'xcb',
+        }
+        # 没有安装fcitx5的Qt插件时不强制指定，避免Qt逐个搜索插件目录
+        plugin_dir = os.path.join(QLibraryInfo.path(QLibraryInfo.PluginsPath), 'platforminputcontexts')
+        try:
+            has_fcitx5 = any('fcitx5' in name for name in os.listdir(plugin_dir))
+        except OSError:
+            has_fcitx5 = False
+        if not has_fcitx5:
+            values.pop('QT_IM_MODULE')
+
+    cache['environment'] = {'wayland': wayland, 'values': values}
+    return values
+
+_ui_font_families = list(UI_FONT_FAMILIES)
+_ui_fonts = {}
+
+def set_ui_font_family(family: Optional[str]):
+    """将上次解析出的字体放到候选列表最前面，减少字体匹配开销"""
+    global _ui_font_families
+    _ui_font_families = [family] + [f for f in UI_FONT_FAMILIES if f != family] if family else list(UI_FONT_FAMILIES)
+    _ui_fonts.clear()
+
+def ui_font(point_size: int) -> QFont:
+    """按字号懒加载并复用界面字体"""
+    font = _ui_fonts.get(point_size)
+    if font is None:
+        font = QFont()
+        font.setFamilies(_ui_font_families)
+        font.setPointSize(point_size)
+        font.setWeight(QFont.Normal)
+        _ui_fonts[point_size] = font
+    return font
 
 def get_apple_dark_palette(app: QApplication):
     """Apple风格深色主题调色板，更加精致的Apple设计"""
@@ -64,48 +434,212 @@ def get_apple_dark_palette(app: QApplication):
 
     return darkPalette
 
+class FrameTimingApplication(QApplication):
+    """记录绘制、布局和每帧耗时的QApplication，仅在 FEEDBACK_PROFILE 包含 frames 时使用"""
+    TIMED_EVENTS = {
+        QEvent.Paint: 'paint',
+        QEvent.LayoutRequest: 'layout',
+        QEvent.UpdateRequest: 'frame',
+    }
+    MAX_SAMPLES = 5000
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.started_at = time.perf_counter()
+        self.samples = []
+
+    def notify(self, receiver, event):
+        kind = self.TIMED_EVENTS.get(event.type())
+        if kind is None:
+            return super().notify(receiver, event)
+
+        start = time.perf_counter()
+        try:
+            return super().notify(receiver, event)
+        finally:
+            # 只有顶层窗口的UpdateRequest才对应一次完整的帧刷新
+            if kind != 'frame' or (receiver.isWidgetType() and receiver.isWindow()):
+                if len(self.samples) < self.MAX_SAMPLES:
+                    self.samples.append({
+                        'event': kind,
+                        'widget': type(receiver).__name__,
+                        'at_ms': round((start - self.started_at) * 1000, 3),
+                        'ms': round((time.perf_counter() - start) * 1000, 3),
+                    })
+
+    def frame_report(self) -> dict:
+        """按事件类型汇总耗时"""
+        summary = {}
+        for kind in self.TIMED_EVENTS.values():
+            summary[kind] = summarize_durations([s['ms'] for s in self.samples if s['event'] == kind])
+        return {'summary': summary, 'samples': self.samples}
+
+class OptionFilterIndex:
+    """预定义选项的筛选索引
+
+    选项文本预先做大小写折叠，并按字符建立倒排表；查询时先取最稀有字符的倒排表作为候选，
+    如果新查询包含上一次的查询（继续输入），则只在上一次的结果中过滤。
+    """
+
+    def __init__(self, options: List[str]):
+        self.keys = [option.casefold() for option in options]
+        self.postings = {}
+        for index, key in enumerate(self.keys):
+            for char in set(key):
+                self.postings.setdefault(char, []).append(index)
+        self._last_query = ""
+        self._last_matches = list(range(len(self.keys)))
+
+    def filter(self, query: str) -> List[int]:
+        """返回文本包含query的选项下标（保持原始顺序）"""
+        query = query.strip().casefold()
+        if not query:
+            matches = list(range(len(self.keys)))
+        else:
+            if self._last_query and self._last_query in query:
+                candidates = self._last_matches
+            else:
+                candidates = min((self.postings.get(char, []) for char in set(query)), key=len)
+            matches = [index for index in candidates if query in self.keys[index]]
+        self._last_query = query
+        self._last_matches = matches
+        return matches
+
+class OptionList(QWidget):
+    """大量预定义选项的列表：QListView + 模型只绘制可见行，上方的筛选框增量过滤，点击整行切换勾选"""
+
+    def __init__(self, options: List[str], parent=None):
+        super().__init__(parent)
+        self.options = options
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(8)
+
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setObjectName("optionFilter")
+        self.filter_edit.setPlaceholderText(f"筛选 {len(options)} 个选项...")
+        self.filter_edit.setClearButtonEnabled(True)
+        self.filter_edit.textChanged.connect(self._filter_options)
+
+        self.model = QStandardItemModel(len(options), 1, self)
+        for row, option in enumerate(options):
+            item = QStandardItem(option)
+            # 只显示勾选框，不交给视图切换：点击勾选框时视图和 _toggle_option 各切换一次会互相抵消
+            item.setFlags(Qt.ItemIsEnabled)
+            item.setCheckState(Qt.Unchecked)
+            item.setToolTip(option)
+            self.model.setItem(row, 0, item)
+
+        self.view = QListView()
+        self.view.setObjectName("optionList")
+        self.view.setModel(self.model)
+        self.view.setFont(ui_font(22))
+        self.view.setUniformItemSizes(True)  # 行高一致，滚动时无需逐行计算尺寸
+        self.view.setSelectionMode(QAbstractItemView.NoSelection)
+        self.view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.view.setMinimumHeight(200)
+        self.view.setMaximumHeight(320)
+        self.view.clicked.connect(self._toggle_option)
+        self.view.installEventFilter(self)  # 空格键切换当前行
+
+        self.index = OptionFilterIndex(options)
+        self._visible_options = set(range(len(options)))
+
+        layout.addWidget(self.filter_edit)
+        layout.addWidget(self.view)
+
+    def selected(self) -> List[str]:
+        return [self.options[row] for row in range(self.model.rowCount())
+                if self.model.item(row).checkState() == Qt.Checked]
+
+    def eventFilter(self, watched, event):
+        if watched is self.view and event.type() == QEvent.KeyPress and event.key() == Qt.Key_Space:
+            self._toggle_option(self.view.currentIndex())
+            return True
+        return super().eventFilter(watched, event)
+
+    def _toggle_option(self, index):
+        """点击整行（包括勾选框）即可切换勾选状态"""
+        item = self.model.itemFromIndex(index)
+        if item is not None:
+            item.setCheckState(Qt.Unchecked if item.checkState() == Qt.Checked else Qt.Checked)
+
+    def _filter_options(self, text: str):
+        """只更新可见性发生变化的行"""
+        visible = set(self.index.filter(text))
+        for row in self._visible_options - visible:
+            self.view.setRowHidden(row, True)
+        for row in visible - self._visible_options:
+            self.view.setRowHidden(row, False)
+        self._visible_options = visible
+
+class MarkdownRenderSignals(QObject):
+    finished = Signal(object, float)  # (QTextDocument, 渲染耗时ms)
+
+class MarkdownRenderTask(QRunnable):
+    """在线程池中完成Markdown/Pygments转换并构建QTextDocument"""
+
+    def __init__(self, render, text: str, font: QFont):
+        super().__init__()
+        self.render = render
+        self.text = text
+        self.font = QFont(font)
+        self.signals = MarkdownRenderSignals()
+
+    def run(self):
+        start = time.perf_counter()
+        html_content = self.render(self.text)
+        document = QTextDocument()
+        document.setDefaultFont(self.font)
+        document.setHtml(html_content)
+        # 文档在工作线程中创建，交给GUI线程后才能挂到description_browser上
+        document.moveToThread(QApplication.instance().thread())
+        self.signals.finished.emit(document, (time.perf_counter() - start) * 1000)
+
+class MarkdownStreamSignals(QObject):
+    chunk = Signal(str)  # 一个分片的HTML
+    finished = Signal(float)  # 总渲染耗时ms
+
+class MarkdownStreamTask(QRunnable):
+    """在线程池中逐块渲染超长Markdown，按分片交给GUI线程追加显示"""
+
+    def __init__(self, renderer, text: str):
+        super().__init__()
+        self.renderer = renderer
+        self.text = text
+        self.cancelled = False
+        self.signals = MarkdownStreamSignals()
+
+    def run(self):
+        start = time.perf_counter()
+        for chunk in self.renderer.iter_chunks(self.text):
+            if self.cancelled:
+                return
+            self.signals.chunk.emit("".join(html_content for _, html_content in chunk))
+        self.signals.finished.emit((time.perf_counter() - start) * 1000)
+
+# 可以拖入回答框作为图片附件的文件
+IMAGE_FILE_SUFFIXES = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp')
+
+def encode_image(image: QImage, image_format: str, quality: int = -1) -> bytes:
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, image_format, quality)
+    buffer.close()
+    return bytes(data)
+
 class FeedbackTextEdit(QTextEdit):
+    # 超过附件阈值的粘贴内容和粘贴或拖入的图片（设置 accept_attachments 后不再插入到回答框）
+    large_paste = Signal(str)
+    image_pasted = Signal(QImage, str)
+
     def __init__(self, parent=None):
         super().__init__(parent)
 
-        # Apple风格的文本编辑器样式 - 增大字体以提高可读性
-        self.setStyleSheet("""
-            QTextEdit {
-                background-color: #2c2c2e;
-                border: 1px solid #3a3a3c;
-                border-radius: 8px;
-                padding: 12px;
-                font-family: "Microsoft YaHei", "PingFang SC", "SF Pro Text", "Helvetica Neue", Arial, sans-serif;
-                font-size: 22px;
-                line-height: 1.5;
-                color: #ffffff;
-                selection-background-color: #0a84ff;
-            }
-            QTextEdit:focus {
-                border: 2px solid #0a84ff;
-                background-color: #2c2c2e;
-            }
-            QScrollBar:vertical {
-                background-color: transparent;
-                width: 8px;
-                border-radius: 4px;
-            }
-            QScrollBar::handle:vertical {
-                background-color: rgba(255, 255, 255, 0.3);
-                border-radius: 4px;
-                min-height: 20px;
-            }
-            QScrollBar::handle:vertical:hover {
-                background-color: rgba(255, 255, 255, 0.5);
-            }
-        """)
-
-        # 设置Apple风格的字体 - 大幅增大字体以提高可读性，优先中文字体
-        font = QFont()
-        font.setPointSize(24)  # 大幅增大字体大小
-        font.setFamily("Microsoft YaHei, PingFang SC, SF Pro Text, Helvetica Neue, Arial, sans-serif")
-        font.setWeight(QFont.Normal)
-        self.setFont(font)
+        # Apple风格的文本编辑器样式由全局样式表提供 - 增大字体以提高可读性
+        self.setObjectName("feedbackText")
+        self.setFont(ui_font(24))
 
         # 确保支持中文输入法
         self.setAttribute(Qt.WA_InputMethodEnabled, True)
@@ -122,11 +656,70 @@ class FeedbackTextEdit(QTextEdit):
         # 确保焦点策略支持输入法
         self.setFocusPolicy(Qt.StrongFocus)
 
-        # 强制激活输入法
-        self.activateInputMethod()
+        # 强制激活输入法（推迟到事件循环开始后，避免拖慢窗口首次显示）
+        QTimer.singleShot(0, self.activateInputMethod)
+
+        # 回答建议：输入时弹出以前以相同内容开头的回答，第一次需要时才创建
+        self.suggestion_prompt = ""
+        self._completer = None
+        self._accepting = False
+        self.accept_attachments = False
+        self.textChanged.connect(self._update_suggestions)
+
+    def _suggestion_popup_visible(self) -> bool:
+        return self._completer is not None and self._completer.popup().isVisible()
+
+    def _update_suggestions(self, force: bool = False):
+        index = loaded_suggestion_index()
+        if index is None or self._accepting:
+            return  # 索引还在后台加载、已关闭建议，或者刚采用了建议
+        # 先看字符数，长回答不用取出全部文本
+        if self.document().characterCount() > MAX_SUGGESTION_LENGTH + 1:
+            suggestions = []
+        else:
+            prefix = self.toPlainText()
+            suggestions = index.suggest(prefix, self.suggestion_prompt) if prefix.strip() or force else []
+        if not suggestions:
+            if self._suggestion_popup_visible():
+                self._completer.popup().hide()
+            return
+        if self._completer is None:
+            self._completer = QCompleter(QStringListModel(self), self)
+            self._completer.setWidget(self)
+            self._completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+            self._completer.activated.connect(self._accept_suggestion)
+        self._completer.model().setStringList(suggestions)
+        rect = self.cursorRect()
+        rect.setWidth(max(240, self.viewport().width() // 2))
+        self._completer.complete(rect)
+        # 默认不选中任何建议，Enter 照常换行；↓ 选择、Tab 采用第一条
+        self._completer.popup().setCurrentIndex(QModelIndex())
+
+    def _accept_suggestion(self, text: str):
+        self._accepting = True
+        try:
+            self.setPlainText(text)
+        finally:
+            self._accepting = False
+        self.moveCursor(QTextCursor.End)
 
     def keyPressEvent(self, event: QKeyEvent):
-        if event.key() == Qt.Key_Return and event.modifiers() == Qt.ControlModifier:
+        if self._suggestion_popup_visible() and event.key() in (Qt.Key_Return, Qt.Key_Enter, Qt.Key_Tab, Qt.Key_Escape) \
+                and event.modifiers() != Qt.ControlModifier:
+            popup = self._completer.popup()
+            selected = popup.currentIndex()
+            if event.key() == Qt.Key_Tab:
+                popup.hide()  # Tab 采用选中的建议，没有选中时采用第一条
+                self._accept_suggestion((selected if selected.isValid() else self._completer.model().index(0, 0)).data())
+                return
+            if event.key() in (Qt.Key_Return, Qt.Key_Enter) and not selected.isValid():
+                popup.hide()  # 没有选中建议时照常换行
+            else:
+                event.ignore()  # 交给补全弹窗处理：采用或关闭建议
+                return
+        if event.key() == Qt.Key_Space and event.modifiers() == Qt.ControlModifier:
+            self._update_suggestions(force=True)  # 显示回答过相似问题的回答
+        elif event.key() == Qt.Key_Return and event.modifiers() == Qt.ControlModifier:
             # Find the parent FeedbackUI instance and call submit
             parent = self.parent()
             while parent and not isinstance(parent, FeedbackUI):
@@ -136,6 +729,36 @@ class FeedbackTextEdit(QTextEdit):
         else:
             super().keyPressEvent(event)
 
+    @staticmethod
+    def _image_files(source) -> List[str]:
+        """拖入的本地图片文件"""
+        if not source.hasUrls():
+            return []
+        return [url.toLocalFile() for url in source.urls()
+                if url.isLocalFile() and os.path.splitext(url.toLocalFile())[1].lower() in IMAGE_FILE_SUFFIXES]
+
+    def canInsertFromMimeData(self, source) -> bool:
+        if self.accept_attachments and (source.hasImage() or self._image_files(source)):
+            return True
+        return super().canInsertFromMimeData(source)
+
+    def insertFromMimeData(self, source):
+        if self.accept_attachments:
+            if source.hasImage():
+                self.image_pasted.emit(QImage(source.imageData()), "screenshot")
+                return
+            image_files = self._image_files(source)
+            if image_files:
+                for path in image_files:
+                    self.image_pasted.emit(QImage(path), os.path.splitext(os.path.basename(path))[0])
+                return
+            if source.hasText():
+                text = source.text()
+                if is_large_paste(text):
+                    self.large_paste.emit(text)
+                    return
+        super().insertFromMimeData(source)
+
     def focusInEvent(self, event):
         # 确保获得焦点时输入法可用
         super().focusInEvent(event)
@@ -153,13 +776,87 @@ class FeedbackTextEdit(QTextEdit):
         except Exception:
             pass  # 忽略输入法激活错误
 
+class AttachmentBar(QWidget):
+    """回答框下方的附件标签：接收回答框中的大段粘贴内容和图片，保存为附件，点击标签删除附件"""
+    message = Signal(str)  # 保存附件失败等提示，由窗口显示在状态栏
+
+    def __init__(self, text_edit: FeedbackTextEdit, parent=None):
+        super().__init__(parent)
+        self.text_edit = text_edit
+        self.attachments = []
+        text_edit.accept_attachments = True
+        text_edit.large_paste.connect(lambda text: self.attach_text(text, "paste.txt"))
+        text_edit.image_pasted.connect(self.attach_image)
+
+        self.chip_layout = QHBoxLayout(self)
+        self.chip_layout.setContentsMargins(0, 0, 0, 0)
+        self.chip_layout.setSpacing(8)
+        self.chip_layout.addStretch()
+        self.hide()
+
+    def attach_text(self, text: str, name: str):
+        """把大段文本保存为附件"""
+        try:
+            attachment = save_text_attachment(text, name)
+        except OSError as e:
+            self.message.emit(f"保存附件失败: {e}")
+            return
+        chip = QPushButton(f"📎 {attachment['name']} · {describe_size(attachment['size'])} · {attachment['lines']} 行  ✕")
+        chip.setToolTip(attachment.get('preview', ''))
+        self._add_chip(attachment, chip)
+
+    def attach_image(self, image: QImage, name: str):
+        """把图片缩小到最大边长并重新编码（PNG 和 JPEG 中取较小的一种）后保存为图片附件"""
+        if image.isNull():
+            self.message.emit("无法读取图片")
+            return
+        width, height = scaled_size(image.width(), image.height())
+        if (width, height) != (image.width(), image.height()):
+            image = image.scaled(width, height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        candidates = [('image/png', '.png', encode_image(image, "PNG"))]
+        if not image.hasAlphaChannel():  # JPEG 没有透明通道
+            candidates.append(('image/jpeg', '.jpg', encode_image(image, "JPEG", get_image_quality())))
+        mime_type, suffix, data = min(candidates, key=lambda candidate: len(candidate[2]))
+        try:
+            attachment = save_image_attachment(data, name + suffix, mime_type, image.width(), image.height())
+        except (OSError, AttachmentTooLarge) as e:
+            self.message.emit(f"保存图片失败: {e}")
+            return
+        chip = QPushButton(f"{attachment['name']} · {image.width()}×{image.height()} · {describe_size(attachment['size'])}  ✕")
+        chip.setIcon(QIcon(QPixmap.fromImage(image.scaled(64, 64, Qt.KeepAspectRatio, Qt.SmoothTransformation))))
+        chip.setIconSize(QSize(32, 32))
+        self._add_chip(attachment, chip)
+
+    def _add_chip(self, attachment: dict, chip: QPushButton):
+        self.attachments.append(attachment)
+        chip.setObjectName("attachmentChip")
+        chip.setFocusPolicy(Qt.NoFocus)
+        chip.clicked.connect(lambda: self._remove(attachment, chip))
+        self.chip_layout.insertWidget(self.chip_layout.count() - 1, chip)
+        self.show()
+        self.text_edit.setFocus()
+
+    def _remove(self, attachment: dict, chip: QPushButton):
+        self.attachments.remove(attachment)
+        delete_attachment(attachment['id'])
+        chip.deleteLater()
+        self.setVisible(bool(self.attachments))
+
 class FeedbackUI(QMainWindow):
-    def __init__(self, prompt: str, predefined_options: Optional[List[str]] = None):
+    def __init__(self, prompt: str, predefined_options: Optional[List[str]] = None,
+                 startup_cache: Optional[dict] = None, exit_when_ready: bool = False):
         super().__init__()
         self.prompt = prompt
         self.predefined_options = predefined_options or []
 
         self.feedback_result = None
+        self.timings = {}
+        self._render_task = None
+        self._pending_chunks = deque()  # 已渲染但尚未追加到描述区域的分片
+        self._streamed_chunks = 0
+        self.exit_when_ready = exit_when_ready  # 基准测试：窗口显示且内容渲染完成后立即退出
+        self.status_file = None  # 向MCP服务器报告进度（窗口已打开、用户正在输入）的状态文件
+        self._reported_state = None
         self.setup_markdown()
 
         self.setWindowTitle("💬 AI 反馈助手")
@@ -172,19 +869,29 @@ class FeedbackUI(QMainWindow):
         self.setMinimumSize(600, 500)
         self.resize(700, 600)
 
-        self.settings = QSettings("InteractiveFeedbackMCP", "InteractiveFeedbackMCP")
+        self.startup_cache = startup_cache if startup_cache is not None else load_startup_cache()
+        self._settings = None
+
+        # 全局样式表只设置一次
+        app = QApplication.instance()
+        if app.styleSheet() != APP_STYLESHEET:
+            app.setStyleSheet(APP_STYLESHEET)
 
         # 设置Apple风格字体 - 大幅增大字体以提高可读性，优先中文字体
-        app_font = QFont()
-        app_font.setPointSize(24)  # 进一步增大字体大小
-        app_font.setFamily("Microsoft YaHei, PingFang SC, SF Pro Display, SF Pro Text, Helvetica Neue, Arial, sans-serif")
-        app_font.setWeight(QFont.Normal)
+        app_font = QFont(ui_font(24))  # 进一步增大字体大小
         app_font.setLetterSpacing(QFont.PercentageSpacing, 97.8)  # Apple的字母间距
-        QApplication.instance().setFont(app_font)
+        app.setFont(app_font)
 
         # Load general UI settings for the main window (geometry, state)
-        self.settings.beginGroup("MainWindow_General")
-        geometry = self.settings.value("geometry")
+        # 优先使用启动缓存，缓存缺失时才读取QSettings
+        if 'geometry' in self.startup_cache:
+            geometry = QByteArray.fromBase64(self.startup_cache['geometry'].encode('ascii'))
+            state = QByteArray.fromBase64(self.startup_cache.get('window_state', '').encode('ascii'))
+        else:
+            self.settings.beginGroup("MainWindow_General")
+            geometry = self.settings.value("geometry")
+            state = self.settings.value("windowState")
+            self.settings.endGroup() # End "MainWindow_General" group
         if geometry:
             self.restoreGeometry(geometry)
         else:
@@ -193,119 +900,23 @@ class FeedbackUI(QMainWindow):
             x = (screen.width() - 900) // 2
             y = (screen.height() - 700) // 2
             self.move(x, y)
-        state = self.settings.value("windowState")
         if state:
             self.restoreState(state)
-        self.settings.endGroup() # End "MainWindow_General" group
 
         self._create_ui()
 
     def setup_markdown(self):
         """设置Markdown渲染器"""
-        self.md = markdown.Markdown(
-            extensions=[
-                'fenced_code',
-                'codehilite',
-                'tables',
-                'toc',
-                'nl2br',
-                'sane_lists'
-            ],
-            extension_configs={
-                'codehilite': {
-                    'css_class': 'highlight',
-                    'use_pygments': True,
-                    'noclasses': True,
-                    'pygments_style': 'monokai'
-                }
-            }
-        )
+        self.renderer = get_renderer()
 
     def render_markdown(self, text: str) -> str:
         """渲染Markdown文本为HTML，优化代码块显示"""
         if not text:
             return ""
 
-        # 转换Markdown为HTML
-        html_content = self.md.convert(text)
-
-        # 包装在样式化的HTML中，优化代码块显示
-        styled_html = f"""
-        <style>
-            body {{
-                font-family: "Microsoft YaHei", "PingFang SC", "SF Pro Display", "SF Pro Text", "Helvetica Neue", Arial, sans-serif;
-                color: #f5f5f7;
-                line-height: 1.6;
-                letter-spacing: -0.022em;
-                font-size: 22px;
-                margin: 0;
-                padding: 0;
-            }}
-            h1, h2, h3, h4, h5, h6 {{
-                color: #ffffff;
-                font-weight: 600;
-                margin: 1em 0 0.5em 0;
-            }}
-            p {{
-                margin: 0.8em 0;
-                line-height: 1.6;
-            }}
-            code {{
-                background-color: #2c2c2e;
-                color: #ff6b6b;
-                padding: 2px 6px;
-                border-radius: 4px;
-                font-family: "SF Mono", "Monaco", "Consolas", "Liberation Mono", "Courier New", monospace;
-                font-size: 20px;
-                font-weight: 500;
-            }}
-            pre {{
-                background-color: #1c1c1e;
-                border: 1px solid #3a3a3c;
-                border-radius: 8px;
-                padding: 16px;
-                margin: 1em 0;
-                overflow-x: auto;
-                font-family: "SF Mono", "Monaco", "Consolas", "Liberation Mono", "Courier New", monospace;
-                font-size: 18px;
-                line-height: 1.4;
-            }}
-            pre code {{
-                background-color: transparent;
-                color: inherit;
-                padding: 0;
-                border-radius: 0;
-                font-size: inherit;
-            }}
-            ul, ol {{
-                margin: 0.8em 0;
-                padding-left: 2em;
-            }}
-            li {{
-                margin: 0.4em 0;
-                line-height: 1.5;
-            }}
-            blockquote {{
-                border-left: 3px solid #0a84ff;
-                margin: 1em 0;
-                padding-left: 1em;
-                color: #d1d1d6;
-                font-style: italic;
-            }}
-            strong {{
-                color: #ffffff;
-                font-weight: 600;
-            }}
-            em {{
-                color: #d1d1d6;
-                font-style: italic;
-            }}
-        }}
-        </style>
-        <body>{html_content}</body>
-        """
-
-        return styled_html
+        # 转换Markdown为HTML，包装在样式化的HTML中，优化代码块显示
+        html_content = self.renderer.render_document(text)
+        return f"<style>{MARKDOWN_STYLESHEET}</style><body>{html_content}</body>"
 
     def _create_ui(self):
         central_widget = QWidget()
@@ -316,31 +927,6 @@ class FeedbackUI(QMainWindow):
         layout.setContentsMargins(20, 20, 20, 20)  # Apple风格的边距
         layout.setSpacing(16)  # Apple风格的间距
 
-        # 设置窗口样式
-        self.setStyleSheet("""
-            QMainWindow {
-                background-color: #1c1c1e;
-            }
-            QGroupBox {
-                font-family: "Microsoft YaHei", "PingFang SC", "SF Pro Display", "SF Pro Text", "Helvetica Neue", Arial, sans-serif;
-                font-size: 22px;
-                font-weight: 600;
-                color: #ffffff;
-                border: 1px solid #3a3a3c;
-                border-radius: 12px;
-                margin-top: 8px;
-                padding-top: 8px;
-                background-color: rgba(44, 44, 46, 0.6);
-            }
-            QGroupBox::title {
-                subcontrol-origin: margin;
-                left: 12px;
-                padding: 0 8px 0 8px;
-                color: #ffffff;
-                background-color: transparent;
-            }
-        """)
-
         # Feedback section - Apple风格的卡片设计
         self.feedback_group = QGroupBox("💬 反馈内容")
         feedback_layout = QVBoxLayout(self.feedback_group)
@@ -353,45 +939,15 @@ class FeedbackUI(QMainWindow):
         self.description_browser.setMaximumHeight(300)  # 增加最大高度，允许更多内容显示
         self.description_browser.setOpenExternalLinks(True)
 
-        # Apple风格的文本浏览器样式
-        self.description_browser.setStyleSheet("""
-            QTextBrowser {
-                background-color: #2c2c2e;
-                border: 1px solid #3a3a3c;
-                border-radius: 8px;
-                padding: 12px;
-                font-family: "Microsoft YaHei", "PingFang SC", "SF Pro Text", "Helvetica Neue", Arial, sans-serif;
-                font-size: 16px;
-                line-height: 1.4;
-                color: #ffffff;
-                selection-background-color: #0a84ff;
-            }
-            QScrollBar:vertical {
-                background-color: transparent;
-                width: 8px;
-                border-radius: 4px;
-            }
-            QScrollBar::handle:vertical {
-                background-color: rgba(255, 255, 255, 0.3);
-                border-radius: 4px;
-                min-height: 20px;
-            }
-            QScrollBar::handle:vertical:hover {
-                background-color: rgba(255, 255, 255, 0.5);
-            }
-        """)
-
-        # 设置描述浏览器的字体 - 大幅增大字体以提高可读性，优先中文字体
-        desc_font = QFont()
-        desc_font.setPointSize(22)  # 大幅增大字体大小
-        desc_font.setFamily("Microsoft YaHei, PingFang SC, SF Pro Text, Helvetica Neue, Arial, sans-serif")
-        desc_font.setWeight(QFont.Normal)
-        self.description_browser.setFont(desc_font)
-
-        # 渲染Markdown内容
+        # Apple风格的文本浏览器样式由全局样式表提供 - 大幅增大字体以提高可读性
+        self.description_browser.setObjectName("descriptionBrowser")
+        self.description_browser.setFont(ui_font(22))
+
+        # 先显示纯文本预览，Markdown在后台线程渲染完成后再替换
         if self.prompt:
-            html_content = self.render_markdown(self.prompt)
-            self.description_browser.setHtml(html_content)
+            preview = self.prompt if len(self.prompt) <= PREVIEW_CHARS else self.prompt[:PREVIEW_CHARS] + "\n…"
+            self.description_browser.setPlainText(preview)
+            self._start_markdown_render()
         else:
             self.description_browser.setPlainText("无提示内容")
 
@@ -399,70 +955,29 @@ class FeedbackUI(QMainWindow):
 
         # Apple风格的预定义选项
         self.option_checkboxes = []
+        self.option_list = None
         if self.predefined_options and len(self.predefined_options) > 0:
             options_frame = QFrame()
             options_layout = QVBoxLayout(options_frame)
             options_layout.setContentsMargins(0, 12, 0, 12)
             options_layout.setSpacing(8)
 
-            # Apple风格的复选框样式
-            checkbox_style = """
-                QCheckBox {
-                    font-family: "Microsoft YaHei", "PingFang SC", "SF Pro Text", "Helvetica Neue", Arial, sans-serif;
-                    font-size: 22px;
-                    color: #ffffff;
-                    spacing: 8px;
-                    padding: 4px;
-                }
-                QCheckBox::indicator {
-                    width: 18px;
-                    height: 18px;
-                    border-radius: 4px;
-                    border: 2px solid #3a3a3c;
-                    background-color: transparent;
-                }
-                QCheckBox::indicator:hover {
-                    border-color: #0a84ff;
-                }
-                QCheckBox::indicator:checked {
-                    background-color: #0a84ff;
-                    border-color: #0a84ff;
-                    image: url(data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iMTIiIGhlaWdodD0iOSIgdmlld0JveD0iMCAwIDEyIDkiIGZpbGw9Im5vbmUiIHhtbG5zPSJodHRwOi8vd3d3LnczLm9yZy8yMDAwL3N2ZyI+CjxwYXRoIGQ9Ik0xMC42IDEuNEw0LjMgNy43TDEuNCA0LjgiIHN0cm9rZT0id2hpdGUiIHN0cm9rZS13aWR0aD0iMiIgc3Ryb2tlLWxpbmVjYXA9InJvdW5kIiBzdHJva2UtbGluZWpvaW49InJvdW5kIi8+Cjwvc3ZnPgo=);
-                }
-                QCheckBox::indicator:checked:hover {
-                    background-color: #0071e3;
-                    border-color: #0071e3;
-                }
-            """
-
-            for option in self.predefined_options:
-                checkbox = QCheckBox(option)
-                checkbox.setStyleSheet(checkbox_style)
-
-                # 设置Apple风格字体 - 大幅增大字体以提高可读性，优先中文字体
-                checkbox_font = QFont()
-                checkbox_font.setPointSize(22)  # 大幅增大字体大小
-                checkbox_font.setFamily("Microsoft YaHei, PingFang SC, SF Pro Text, Helvetica Neue, Arial, sans-serif")
-                checkbox_font.setWeight(QFont.Normal)
-                checkbox.setFont(checkbox_font)
+            if len(self.predefined_options) > VIRTUAL_OPTIONS_THRESHOLD:
+                self._create_option_list(options_layout)
+            else:
+                for option in self.predefined_options:
+                    checkbox = QCheckBox(option)
+                    checkbox.setFont(ui_font(22))
 
-                self.option_checkboxes.append(checkbox)
-                options_layout.addWidget(checkbox)
+                    self.option_checkboxes.append(checkbox)
+                    options_layout.addWidget(checkbox)
 
             feedback_layout.addWidget(options_frame)
 
             # Apple风格的分隔线
             separator = QFrame()
             separator.setFrameShape(QFrame.HLine)
-            separator.setStyleSheet("""
-                QFrame {
-                    color: #3a3a3c;
-                    background-color: #3a3a3c;
-                    border: none;
-                    height: 1px;
-                    margin: 8px 0;
-                }
-            """)
+            separator.setObjectName("separator")
             feedback_layout.addWidget(separator)
 
         # Free-form text feedback - 增大文本编辑区域
@@ -475,75 +990,37 @@ class FeedbackUI(QMainWindow):
 
         # 设置占位符文本，使用更大的字体
         self.feedback_text.setPlaceholderText("请在此输入您的反馈内容... (Ctrl+Enter 提交)")
+        self.feedback_text.suggestion_prompt = self.prompt
+        self.feedback_text.textChanged.connect(self._on_user_typing)
+
+        # 大段粘贴内容保存为附件，回答框下方只显示附件标签
+        self.attachment_bar = AttachmentBar(self.feedback_text)
+        self.attachment_bar.message.connect(lambda text: self.statusBar().showMessage(text, 5000))
 
         # Apple风格的按钮布局
         button_layout = QHBoxLayout()
         button_layout.setSpacing(12)  # Apple风格的按钮间距
 
-        # Apple风格的按钮样式
-        button_style = """
-            QPushButton {
-                background-color: #0a84ff;
-                color: #ffffff;
-                border: none;
-                border-radius: 8px;
-                padding: 10px 20px;
-                font-family: "Microsoft YaHei", "PingFang SC", "SF Pro Text", "Helvetica Neue", Arial, sans-serif;
-                font-size: 20px;
-                font-weight: 600;
-                min-height: 20px;
-            }
-            QPushButton:hover {
-                background-color: #0071e3;
-            }
-            QPushButton:pressed {
-                background-color: #0056b3;
-            }
-            QPushButton:disabled {
-                background-color: #3a3a3c;
-                color: #8e8e93;
-            }
-        """
-
-        secondary_button_style = """
-            QPushButton {
-                background-color: #48484a;
-                color: #ffffff;
-                border: none;
-                border-radius: 8px;
-                padding: 10px 20px;
-                font-family: "Microsoft YaHei", "PingFang SC", "SF Pro Text", "Helvetica Neue", Arial, sans-serif;
-                font-size: 20px;
-                font-weight: 500;
-                min-height: 20px;
-            }
-            QPushButton:hover {
-                background-color: #5a5a5c;
-            }
-            QPushButton:pressed {
-                background-color: #3a3a3c;
-            }
-        """
-
         # 插入代码按钮 - 次要按钮样式
         insert_code_button = QPushButton("📋 插入代码")
-        insert_code_button.setStyleSheet(secondary_button_style)
+        insert_code_button.setProperty("secondary", True)
         insert_code_button.clicked.connect(self._insert_code_from_clipboard)
         insert_code_button.setShortcut("Alt+C")
 
         # 发送按钮 - 主要按钮样式
         submit_button = QPushButton("🚀 发送反馈")
-        submit_button.setStyleSheet(button_style)
         submit_button.clicked.connect(self._submit_feedback)
         submit_button.setShortcut("Ctrl+Return")
         submit_button.setDefault(True)  # 设为默认按钮
 
         # 添加按钮到布局
         button_layout.addStretch()  # 左侧弹性空间
+        button_layout.addWidget(self._create_history_button())
         button_layout.addWidget(insert_code_button)
         button_layout.addWidget(submit_button)
 
         feedback_layout.addWidget(self.feedback_text)
+        feedback_layout.addWidget(self.attachment_bar)
         feedback_layout.addLayout(button_layout)
 
         # Set minimum height for feedback_group
@@ -552,15 +1029,149 @@ class FeedbackUI(QMainWindow):
         # Add widgets
         layout.addWidget(self.feedback_group)
 
+    def _create_option_list(self, options_layout: QVBoxLayout):
+        """大量选项时使用虚拟列表，只绘制可见行，并提供增量筛选"""
+        self.option_list = OptionList(self.predefined_options)
+        options_layout.addWidget(self.option_list)
+
+    def _start_markdown_render(self):
+        """将Markdown渲染交给线程池，避免阻塞窗口显示"""
+        if should_stream(self.prompt):
+            self._start_markdown_stream()
+            return
+        self._render_task = MarkdownRenderTask(self.render_markdown, self.prompt, self.description_browser.font())
+        self._render_task.signals.finished.connect(self._on_markdown_rendered)
+        QThreadPool.globalInstance().start(self._render_task)
+
+    def _on_markdown_rendered(self, document: QTextDocument, render_ms: float):
+        """渲染完成后替换描述区域的文档"""
+        self._render_task = None
+        document.setParent(self.description_browser)
+        self.description_browser.setDocument(document)
+        self.timings['render_ms'] = round(render_ms, 3)
+        self.timings['content_rendered_ms'] = round((time.perf_counter() - _PROCESS_STARTED_AT) * 1000, 3)
+        self._check_ready()
+
+    def _start_markdown_stream(self):
+        """超长文档逐块渲染，首个分片到达即显示，其余分片在滚动接近底部时再追加"""
+        self._render_task = MarkdownStreamTask(self.renderer, self.prompt)
+        self._render_task.signals.chunk.connect(self._on_markdown_chunk)
+        self._render_task.signals.finished.connect(self._on_markdown_stream_finished)
+        self.description_browser.verticalScrollBar().valueChanged.connect(self._append_pending_chunks)
+        QThreadPool.globalInstance().start(self._render_task)
+
+    def _on_markdown_chunk(self, html_content: str):
+        self._pending_chunks.append(html_content)
+        self._append_pending_chunks()
+
+    def _append_pending_chunks(self):
+        """视口接近文档底部时追加一个分片，屏幕外的内容不提前排版"""
+        if not self._pending_chunks:
+            return
+        document = self.description_browser.document()
+        if self._streamed_chunks == 0:
+            # 替换纯文本预览
+            document.clear()
+            document.setDefaultStyleSheet(MARKDOWN_STYLESHEET)
+        else:
+            scrollbar = self.description_browser.verticalScrollBar()
+            if scrollbar.maximum() - scrollbar.value() > scrollbar.pageStep() * 2:
+                return
+
+        cursor = QTextCursor(document)
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertHtml(self._pending_chunks.popleft())
+        self._streamed_chunks += 1
+        if self._streamed_chunks == 1:
+            self.timings['first_chunk_ms'] = round((time.perf_counter() - _PROCESS_STARTED_AT) * 1000, 3)
+        if self._pending_chunks:
+            # 内容还不足以填满视口时继续追加，每次事件循环只追加一个分片
+            QTimer.singleShot(0, self._append_pending_chunks)
+
+    def _on_markdown_stream_finished(self, render_ms: float):
+        self._render_task = None
+        self.timings['render_ms'] = round(render_ms, 3)
+        self.timings['content_rendered_ms'] = round((time.perf_counter() - _PROCESS_STARTED_AT) * 1000, 3)
+        self._check_ready()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if 'window_visible_ms' not in self.timings:
+            self.timings['window_visible_ms'] = round((time.perf_counter() - _PROCESS_STARTED_AT) * 1000, 3)
+            # 输入法重置推迟到窗口显示之后
+            QTimer.singleShot(0, QApplication.instance().inputMethod().reset)
+            QTimer.singleShot(0, lambda: self._report_status('opened'))
+            QTimer.singleShot(0, self._check_ready)
+            QTimer.singleShot(0, preload_suggestion_index)
+
+    def _report_status(self, state: str):
+        """把界面进度写入状态文件，只在进入新阶段时写入"""
+        if not self.status_file or state == self._reported_state or self._reported_state == 'typing':
+            return
+        self._reported_state = state
+        from lifecycle import write_status_file
+        write_status_file(self.status_file, state)
+
+    def _on_user_typing(self):
+        self._report_status('typing')
+
+    def _history_target(self) -> QTextEdit:
+        """历史回答插入的位置：当前有焦点的回答框"""
+        focused = QApplication.focusWidget()
+        return focused if isinstance(focused, FeedbackTextEdit) else self.feedback_text
+
+    def _show_history(self):
+        target = self._history_target()
+        dialog = HistoryDialog(self)
+        dialog.answer_chosen.connect(lambda answer: (target.insertPlainText(answer), target.setFocus()))
+        dialog.exec()
+
+    def _create_history_button(self) -> QPushButton:
+        history_button = QPushButton("🕘 历史回答")
+        history_button.setProperty("secondary", True)
+        history_button.clicked.connect(self._show_history)
+        history_button.setShortcut("Alt+H")
+        history_button.setFocusPolicy(Qt.NoFocus)  # 点击时焦点留在回答框，历史回答插入到那里
+        return history_button
+
+    def start_countdown(self, deadline: float, default_answer: Optional[str] = None):
+        """在状态栏显示等待超时倒计时，到期后MCP服务器使用默认回答并关闭窗口"""
+        self._countdown_deadline = deadline
+        self._countdown_answer = f"“{default_answer}”" if default_answer else "默认回答"
+        self._countdown_label = QLabel()
+        self.statusBar().addWidget(self._countdown_label)
+        self._countdown_timer = QTimer(self)
+        self._countdown_timer.timeout.connect(self._update_countdown)
+        self._countdown_timer.start(1000)
+        self._update_countdown()
+
+    def _update_countdown(self):
+        seconds = max(0, int(self._countdown_deadline - time.time() + 0.999))
+        color = "#ff453a" if seconds <= 30 else "#8e8e93"
+        self._countdown_label.setStyleSheet(f"color: {color};")
+        if seconds:
+            self._countdown_label.setText(f"⏱ {seconds // 60}:{seconds % 60:02d} 后未回答将自动回复{self._countdown_answer}")
+        else:
+            self._countdown_label.setText(f"⏱ 已超时，已自动回复{self._countdown_answer}")
+            self._countdown_timer.stop()
+
+    def _check_ready(self):
+        """基准测试模式下，窗口可见且内容渲染完成后关闭窗口"""
+        if self.exit_when_ready and 'window_visible_ms' in self.timings and self._render_task is None:
+            self.close()
+
     def _insert_code_from_clipboard(self):
-        """从剪贴板获取内容并插入为代码块格式"""
+        """从剪贴板获取内容并插入为代码块格式，超过附件阈值的内容保存为附件，截图保存为图片附件"""
         clipboard = QApplication.clipboard()
         clipboard_text = clipboard.text()
 
-        if clipboard_text:
+        if not clipboard_text and clipboard.mimeData().hasImage():
+            self.attachment_bar.attach_image(clipboard.image(), "screenshot")
+        elif clipboard_text and is_large_paste(clipboard_text):
+            self.attachment_bar.attach_text(clipboard_text, "clipboard.txt")
+        elif clipboard_text:
             # 获取当前光标位置
             cursor = self.feedback_text.textCursor()
-            current_text = self.feedback_text.toPlainText()
 
             # 构建要插入的代码块，在```前面总是添加换行
             code_block = f"\n```\n{clipboard_text}\n```"
@@ -588,6 +1199,8 @@ class FeedbackUI(QMainWindow):
             for i, checkbox in enumerate(self.option_checkboxes):
                 if checkbox.isChecked():
                     selected_options.append(self.predefined_options[i])
+        elif self.option_list is not None:
+            selected_options = self.option_list.selected()
 
         # Combine selected options and feedback text
         final_feedback_parts = []
@@ -606,15 +1219,34 @@ class FeedbackUI(QMainWindow):
         self.feedback_result = FeedbackResult(
             cursor_usage_opt=final_feedback,
         )
+        if self.attachment_bar.attachments:
+            self.feedback_result['attachments'] = self.attachment_bar.attachments
         self.close()
 
+    @property
+    def settings(self) -> QSettings:
+        """QSettings按需创建，启动缓存命中时不需要读取配置文件"""
+        if self._settings is None:
+            self._settings = QSettings("InteractiveFeedbackMCP", "InteractiveFeedbackMCP")
+        return self._settings
+
     def closeEvent(self, event):
+        if isinstance(self._render_task, MarkdownStreamTask):
+            self._render_task.cancelled = True
+
         # Save general UI settings for the main window (geometry, state)
+        geometry = self.saveGeometry()
+        state = self.saveState()
         self.settings.beginGroup("MainWindow_General")
-        self.settings.setValue("geometry", self.saveGeometry())
-        self.settings.setValue("windowState", self.saveState())
+        self.settings.setValue("geometry", geometry)
+        self.settings.setValue("windowState", state)
         self.settings.endGroup()
 
+        self.startup_cache['geometry'] = bytes(geometry.toBase64()).decode('ascii')
+        self.startup_cache['window_state'] = bytes(state.toBase64()).decode('ascii')
+        self.startup_cache['font_family'] = QFontInfo(ui_font(22)).family()
+        save_startup_cache(self.startup_cache)
+
         super().closeEvent(event)
 
     def run(self) -> FeedbackResult:
@@ -626,41 +1258,220 @@ class FeedbackUI(QMainWindow):
 
         return self.feedback_result
 
-def feedback_ui(prompt: str, predefined_options: Optional[List[str]] = None, output_file: Optional[str] = None) -> Optional[FeedbackResult]:
+class HistoryDialog(QDialog):
+    """搜索以前的回答，双击（或回车）选中的回答插入到回答框"""
+    answer_chosen = Signal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("🕘 历史回答")
+        self.resize(560, 420)
+        layout = QVBoxLayout(self)
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("搜索以前的回答...")
+        self.result_list = QListWidget()
+        self.result_list.setWordWrap(True)
+        self.result_list.setAlternatingRowColors(True)
+        self.status_label = QLabel()
+        layout.addWidget(self.search_edit)
+        layout.addWidget(self.result_list)
+        layout.addWidget(self.status_label)
+
+        # 输入停顿后再搜索，连续输入时不重复查询
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(150)
+        self._search_timer.timeout.connect(self._search)
+        self.search_edit.textChanged.connect(self._search_timer.start)
+        self.result_list.itemActivated.connect(self._choose)
+        self._search()
+
+    def _search(self):
+        from history import get_history_store
+        started_at = time.perf_counter()
+        query = self.search_edit.text()
+        results = get_history_store().search(query)
+        elapsed_ms = (time.perf_counter() - started_at) * 1000
+        self.result_list.clear()
+        for result in results:
+            item = QListWidgetItem(f"{result['prompt']}\n→ {result['answer']}")
+            item.setData(Qt.UserRole, result['answer'])
+            item.setToolTip(result['prompt'])
+            self.result_list.addItem(item)
+        if results:
+            self.status_label.setText(f"{len(results)} 条结果（{elapsed_ms:.1f} ms）")
+        else:
+            self.status_label.setText("没有找到匹配的回答" if query else "还没有历史回答")
+
+    def _choose(self, item: QListWidgetItem):
+        self.answer_chosen.emit(item.data(Qt.UserRole))
+        self.accept()
+
+class QuestionPanel(QGroupBox):
+    """批量提问中的单个问题：问题描述、预定义选项和回答框"""
+    def __init__(self, question: dict, index: int, total: int, renderer, parent=None):
+        super().__init__(f"问题 {index + 1} / {total}", parent)
+        self.question = question['question']
+        self.options = question.get('predefined_options') or []
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(16, 20, 16, 16)
+        layout.setSpacing(10)
+
+        # 问题通常很短，分级渲染的纯文本路径只需几微秒，直接在主线程渲染
+        browser = QTextBrowser()
+        browser.setObjectName("descriptionBrowser")
+        browser.setOpenExternalLinks(True)
+        browser.setFont(ui_font(22))
+        browser.document().setDefaultStyleSheet(MARKDOWN_STYLESHEET)
+        browser.setHtml(renderer.render(self.question))
+        browser.setMinimumHeight(80)
+        browser.setMaximumHeight(240)
+        layout.addWidget(browser)
+
+        self.option_checkboxes = []
+        self.option_list = None
+        if len(self.options) > VIRTUAL_OPTIONS_THRESHOLD:
+            self.option_list = OptionList(self.options)
+            layout.addWidget(self.option_list)
+        else:
+            for option in self.options:
+                checkbox = QCheckBox(option)
+                checkbox.setFont(ui_font(22))
+                self.option_checkboxes.append(checkbox)
+                layout.addWidget(checkbox)
+
+        self.feedback_text = FeedbackTextEdit()
+        self.feedback_text.setPlaceholderText("请输入对该问题的回答...")
+        self.feedback_text.suggestion_prompt = self.question
+        self.feedback_text.setMinimumHeight(4 * self.feedback_text.fontMetrics().height() + 20)
+        layout.addWidget(self.feedback_text)
+
+        # 每个问题单独的附件，随该问题的回答返回
+        self.attachment_bar = AttachmentBar(self.feedback_text)
+        layout.addWidget(self.attachment_bar)
+
+    def answer(self) -> BatchAnswer:
+        if self.option_list is not None:
+            selected = self.option_list.selected()
+        else:
+            selected = [self.options[i] for i, checkbox in enumerate(self.option_checkboxes) if checkbox.isChecked()]
+        answer = BatchAnswer(question=self.question, selected_options=selected,
+                             feedback=self.feedback_text.toPlainText().strip())
+        if self.attachment_bar.attachments:
+            answer['attachments'] = self.attachment_bar.attachments
+        return answer
+
+class BatchFeedbackUI(FeedbackUI):
+    """批量提问窗口：所有问题放在同一个可滚动表单中，一次提交全部回答"""
+    def __init__(self, questions: List[dict], startup_cache: Optional[dict] = None, exit_when_ready: bool = False):
+        self.questions = questions
+        self.question_panels = []
+        super().__init__("", None, startup_cache, exit_when_ready)
+
+    def _create_ui(self):
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+
+        layout = QVBoxLayout(central_widget)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(16)
+
+        container = QWidget()
+        container_layout = QVBoxLayout(container)
+        container_layout.setContentsMargins(0, 0, 0, 0)
+        container_layout.setSpacing(16)
+        for index, question in enumerate(self.questions):
+            panel = QuestionPanel(question, index, len(self.questions), self.renderer)
+            panel.feedback_text.textChanged.connect(self._on_user_typing)
+            panel.attachment_bar.message.connect(lambda text: self.statusBar().showMessage(text, 5000))
+            self.question_panels.append(panel)
+            container_layout.addWidget(panel)
+        container_layout.addStretch()
+
+        scroll_area = QScrollArea()
+        scroll_area.setWidgetResizable(True)
+        scroll_area.setFrameShape(QFrame.NoFrame)
+        scroll_area.setWidget(container)
+        layout.addWidget(scroll_area)
+
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        button_layout.addWidget(self._create_history_button())
+        submit_button = QPushButton("🚀 发送反馈")
+        submit_button.clicked.connect(self._submit_feedback)
+        submit_button.setShortcut("Ctrl+Return")
+        submit_button.setDefault(True)
+        button_layout.addWidget(submit_button)
+        layout.addLayout(button_layout)
+
+    def _history_target(self) -> QTextEdit:
+        focused = QApplication.focusWidget()
+        return focused if isinstance(focused, FeedbackTextEdit) else self.question_panels[0].feedback_text
+
+    def _submit_feedback(self):
+        self.feedback_result = BatchFeedbackResult(answers=[panel.answer() for panel in self.question_panels])
+        self.close()
+
+    def run(self) -> BatchFeedbackResult:
+        self.show()
+        QApplication.instance().exec()
+
+        if not self.feedback_result:
+            # 未提交直接关闭窗口：每个问题都返回空回答
+            return BatchFeedbackResult(answers=[
+                BatchAnswer(question=question['question'], selected_options=[], feedback="") for question in self.questions
+            ])
+
+        return self.feedback_result
+
+def feedback_ui(prompt: str, predefined_options: Optional[List[str]] = None, output_file: Optional[str] = None,
+                benchmark: bool = False, questions: Optional[List[dict]] = None, pending: int = 0,
+                status_file: Optional[str] = None, deadline: Optional[float] = None,
+                default_answer: Optional[str] = None) -> Optional[FeedbackResult]:
+    startup_cache = load_startup_cache()
+    set_ui_font_family(startup_cache.get('font_family'))
+
     # 设置环境变量以支持Wayland下的中文输入法
-    # 强制设置中文输入法环境变量
-    if os.environ.get('WAYLAND_DISPLAY'):
-        # Wayland 环境
-        os.environ['QT_IM_MODULE'] = 'wayland'
-        os.environ['XMODIFIERS'] = '@im=fcitx5'
-        os.environ['GTK_IM_MODULE'] = 'fcitx5'
-        os.environ['QT_QPA_PLATFORM'] = 'wayland'
-    else:
-        # X11 环境
-        os.environ['QT_IM_MODULE'] = 'fcitx5'
-        os.environ['XMODIFIERS'] = '@im=fcitx5'
-        os.environ['GTK_IM_MODULE'] = 'fcitx5'
-        os.environ['QT_QPA_PLATFORM'] = 'xcb'
+    # 强制设置中文输入法环境变量（解析结果会缓存到下次启动）
+    qt_environment = resolve_qt_environment(startup_cache)
+    # 无界面基准测试时保留 offscreen 平台
+    headless = os.environ.get('QT_QPA_PLATFORM') == 'offscreen'
+    for key, value in qt_environment.items():
+        if key == 'QT_QPA_PLATFORM' and headless:
+            continue
+        os.environ[key] = value
 
     # 强制设置locale
     os.environ['LANG'] = 'zh_CN.UTF-8'
     os.environ['LC_ALL'] = 'zh_CN.UTF-8'
     os.environ['QT_AUTO_SCREEN_SCALE_FACTOR'] = '1'
 
-    app = QApplication.instance() or QApplication()
-
-    # 确保应用程序支持输入法
-    app.setAttribute(Qt.AA_EnableHighDpiScaling, True)
-    app.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
-
-    # 强制启用输入法
-    app.inputMethod().reset()
+    app = QApplication.instance() or (FrameTimingApplication() if profile_enabled('frames') else QApplication())
 
     app.setPalette(get_apple_dark_palette(app))
     app.setStyle("Fusion")
-    ui = FeedbackUI(prompt, predefined_options)
+    if questions:
+        ui = BatchFeedbackUI(questions, startup_cache, exit_when_ready=benchmark)
+    else:
+        ui = FeedbackUI(prompt, predefined_options, startup_cache, exit_when_ready=benchmark)
+    ui.status_file = status_file
+    if pending:
+        # 其他请求在排队，回答完当前问题后会立即显示下一个
+        ui.setWindowTitle(f"{ui.windowTitle()}（还有 {pending} 个请求排队）")
+    if deadline is not None:
+        ui.start_countdown(deadline, default_answer)
     result = ui.run()
 
+    if benchmark:
+        print(json.dumps(ui.timings))
+        return None
+
+    if isinstance(app, FrameTimingApplication):
+        write_report("feedback_ui-frames", app.frame_report())
+    if get_profile_kinds():
+        write_report("feedback_ui-startup", ui.timings)
+
     if output_file and result:
         # Ensure the directory exists
         os.makedirs(os.path.dirname(output_file) if os.path.dirname(output_file) else ".", exist_ok=True)
@@ -676,11 +1487,30 @@ if __name__ == "__main__":
     parser.add_argument("--prompt", default="我已经实现了您请求的更改。", help="向用户显示的提示信息")
     parser.add_argument("--predefined-options", default="", help="预定义选项列表，用|||分隔")
     parser.add_argument("--output-file", help="将反馈结果保存为JSON文件的路径")
+    parser.add_argument("--benchmark", action="store_true", help="窗口显示且内容渲染完成后立即退出，输出启动耗时（JSON）")
+    parser.add_argument("--questions-file", help="批量提问：包含问题列表的JSON文件路径，指定后忽略 --prompt")
+    parser.add_argument("--pending", type=int, default=0, help="排在当前请求之后的请求数量")
+    parser.add_argument("--parent-pid", type=int, help="启动本进程的MCP服务器PID，该进程退出时本进程随之退出")
+    parser.add_argument("--status-file", help="写入界面进度（窗口已打开、用户正在输入）的文件路径")
+    parser.add_argument("--deadline", type=float, help="等待上限（Unix时间戳），用于显示倒计时")
+    parser.add_argument("--default-answer", help="超时后使用的默认回答，显示在倒计时中")
     args = parser.parse_args()
 
-    predefined_options = [opt for opt in args.predefined_options.split("|||") if opt] if args.predefined_options else None
+    if args.parent_pid:
+        from lifecycle import bind_to_parent, register_session
+        bind_to_parent(args.parent_pid)
+        register_session("gui", args.parent_pid)
 
-    result = feedback_ui(args.prompt, predefined_options, args.output_file)
+    predefined_options = [opt for opt in args.predefined_options.split("|||") if opt] if args.predefined_options else None
+    questions = None
+    if args.questions_file:
+        with open(args.questions_file, 'r', encoding='utf-8') as f:
+            questions = json.load(f)
+
+    with ProfileSession("feedback_ui"):
+        result = feedback_ui(args.prompt, predefined_options, args.output_file, benchmark=args.benchmark, questions=questions,
+                             pending=args.pending, status_file=args.status_file,
+                             deadline=args.deadline, default_answer=args.default_answer)
     if result:
-        print(f"\n收到反馈:\n{result['cursor_usage_opt']}")
+        print(f"\n收到反馈:\n{json.dumps(result, ensure_ascii=False, indent=2) if 'answers' in result else result['cursor_usage_opt']}")
     sys.exit(0)
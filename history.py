@@ -0,0 +1,276 @@
+# Feedback history store for Interactive Feedback MCP
+# 用户的每次回答都记录到本地 SQLite 数据库（WAL 模式，只追加），界面中可以搜索并复用以前的回答。
+# 写入由后台线程批量提交，不阻塞工具调用的返回；数据库进程崩溃时最多丢失最后一批尚未提交的记录。
+# 搜索使用 FTS5 trigram 索引（支持中文子串），返回条数和每条记录的长度都有上限，
+# 历史记录再多，内存占用也保持不变。
+#
+# FEEDBACK_HISTORY      设为 0 时不记录历史，默认记录
+# FEEDBACK_HISTORY_DB   数据库路径，默认为 ~/.cursor-usage-opt/history.sqlite3
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import hashlib
+import sqlite3
+import threading
+from typing import List, Optional
+
+from lifecycle import ensure_private_dir
+
+# 后台线程每批最多写入的记录数和两批之间的最长等待时间（秒）
+BATCH_SIZE = 64
+FLUSH_INTERVAL = 0.5
+
+# 等待写入的记录上限，数据库长时间不可写时丢弃新记录而不是无限占用内存
+MAX_PENDING = 1024
+
+# 搜索结果的条数上限，以及每条结果中问题和回答保留的字符数
+MAX_RESULTS = 50
+MAX_TEXT_LENGTH = 500
+
+# trigram 索引按三个字符切分，更短的查询改用 LIKE 匹配
+MIN_FTS_QUERY_LENGTH = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    workspace TEXT,
+    prompt_hash TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    options TEXT,
+    answer TEXT NOT NULL,
+    auto_resolved INTEGER NOT NULL DEFAULT 0,
+    queue_ms REAL,
+    answer_ms REAL
+);
+CREATE INDEX IF NOT EXISTS feedback_prompt_hash ON feedback(prompt_hash);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS feedback_fts USING fts5(
+    prompt, answer, content='feedback', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS feedback_fts_insert AFTER INSERT ON feedback BEGIN
+    INSERT INTO feedback_fts(rowid, prompt, answer) VALUES (new.id, new.prompt, new.answer);
+END;
+"""
+
+def history_enabled() -> bool:
+    """检查 FEEDBACK_HISTORY 环境变量"""
+    return os.environ.get('FEEDBACK_HISTORY', '1').lower() not in ('0', 'false', 'no', 'off')
+
+def get_history_path() -> str:
+    """读取 FEEDBACK_HISTORY_DB 环境变量"""
+    return os.environ.get('FEEDBACK_HISTORY_DB') or os.path.join(os.path.expanduser('~'), '.cursor-usage-opt', 'history.sqlite3')
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-2000")  # 页缓存上限约 2 MB
+    return conn
+
+def _make_private(path: str):
+    """数据库只有当前用户可以读写：目录为 0700，数据库文件为 0600（WAL 和共享内存文件沿用数据库文件的权限）"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        ensure_private_dir(directory)
+    os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+    if os.name == 'posix':
+        for name in (path, path + '-wal', path + '-shm'):
+            try:
+                if os.stat(name).st_mode & 0o077:
+                    os.chmod(name, 0o600)
+            except FileNotFoundError:
+                pass
+
+def _open_database(path: str) -> tuple:
+    """打开（必要时创建）数据库，返回连接和是否支持全文索引"""
+    _make_private(path)
+    conn = _connect(path)
+    conn.executescript(SCHEMA)
+    try:
+        conn.executescript(FTS_SCHEMA)
+        fts = True
+    except sqlite3.OperationalError:
+        fts = False  # SQLite 编译时没有 FTS5 或 trigram（早于 3.34），搜索退回到 LIKE
+    conn.commit()
+    return conn, fts
+
+def _has_fts(conn: sqlite3.Connection) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'feedback_fts'").fetchone() is not None
+
+def result_entries(request: dict, result: dict) -> List[dict]:
+    """把一次请求及其结果拆成历史记录（批量提问每个问题一条）"""
+    auto_resolved = bool(result.get('auto_resolved'))
+    if request.get('questions'):
+        entries = []
+        for question, answer in zip(request['questions'], result.get('answers') or []):
+            parts = list(answer.get('selected_options') or [])
+            if answer.get('feedback'):
+                parts.append(answer['feedback'])
+            entries.append({'prompt': question['question'], 'options': question['predefined_options'],
+                            'answer': "\n\n".join(parts), 'auto_resolved': auto_resolved})
+        return entries
+    return [{'prompt': request['summary'], 'options': request.get('predefined_options') or [],
+             'answer': result.get('cursor_usage_opt', ''), 'auto_resolved': auto_resolved}]
+
+class HistoryStore:
+    """历史记录：record() 只把记录放入队列，由后台线程批量写入；search() 直接读取数据库"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or get_history_path()
+        self._queue = queue.Queue(maxsize=MAX_PENDING)
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._local = threading.local()
+        self.dropped = 0
+
+    def record(self, request: dict, result: dict, workspace: str = '',
+               queue_ms: Optional[float] = None, answer_ms: Optional[float] = None):
+        """记录一次回答（不等待写入完成）"""
+        if not history_enabled():
+            return
+        now = time.time()
+        for entry in result_entries(request, result):
+            if not entry['answer']:
+                continue  # 用户关闭界面没有回答
+            row = (now, workspace, prompt_hash(entry['prompt']), entry['prompt'],
+                   json.dumps(entry['options'], ensure_ascii=False), entry['answer'],
+                   int(entry['auto_resolved']), queue_ms, answer_ms)
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                self.dropped += 1
+        self._ensure_writer()
+
+    def _ensure_writer(self):
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="feedback-history", daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+
+    def _write_loop(self):
+        try:
+            conn, _ = _open_database(self.path)
+        except (OSError, sqlite3.Error) as e:
+            print(f"⚠️ 无法打开历史记录数据库: {e}", file=sys.stderr)
+            return
+        while True:
+            rows = [self._queue.get()]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(rows) < BATCH_SIZE:
+                try:
+                    rows.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO feedback (created_at, workspace, prompt_hash, prompt, options, answer,"
+                        " auto_resolved, queue_ms, answer_ms) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            except sqlite3.Error as e:
+                print(f"⚠️ 写入历史记录失败: {e}", file=sys.stderr)
+            finally:
+                for _ in rows:
+                    self._queue.task_done()
+
+    def flush(self, timeout: float = 2.0):
+        """等待队列中的记录写入（进程退出前调用）"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.02)
+
+    def _reader(self) -> Optional[sqlite3.Connection]:
+        """每个线程一个只读连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if not os.path.exists(self.path):
+                return None
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=5.0)
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'feedback'").fetchone() is None:
+                conn.close()  # 写入线程刚创建文件，还没有建表，下次再连接
+                return None
+            conn.execute("PRAGMA cache_size=-2000")
+            self._local.conn = conn
+            self._local.fts = False
+        if not self._local.fts:
+            # 读取连接可能早于写入线程创建全文索引，没有索引时每次重新检查
+            self._local.fts = _has_fts(conn)
+        return conn
+
+    def search(self, query: str = '', limit: int = 20) -> List[dict]:
+        """搜索以前的回答，最近的在前
+
+        按 rowid 倒序时全文索引找到 limit 条结果即可停止；按相关度排序需要给全部匹配的记录打分，
+        常见词在大量历史中可能匹配数十万条。
+        """
+        limit = max(1, min(int(limit), MAX_RESULTS))
+        query = (query or '').strip()
+        try:
+            conn = self._reader()
+            if conn is None:
+                return []
+            columns = ("f.id, f.created_at, f.workspace, substr(f.prompt, 1, ?), f.options,"
+                       " substr(f.answer, 1, ?), f.auto_resolved")
+            if not query:
+                rows = conn.execute(f"SELECT {columns} FROM feedback f ORDER BY f.id DESC LIMIT ?",
+                                    (MAX_TEXT_LENGTH, MAX_TEXT_LENGTH, limit)).fetchall()
+            elif self._local.fts and len(query) >= MIN_FTS_QUERY_LENGTH:
+                phrase = '"' + query.replace('"', '""') + '"'
+                rows = conn.execute(
+                    f"SELECT {columns} FROM feedback_fts JOIN feedback f ON f.id = feedback_fts.rowid"
+                    " WHERE feedback_fts MATCH ? ORDER BY feedback_fts.rowid DESC LIMIT ?",
+                    (MAX_TEXT_LENGTH, MAX_TEXT_LENGTH, phrase, limit)).fetchall()
+            else:
+                pattern = "%" + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + "%"
+                rows = conn.execute(
+                    f"SELECT {columns} FROM feedback f WHERE f.prompt LIKE ? ESCAPE '\\' OR f.answer LIKE ? ESCAPE '\\'"
+                    " ORDER BY f.id DESC LIMIT ?",
+                    (MAX_TEXT_LENGTH, MAX_TEXT_LENGTH, pattern, pattern, limit)).fetchall()
+        except sqlite3.Error as e:
+            print(f"⚠️ 搜索历史记录失败: {e}", file=sys.stderr)
+            return []
+        return [{
+            'id': row[0],
+            'created_at': row[1],
+            'workspace': row[2],
+            'prompt': row[3],
+            'options': json.loads(row[4] or '[]'),
+            'answer': row[5],
+            'auto_resolved': bool(row[6]),
+        } for row in rows]
+
+    def recent_answers(self, limit: int, max_length: int) -> List[tuple]:
+        """最近 limit 条不长于 max_length 的回答及其问题，从旧到新（用于回答建议）"""
+        try:
+            conn = self._reader()
+            if conn is None:
+                return []
+            rows = conn.execute(
+                "SELECT substr(prompt, 1, ?), answer FROM feedback WHERE length(answer) <= ?"
+                " ORDER BY id DESC LIMIT ?", (MAX_TEXT_LENGTH, max_length, limit)).fetchall()
+        except sqlite3.Error as e:
+            print(f"⚠️ 读取历史记录失败: {e}", file=sys.stderr)
+            return []
+        rows.reverse()
+        return rows
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_history_store() -> HistoryStore:
+    """进程内共用的历史记录"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HistoryStore()
+        return _store
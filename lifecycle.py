@@ -0,0 +1,208 @@
+# Process lifecycle helpers for Interactive Feedback MCP
+# 界面子进程（web_ui.py / feedback_ui.py）与启动它的MCP服务器进程绑定：服务器进程退出
+# （例如 Cursor 重启时被强制结束）后子进程随之退出，不会继续占用端口 8080。
+# 每个子进程在运行目录中登记一条会话记录，服务器启动时据此清理上一个实例遗留的进程。
+# 子进程还通过状态文件向服务器报告界面进度（页面已打开、用户正在输入），用于进度心跳。
+# 运行目录（会话记录、进程间锁、代理套接字）只属于当前用户（权限 0700），同一台机器上的其他用户
+# 无法写入会话记录让服务器结束别人的进程，也无法抢先创建代理套接字接收问题。
+#
+# FEEDBACK_RUNTIME_DIR   运行目录，默认为 $XDG_RUNTIME_DIR/cursor-usage-opt，没有该变量时为 ~/.cursor-usage-opt/run
+import os
+import sys
+import json
+import time
+import atexit
+import stat
+import signal
+import subprocess
+import threading
+from typing import List, Optional
+
+# 子进程检查父进程是否存活的间隔（秒）
+PARENT_POLL_INTERVAL = 1.0
+
+# 界面子进程的脚本名，清理前用于确认PID没有被无关进程复用
+UI_SCRIPTS = ('web_ui.py', 'feedback_ui.py')
+
+def get_runtime_dir() -> str:
+    """获取运行目录（不存在时自动创建），确认只有当前用户可以访问"""
+    runtime_dir = os.environ.get('FEEDBACK_RUNTIME_DIR')
+    if not runtime_dir:
+        xdg_runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+        if xdg_runtime_dir:
+            runtime_dir = os.path.join(xdg_runtime_dir, 'cursor-usage-opt')
+        else:
+            runtime_dir = os.path.join(os.path.expanduser('~'), '.cursor-usage-opt', 'run')
+    os.makedirs(runtime_dir, mode=0o700, exist_ok=True)
+    ensure_private_dir(runtime_dir)
+    return runtime_dir
+
+def ensure_private_dir(path: str):
+    """确认目录属于当前用户且其他用户无法访问；权限过宽时收紧，属于其他用户时抛出 PermissionError"""
+    if os.name != 'posix':
+        return
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        raise PermissionError(f"{path} is not a directory owned by the current user")
+    if info.st_mode & 0o077:
+        os.chmod(path, 0o700)
+
+def owned_by_current_user(path: str) -> bool:
+    """文件是否属于当前用户（非 POSIX 平台总是返回 True）"""
+    if os.name != 'posix':
+        return True
+    try:
+        return os.lstat(path).st_uid == os.getuid()
+    except OSError:
+        return False
+
+def pid_alive(pid: int) -> bool:
+    """检查进程是否存在"""
+    if pid <= 0:
+        return False
+    if sys.platform == 'win32':
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        exit_code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+        kernel32.CloseHandle(handle)
+        return exit_code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _process_command(pid: int) -> Optional[str]:
+    """读取进程的命令行，无法读取时返回None"""
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            return f.read().replace(b'\0', b' ').decode('utf-8', 'replace')
+    except OSError:
+        pass
+    if sys.platform == 'win32':
+        return None
+    try:
+        return subprocess.run(['ps', '-p', str(pid), '-o', 'command='], capture_output=True, text=True, timeout=2).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def _exit_on_parent_death():
+    os.kill(os.getpid(), signal.SIGTERM)
+
+def bind_to_parent(parent_pid: int):
+    """父进程退出时结束当前进程
+
+    Linux 上通过 PR_SET_PDEATHSIG 由内核发送SIGTERM；其他平台（以及作为补充）由后台线程定期检查父进程。
+    """
+    if sys.platform.startswith('linux'):
+        try:
+            import ctypes
+            libc = ctypes.CDLL(None, use_errno=True)
+            libc.prctl(1, signal.SIGTERM)  # PR_SET_PDEATHSIG
+        except (OSError, AttributeError):
+            pass
+
+    def watch():
+        while True:
+            if not pid_alive(parent_pid) or (os.name == 'posix' and os.getppid() != parent_pid):
+                _exit_on_parent_death()
+                return
+            time.sleep(PARENT_POLL_INTERVAL)
+
+    # 设置PDEATHSIG之前父进程可能已经退出，先检查一次
+    if not pid_alive(parent_pid) or (os.name == 'posix' and os.getppid() != parent_pid):
+        _exit_on_parent_death()
+    threading.Thread(target=watch, name="parent-watchdog", daemon=True).start()
+
+def register_session(kind: str, parent_pid: int, port: Optional[int] = None) -> Optional[str]:
+    """登记当前界面进程，正常退出时删除记录；运行目录不可用时只打印警告，界面照常运行"""
+    record = {'kind': kind, 'pid': os.getpid(), 'parent_pid': parent_pid, 'port': port, 'started_at': time.time()}
+    try:
+        path = os.path.join(get_runtime_dir(), f"{kind}-{os.getpid()}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(record, f)
+    except OSError as e:
+        print(f"⚠️ 无法登记界面进程: {e}", file=sys.stderr)
+        return None
+
+    def remove():
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+    atexit.register(remove)
+    return path
+
+def write_status_file(path: str, state: str):
+    """原子地写入界面进度状态，服务器发送进度心跳时读取"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'state': state, 'at': time.time()}, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+def _terminate(pid: int):
+    """结束遗留的界面进程及其进程组（包括渲染进程池）"""
+    try:
+        if os.name == 'posix':
+            try:
+                os.killpg(pid, signal.SIGTERM)
+            except (ProcessLookupError, PermissionError):
+                os.kill(pid, signal.SIGTERM)
+        else:
+            os.kill(pid, signal.SIGTERM)
+    except OSError:
+        return
+    deadline = time.monotonic() + 2.0
+    while pid_alive(pid) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    if pid_alive(pid) and os.name == 'posix':
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+def sweep_stale_sessions() -> List[dict]:
+    """清理父进程已经退出的界面进程和失效的记录，返回被结束的进程记录"""
+    reclaimed = []
+    try:
+        runtime_dir = get_runtime_dir()
+        names = os.listdir(runtime_dir)
+    except OSError as e:
+        print(f"⚠️ 无法读取运行目录: {e}", file=sys.stderr)
+        return reclaimed
+    for name in names:
+        if not name.endswith('.json'):
+            continue
+        path = os.path.join(runtime_dir, name)
+        if not owned_by_current_user(path):
+            continue  # 不是当前用户写入的记录，不能据此结束进程
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+            pid = int(record['pid'])
+            parent_pid = int(record['parent_pid'])
+        except (OSError, ValueError, KeyError, TypeError):
+            continue
+
+        if pid_alive(pid):
+            if pid_alive(parent_pid):
+                continue  # 其他仍在运行的MCP服务器的界面
+            # 只结束确认是界面脚本的进程；PID已被无关进程复用（或无法确认）时只删除记录
+            command = _process_command(pid)
+            if command is not None and any(script in command for script in UI_SCRIPTS):
+                _terminate(pid)
+                reclaimed.append(record)
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+    return reclaimed
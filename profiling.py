@@ -0,0 +1,197 @@
+# Profiling hooks for Interactive Feedback MCP UI processes
+# 界面子进程由 server.py 启动且输出被丢弃，这里通过环境变量开启性能采集，
+# 结果写入指定目录，便于复现和诊断用户报告的性能问题
+#
+# FEEDBACK_PROFILE       逗号分隔的采集项: cprofile, tracemalloc, frames, render, queue (或 all)
+# FEEDBACK_PROFILE_DIR   输出目录，默认为系统临时目录下的 cursor-usage-opt-profiles
+# FEEDBACK_PROFILE_TOP   tracemalloc 报告中保留的条目数，默认 25
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Optional, List, Dict
+
+PROFILE_KINDS = ('cprofile', 'tracemalloc', 'frames', 'render', 'queue')
+
+def get_profile_kinds() -> set:
+    """读取 FEEDBACK_PROFILE 环境变量，返回启用的采集项"""
+    raw = os.environ.get('FEEDBACK_PROFILE', '').strip().lower()
+    if not raw:
+        return set()
+    kinds = {kind.strip() for kind in raw.split(',') if kind.strip()}
+    if 'all' in kinds or '1' in kinds:
+        return set(PROFILE_KINDS)
+    return kinds & set(PROFILE_KINDS)
+
+def profile_enabled(kind: str) -> bool:
+    """检查某个采集项是否启用"""
+    return kind in get_profile_kinds()
+
+def get_profile_dir() -> str:
+    """获取性能数据输出目录（不存在时自动创建）"""
+    profile_dir = os.environ.get('FEEDBACK_PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'cursor-usage-opt-profiles')
+    os.makedirs(profile_dir, exist_ok=True)
+    return profile_dir
+
+def profile_path(name: str, suffix: str) -> str:
+    """生成输出文件路径: <目录>/<名称>-<时间>-<pid><后缀>"""
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    return os.path.join(get_profile_dir(), f"{name}-{stamp}-{os.getpid()}{suffix}")
+
+def write_report(name: str, data: dict) -> Optional[str]:
+    """将 JSON 格式的性能报告写入输出目录"""
+    try:
+        path = profile_path(name, '.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        print(f"📊 性能报告已写入: {path}", file=sys.stderr)
+        return path
+    except OSError as e:
+        print(f"⚠️ 写入性能报告失败: {e}", file=sys.stderr)
+        return None
+
+def summarize_durations(durations: List[float]) -> Dict[str, float]:
+    """计算耗时列表的统计信息（毫秒）"""
+    if not durations:
+        return {'count': 0, 'total_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+    ordered = sorted(durations)
+    return {
+        'count': len(ordered),
+        'total_ms': round(sum(ordered), 3),
+        'p50_ms': round(ordered[len(ordered) // 2], 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        'max_ms': round(ordered[-1], 3),
+    }
+
+def current_rss_kb() -> Optional[int]:
+    """当前进程的常驻内存（KiB），无法读取时返回None"""
+    try:
+        with open('/proc/self/status', 'r', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # 没有 /proc 时退回到峰值内存：macOS 上单位是字节，Linux 上是 KiB
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+class ProfileSession:
+    """进程级性能采集会话，按 FEEDBACK_PROFILE 启用 cProfile 和 tracemalloc
+
+    cProfile 只能采集启用它的线程，Web 模式下的请求线程可通过 profile_thread() 单独采集，
+    退出时所有线程的数据会合并到同一个 .prof 文件中。
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        kinds = get_profile_kinds()
+        self.cprofile_enabled = 'cprofile' in kinds
+        self.tracemalloc_enabled = 'tracemalloc' in kinds
+        self._profiles = []
+        self._lock = threading.Lock()
+        self._main_profile = None
+
+    @property
+    def active(self) -> bool:
+        return self.cprofile_enabled or self.tracemalloc_enabled
+
+    def start(self):
+        if self.tracemalloc_enabled:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(25)
+        if self.cprofile_enabled:
+            import cProfile
+            self._main_profile = cProfile.Profile()
+            self._main_profile.enable()
+
+    @contextmanager
+    def profile_thread(self):
+        """在当前线程中采集一段代码（例如一次 Flask 请求）"""
+        if not self.cprofile_enabled:
+            yield
+            return
+        import cProfile
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                self._profiles.append(profile)
+
+    def stop(self):
+        if self._main_profile is not None:
+            self._main_profile.disable()
+            with self._lock:
+                self._profiles.insert(0, self._main_profile)
+            self._main_profile = None
+        if self.cprofile_enabled:
+            self._dump_cprofile()
+        if self.tracemalloc_enabled:
+            self._dump_tracemalloc()
+
+    def _dump_cprofile(self):
+        import pstats
+        with self._lock:
+            profiles, self._profiles = self._profiles, []
+        if not profiles:
+            return
+        try:
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            path = profile_path(self.name, '.prof')
+            stats.dump_stats(path)
+            print(f"📊 cProfile 数据已写入: {path}", file=sys.stderr)
+        except (OSError, TypeError) as e:
+            print(f"⚠️ 写入 cProfile 数据失败: {e}", file=sys.stderr)
+
+    def _dump_tracemalloc(self):
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            return
+        try:
+            top_n = int(os.environ.get('FEEDBACK_PROFILE_TOP', '25'))
+        except ValueError:
+            top_n = 25
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        lines = [
+            f"# tracemalloc report for {self.name} (pid {os.getpid()})",
+            f"# current: {current / 1024:.1f} KiB, peak: {peak / 1024:.1f} KiB",
+            "",
+        ]
+        for index, stat in enumerate(snapshot.statistics('lineno')[:top_n], 1):
+            frame = stat.traceback[0]
+            lines.append(f"#{index}: {frame.filename}:{frame.lineno}: {stat.size / 1024:.1f} KiB ({stat.count} blocks)")
+        try:
+            path = profile_path(self.name, '-tracemalloc.txt')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write("\n".join(lines) + "\n")
+            print(f"📊 tracemalloc 报告已写入: {path}", file=sys.stderr)
+        except OSError as e:
+            print(f"⚠️ 写入 tracemalloc 报告失败: {e}", file=sys.stderr)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
@@ -0,0 +1,586 @@
+# Markdown rendering shared by the GUI and Web UIs
+# 按块渲染Markdown：文档在空行处切分成稳定ID的块，内容更新时只需要重新渲染和传输变化的块
+# 分级渲染：纯文本直接转义，简单Markdown使用轻量扩展，只有代码块和表格才加载Pygments
+# 大文档的块交给进程池并行渲染，单个块超时后回退为转义的纯文本
+#
+# FEEDBACK_RENDER_WORKERS   渲染进程数，默认为 CPU 核数（最多 4 个），0 表示不使用进程池
+# FEEDBACK_RENDER_TIMEOUT   单个块的渲染超时（秒），默认 5，最小 1，从渲染进程开始渲染该块时计时
+import os
+import re
+import hashlib
+import itertools
+import time
+import threading
+import multiprocessing
+from collections import OrderedDict
+from typing import List, Tuple, Optional, Iterator, TYPE_CHECKING
+
+from profiling import profile_enabled, summarize_durations, write_report
+
+if TYPE_CHECKING:
+    import markdown
+
+TIER_PLAIN = 'plain'
+TIER_SIMPLE = 'simple'
+TIER_FULL = 'full'
+
+MARKDOWN_EXTENSIONS = [
+    'fenced_code',
+    'codehilite',
+    'tables',
+    'toc',
+    'nl2br',
+    'sane_lists'
+]
+
+MARKDOWN_EXTENSION_CONFIGS = {
+    'codehilite': {
+        'css_class': 'highlight',
+        'use_pygments': True,
+        'noclasses': True,
+        'pygments_style': 'monokai'
+    }
+}
+
+# 不含代码块和表格时使用的轻量扩展（fenced_code 和 codehilite 会导入 Pygments）
+SIMPLE_MARKDOWN_EXTENSIONS = [
+    'toc',
+    'nl2br',
+    'sane_lists'
+]
+
+# 待渲染内容超过该长度（字符数）时才使用进程池，小文档的进程通信开销大于收益
+POOL_MIN_CHARS = 20_000
+# 提交给渲染进程的每批块的长度范围
+BATCH_MIN_CHARS = 2_000
+BATCH_MAX_CHARS = 16_000
+DEFAULT_RENDER_TIMEOUT = 5.0
+# 超时下限：太短时正常的块也会因系统繁忙被判定超时
+MIN_RENDER_TIMEOUT = 1.0
+
+# 超过该长度（字符数）的文档使用流式渲染，可通过 FEEDBACK_STREAM_THRESHOLD 调整
+DEFAULT_STREAM_THRESHOLD = 100_000
+# 流式渲染时每个分片累积的HTML长度
+STREAM_CHUNK_CHARS = 64 * 1024
+
+_FENCE_RE = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+_LIST_ITEM_RE = re.compile(r'^ {0,3}([*+-]|\d+[.)])\s')
+_LIST_LINE_RE = re.compile(r'^ {0,3}(?:[*+-]|\d+[.)])\s', re.MULTILINE)
+_QUOTE_RE = re.compile(r'^ {0,3}>')
+_QUOTE_LINE_RE = re.compile(r'^ {0,3}>', re.MULTILINE)
+_REFERENCE_RE = re.compile(r'^ {0,3}\[[^\]]+\]:\s*\S+', re.MULTILINE)
+# 行首的原始HTML：注释或标签。原始HTML块可以包含空行，直到注释或元素结束才能切分
+_HTML_START_RE = re.compile(r'^ {0,3}<(!--|[A-Za-z][A-Za-z0-9-]*)')
+_VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+# toc 扩展的 [TOC] 标记需要整篇文档的标题，含有该标记的文档不切分
+_TOC_MARKER_RE = re.compile(r'^ {0,3}\[TOC\][ \t]*$', re.MULTILINE)
+# toc 扩展生成的标题ID，按块渲染后在整篇文档范围内重新去重
+_HEADING_ID_RE = re.compile(r'<h([1-6]) id="([^"]*)">')
+_ID_COUNT_RE = re.compile(r'^(.*)_([0-9]+)$')
+
+# 需要完整渲染的内容：围栏代码块、缩进代码块（codehilite 也会高亮，包括引用和列表中的）、表格转义的竖线、表格分隔行
+_FULL_RE = re.compile(r'^ {0,3}(`{3,}|~{3,})|^[ \t>*+\-\d.)]*?(?: {4}|\t)|\\\||^(?=[^\n]*\|)[ \t|:-]+$', re.MULTILINE)
+# 出现任何Markdown语法（或HTML、实体、制表符、行尾硬换行）就不能按纯文本处理
+_SYNTAX_RE = re.compile(
+    r'[\\`*\[\]<|\t]'
+    r'|&(?:#\d+|#[xX][0-9a-fA-F]+|\w+);'
+    r'|(?<!\w)_|_(?!\w)'
+    r'|^[ \t]|^(?:#|>|[-+] |\d+[.)]|=+[ \t]*$|-+[ \t]*$)'
+    r'|  $',
+    re.MULTILINE
+)
+
+def classify_markdown(text: str) -> str:
+    """粗略判断文本需要的渲染级别：plain / simple / full"""
+    if _FULL_RE.search(text):
+        return TIER_FULL
+    if _SYNTAX_RE.search(text):
+        return TIER_SIMPLE
+    return TIER_PLAIN
+
+def render_plain_text(text: str) -> str:
+    """纯文本快速路径：转义后按空行分段，段内换行转为<br />（与 nl2br 的输出一致）"""
+    escaped = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+    paragraphs = []
+    lines = []
+    for line in escaped.splitlines():
+        if line.strip():
+            lines.append(line)
+        elif lines:
+            paragraphs.append("<p>" + "<br />\n".join(lines) + "</p>")
+            lines = []
+    if lines:
+        paragraphs.append("<p>" + "<br />\n".join(lines) + "</p>")
+    return "\n".join(paragraphs)
+
+def render_fallback(text: str) -> str:
+    """渲染超时或失败时的回退：转义后原样显示"""
+    escaped = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+    return f'<pre class="render-fallback">{escaped}</pre>'
+
+def create_markdown(tier: str = TIER_FULL) -> 'markdown.Markdown':
+    """创建Markdown渲染器（实例不是线程安全的，每个线程应使用自己的实例）"""
+    import markdown
+    if tier == TIER_SIMPLE:
+        return markdown.Markdown(extensions=SIMPLE_MARKDOWN_EXTENSIONS)
+    return markdown.Markdown(
+        extensions=MARKDOWN_EXTENSIONS,
+        extension_configs=MARKDOWN_EXTENSION_CONFIGS
+    )
+
+def split_markdown_blocks(text: str) -> List[str]:
+    """在空行处把Markdown切分成块
+
+    围栏代码块内的空行不会切分；缩进的续行会并入上一个块。Python-Markdown 会把空行后的列表项
+    并入前面的列表（包括松散列表和嵌套列表），把空行后的引用并入前面的引用，
+    因此以列表项或引用开头的块在上一个块含有列表或引用时也并入上一个块。
+    原始HTML块（注释、包含空行的元素）在结束之前不切分；含有 [TOC] 标记的文档不切分。
+    多并入不会改变渲染结果，只是块变大；benchmark.py blocks 检查按块渲染与整篇渲染是否一致。
+    """
+    if _TOC_MARKER_RE.search(text):
+        return [text]
+    blocks = []
+    current = []
+    fence = None
+    comment = False  # 在HTML注释中
+    html_tag = None  # 尚未结束的HTML元素及其嵌套层数
+    html_depth = 0
+
+    def flush():
+        if not current:
+            return
+        first_line = current[0]
+        continuation = first_line[:1] in (' ', '\t')
+        list_item = _LIST_ITEM_RE.match(first_line) and _LIST_LINE_RE.search(blocks[-1]) if blocks else False
+        quote = _QUOTE_RE.match(first_line) and _QUOTE_LINE_RE.search(blocks[-1]) if blocks else False
+        if blocks and (continuation or list_item or quote):
+            blocks[-1] = blocks[-1] + '\n\n' + '\n'.join(current)
+        else:
+            blocks.append('\n'.join(current))
+        current.clear()
+
+    for line in text.splitlines():
+        if fence:
+            current.append(line)
+            match = _FENCE_RE.match(line)
+            if match and match.group(1)[0] == fence[0] and len(match.group(1)) >= len(fence) and not line.strip().strip(fence[0]):
+                fence = None
+            continue
+
+        if comment:
+            current.append(line)
+            comment = '-->' not in line
+            continue
+        if html_tag:
+            current.append(line)
+            html_depth += _html_depth_change(html_tag, line)
+            if html_depth <= 0:
+                html_tag = None
+            continue
+
+        match = _FENCE_RE.match(line)
+        html = _HTML_START_RE.match(line)
+        if match:
+            fence = match.group(1)
+            current.append(line)
+        elif html:
+            current.append(line)
+            if html.group(1) == '!--':
+                comment = '-->' not in line[html.end():]
+            elif html.group(1).lower() not in _VOID_TAGS:
+                html_depth = _html_depth_change(html.group(1).lower(), line)
+                html_tag = html.group(1).lower() if html_depth > 0 else None
+        elif line.strip():
+            current.append(line)
+        else:
+            flush()
+    flush()
+    return blocks
+
+def _html_depth_change(tag: str, line: str) -> int:
+    """一行中该元素打开次数减去关闭次数（不计自闭合的标签）"""
+    opened = len(re.findall(rf'<{tag}(?=[\s>])(?:[^>]*[^/>])?>', line, re.IGNORECASE))
+    closed = len(re.findall(rf'</{tag}\s*>', line, re.IGNORECASE))
+    return opened - closed
+
+def dedupe_heading_ids(html_content: str, used_ids: set) -> str:
+    """按块渲染时每个块各自为标题生成ID，按文档顺序用 toc 扩展的规则（追加 _1、_2...）在整篇范围内去重"""
+    def unique(match):
+        heading_id = match.group(2)
+        while heading_id in used_ids or not heading_id:
+            count = _ID_COUNT_RE.match(heading_id)
+            heading_id = f"{count.group(1)}_{int(count.group(2)) + 1}" if count else f"{heading_id}_1"
+        used_ids.add(heading_id)
+        return f'<h{match.group(1)} id="{heading_id}">'
+    return _HEADING_ID_RE.sub(unique, html_content)
+
+def prepare_blocks(text: str) -> List[Tuple[str, str]]:
+    """切分文档并分配块ID，返回 [(块ID, 可单独渲染的Markdown源码), ...]"""
+    sources = split_markdown_blocks(text)
+    # 引用式链接的定义可能在其他块中，渲染每个块时都附带上
+    references = "\n".join(match.group(0) for match in _REFERENCE_RE.finditer(text))
+    if not references:
+        return list(zip(assign_block_ids(sources), sources))
+    # 引用定义变化时块的渲染结果也会变化，因此一并计入块ID
+    block_ids = assign_block_ids([f"{source}\n{references}" for source in sources])
+    return [(block_id, f"{source}\n\n{references}") for block_id, source in zip(block_ids, sources)]
+
+def get_stream_threshold() -> int:
+    """读取流式渲染阈值，0 表示总是流式渲染"""
+    try:
+        return max(0, int(os.environ.get('FEEDBACK_STREAM_THRESHOLD', DEFAULT_STREAM_THRESHOLD)))
+    except ValueError:
+        return DEFAULT_STREAM_THRESHOLD
+
+def should_stream(text: str) -> bool:
+    """判断文档是否需要流式渲染"""
+    return bool(text) and len(text) > get_stream_threshold()
+
+def assign_block_ids(items: List[str]) -> List[str]:
+    """为每个块（或选项）生成稳定ID：内容哈希 + 相同内容的出现序号"""
+    seen = {}
+    ids = []
+    for item in items:
+        digest = hashlib.sha1(item.encode('utf-8')).hexdigest()[:12]
+        count = seen.get(digest, 0)
+        seen[digest] = count + 1
+        ids.append(f"{digest}-{count}")
+    return ids
+
+def get_render_workers() -> int:
+    """读取渲染进程数"""
+    default = min(4, os.cpu_count() or 1)
+    try:
+        return max(0, int(os.environ.get('FEEDBACK_RENDER_WORKERS', default)))
+    except ValueError:
+        return default
+
+def get_render_timeout() -> float:
+    """读取单个块的渲染超时（秒）"""
+    try:
+        return max(MIN_RENDER_TIMEOUT, float(os.environ.get('FEEDBACK_RENDER_TIMEOUT', DEFAULT_RENDER_TIMEOUT)))
+    except ValueError:
+        return DEFAULT_RENDER_TIMEOUT
+
+# 渲染进程开始渲染每个块时发送 (批次编号, 块在批次中的位置)，超时从这时开始计时
+_started_queue = None
+
+def _init_render_worker(started_queue):
+    global _started_queue
+    _started_queue = started_queue
+
+def _render_batch_in_worker(job_id: int, sources: List[str]) -> List[Tuple[str, float]]:
+    """在渲染进程中渲染一批块，返回每个块的 (HTML, 耗时ms)"""
+    rendered = []
+    for offset, source in enumerate(sources):
+        _started_queue.put((job_id, offset))
+        start = time.perf_counter()
+        html_content = get_renderer().render(source)
+        rendered.append((html_content, (time.perf_counter() - start) * 1000))
+    return rendered
+
+class _ReadyResult:
+    """进程池重建前已经完成的结果"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def get(self, timeout=None):
+        return self.value
+
+    def wait(self, timeout=None):
+        pass
+
+    def ready(self) -> bool:
+        return True
+
+    def successful(self) -> bool:
+        return True
+
+# 确认超时的块，按顺序轮到它时输出转义的纯文本
+_TIMED_OUT = object()
+
+class RenderPool:
+    """Markdown渲染进程池：并行渲染多个块，超时的块回退为转义的纯文本
+
+    相邻的小块合并成一批提交，减少进程间通信的开销。渲染进程开始渲染每个块时通知主进程，
+    每个块的超时从这时开始计时，进程池启动和排队等待的时间不计入。卡住的工作进程无法单独终止，
+    发生超时时会终止整个进程池，已完成的结果保留，卡住的块回退为纯文本，其余的块提交到新的进程池。
+    """
+
+    def __init__(self, workers: int, timeout: float):
+        self.workers = workers
+        self.timeout = timeout
+        self._pool = None
+        self._started_queue = None
+        self._started = {}  # 批次编号 -> (正在渲染的块在批次中的位置, 收到通知的时间)
+        self._job_ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn 在各平台行为一致，也避免在多线程进程（Flask、Qt）中 fork
+                context = multiprocessing.get_context('spawn')
+                # 每个进程池使用新的队列：终止进程时可能正好持有旧队列的锁
+                self._started_queue = context.SimpleQueue()
+                self._started = {}
+                self._pool = context.Pool(self.workers, initializer=_init_render_worker,
+                                          initargs=(self._started_queue,))
+            return self._pool
+
+    def terminate(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.terminate()
+
+    def _started_at(self, pool, job_id: int) -> Optional[Tuple[int, float]]:
+        """读取渲染进程的开始通知，返回该批次正在渲染的块及其开始时间"""
+        with self._lock:
+            if pool is self._pool:
+                while not self._started_queue.empty():
+                    started_job, offset = self._started_queue.get()
+                    self._started[started_job] = (offset, time.monotonic())
+            return self._started.get(job_id)
+
+    def _submit(self, pool, sources: List[str], batch: List[int]) -> tuple:
+        job_id = next(self._job_ids)
+        return batch, pool, job_id, pool.apply_async(_render_batch_in_worker, (job_id, [sources[index] for index in batch]))
+
+    def _batches(self, sources: List[str]) -> List[List[int]]:
+        """把相邻的块按长度合并成批次，批次数至少是进程数的几倍以便并行"""
+        batch_chars = max(BATCH_MIN_CHARS, min(BATCH_MAX_CHARS, sum(map(len, sources)) // (self.workers * 4)))
+        batches = []
+        current = []
+        size = 0
+        for index, source in enumerate(sources):
+            current.append(index)
+            size += len(source)
+            if size >= batch_chars:
+                batches.append(current)
+                current = []
+                size = 0
+        if current:
+            batches.append(current)
+        return batches
+
+    def render(self, sources: List[str]) -> Iterator[Tuple[str, float, bool]]:
+        """立即提交所有批次，返回按顺序产生每个块 (HTML, 耗时ms, 是否超时) 的迭代器
+
+        超时从渲染进程开始渲染该块时计时，等待进程启动或排在其他块之后的块不会被判定超时。
+        """
+        pool = self._get_pool()
+        return self._collect(sources, [self._submit(pool, sources, batch) for batch in self._batches(sources)])
+
+    def _wait(self, job: tuple) -> Optional[int]:
+        """等待批次完成；某个块渲染超过超时时返回它在批次中的位置"""
+        batch, pool, job_id, result = job
+        poll = min(0.05, self.timeout / 4)
+        while True:
+            result.wait(poll)
+            if result.ready():
+                return None
+            if pool is not self._pool:
+                return -1  # 另一个请求终止了进程池，该批次需要重新提交
+            started = self._started_at(pool, job_id)
+            if started is not None and time.monotonic() - started[1] > self.timeout:
+                return started[0]
+
+    def _collect(self, sources: List[str], jobs: list) -> Iterator[Tuple[str, float, bool]]:
+        position = 0
+        while position < len(jobs):
+            job = jobs[position]
+            batch, _, job_id, result = job
+            position += 1
+            if result is _TIMED_OUT:
+                yield render_fallback(sources[batch[0]]), self.timeout * 1000, True
+                continue
+            stuck = self._wait(job)
+            if stuck is not None:
+                later_jobs = range(position, len(jobs))
+                finished = {later: jobs[later][3].get() for later in later_jobs
+                            if jobs[later][3] is not _TIMED_OUT and jobs[later][3].ready()
+                            and jobs[later][3].successful()}
+                if stuck >= 0:
+                    self.terminate()
+                pool = self._get_pool()
+                retried = []
+                if stuck > 0:
+                    retried.append(self._submit(pool, sources, batch[:stuck]))  # 卡住之前的块已渲染，结果随进程丢失
+                if stuck >= 0:
+                    retried.append(([batch[stuck]], None, None, _TIMED_OUT))
+                    rest = batch[stuck + 1:]
+                else:
+                    rest = batch
+                if rest:
+                    retried.append(self._submit(pool, sources, rest))
+                remaining = []
+                for later in later_jobs:
+                    later_batch, _, later_id, later_result = jobs[later]
+                    if later in finished:
+                        remaining.append((later_batch, pool, later_id, _ReadyResult(finished[later])))
+                    elif later_result is _TIMED_OUT:
+                        remaining.append(jobs[later])
+                    else:
+                        remaining.append(self._submit(pool, sources, later_batch))
+                jobs = jobs[:position] + retried + remaining
+                continue
+            try:
+                rendered = result.get()
+            except Exception:
+                for index in batch:
+                    yield render_fallback(sources[index]), 0.0, False
+                continue
+            with self._lock:
+                self._started.pop(job_id, None)
+            for html_content, render_ms in rendered:
+                yield html_content, render_ms, False
+
+_render_pool: Optional[RenderPool] = None
+_render_pool_lock = threading.Lock()
+
+def get_render_pool() -> Optional[RenderPool]:
+    """获取共享的渲染进程池，FEEDBACK_RENDER_WORKERS=0 时返回 None"""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            workers = get_render_workers()
+            if workers == 0:
+                return None
+            _render_pool = RenderPool(workers, get_render_timeout())
+        return _render_pool
+
+class BlockRenderer:
+    """按块渲染Markdown并缓存每个块的HTML"""
+
+    def __init__(self, cache_size: int = 2048, use_pool: bool = True):
+        self.cache_size = cache_size
+        self.use_pool = use_pool
+        self.last_timings = []  # 最近一次按块渲染中每个块的耗时
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _markdown(self, tier: str) -> 'markdown.Markdown':
+        instances = getattr(self._local, 'instances', None)
+        if instances is None:
+            instances = self._local.instances = {}
+        md = instances.get(tier)
+        if md is None:
+            md = instances[tier] = create_markdown(tier)
+        return md
+
+    def render(self, text: str) -> str:
+        """渲染整段Markdown文本，按内容选择最轻的渲染路径"""
+        if not text:
+            return ""
+        tier = classify_markdown(text)
+        if tier == TIER_PLAIN:
+            return render_plain_text(text)
+        md = self._markdown(tier)
+        md.reset()
+        return md.convert(text)
+
+    def render_document(self, text: str) -> str:
+        """渲染整篇文档；大文档按块并行渲染后拼接"""
+        if self.use_pool and len(text) >= POOL_MIN_CHARS and get_render_pool() is not None:
+            return "\n".join(html_content for _, html_content in self.iter_blocks(text))
+        return self.render(text)
+
+    def render_blocks(self, text: str) -> List[Tuple[str, str]]:
+        """返回 [(块ID, HTML), ...]，未变化的块直接使用缓存"""
+        return list(self.iter_blocks(text))
+
+    def iter_blocks(self, text: str) -> Iterator[Tuple[str, str]]:
+        """按文档顺序逐块渲染，调用方可以边渲染边输出；未缓存的内容较多时交给进程池并行渲染"""
+        used_ids = set()
+        for block_id, html_content in self._iter_rendered_blocks(text):
+            deduped = dedupe_heading_ids(html_content, used_ids)
+            if deduped != html_content:
+                # 标题ID取决于前面的块，块ID随之变化，页面不会沿用旧的HTML
+                block_id = f"{block_id}-{hashlib.sha1(deduped.encode('utf-8')).hexdigest()[:8]}"
+            yield block_id, deduped
+
+    def _iter_rendered_blocks(self, text: str) -> Iterator[Tuple[str, str]]:
+        """逐块渲染（或取缓存），每个块的标题ID只在块内去重"""
+        if not text:
+            return
+        prepared = prepare_blocks(text)
+        block_ids = [block_id for block_id, _ in prepared]
+        full_sources = [source for _, source in prepared]
+
+        cached = [self._cache_get(source) for source in full_sources]
+        missing = [index for index, html_content in enumerate(cached) if html_content is None]
+        pool = None
+        if self.use_pool and sum(len(full_sources[index]) for index in missing) >= POOL_MIN_CHARS:
+            pool = get_render_pool()
+        pooled = None
+        pooled_indices = set()
+        if pool is not None:
+            # 第一个待渲染的块在本线程渲染，渲染进程启动期间也能尽快输出首屏
+            pooled_indices = set(missing[1:])
+            pooled = pool.render([full_sources[index] for index in missing[1:]])
+
+        timings = []
+        self.last_timings = timings
+        for index, (block_id, source, html_content) in enumerate(zip(block_ids, full_sources, cached)):
+            if html_content is not None:
+                yield block_id, html_content
+                continue
+            if index in pooled_indices:
+                html_content, render_ms, timed_out = next(pooled)
+            else:
+                start = time.perf_counter()
+                html_content = self.render(source)
+                render_ms, timed_out = (time.perf_counter() - start) * 1000, False
+            timings.append({'id': block_id, 'chars': len(source), 'ms': round(render_ms, 3), 'timed_out': timed_out})
+            if not timed_out:
+                self._cache_put(source, html_content)
+            yield block_id, html_content
+
+        if timings and profile_enabled('render'):
+            write_report('render-blocks', {
+                'pool': pool is not None,
+                'summary': summarize_durations([timing['ms'] for timing in timings]),
+                'timed_out': sum(1 for timing in timings if timing['timed_out']),
+                'blocks': timings,
+            })
+
+    def iter_chunks(self, text: str, chunk_chars: int = STREAM_CHUNK_CHARS) -> Iterator[List[Tuple[str, str]]]:
+        """把逐块渲染的结果按HTML长度分片，第一个分片只含首个块以尽快显示首屏"""
+        chunk = []
+        size = 0
+        limit = 0
+        for block_id, html_content in self.iter_blocks(text):
+            chunk.append((block_id, html_content))
+            size += len(html_content)
+            if size >= limit:
+                yield chunk
+                chunk = []
+                size = 0
+                limit = chunk_chars
+        if chunk:
+            yield chunk
+
+    def _cache_get(self, source: str) -> Optional[str]:
+        with self._cache_lock:
+            html_content = self._cache.get(source)
+            if html_content is not None:
+                self._cache.move_to_end(source)
+            return html_content
+
+    def _cache_put(self, source: str, html_content: str):
+        with self._cache_lock:
+            self._cache[source] = html_content
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+_default_renderer: Optional[BlockRenderer] = None
+
+def get_renderer() -> BlockRenderer:
+    """获取进程内共享的渲染器"""
+    global _default_renderer
+    if _default_renderer is None:
+        _default_renderer = BlockRenderer()
+    return _default_renderer
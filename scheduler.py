@@ -0,0 +1,314 @@
+# Feedback request scheduler for Interactive Feedback MCP
+# 多个智能体同时请求反馈时，请求在这里排队：同一时间只显示一个界面，
+# 用户回答完一个问题后立即显示下一个，而不是同时打开多个窗口或争抢同一个端口；
+# 同一客户端重复发起的相同请求合并为一个；客户端取消调用时关闭对应的界面；
+# 等待期间定期向客户端发送进度心跳，避免客户端因长时间没有响应而超时重试
+#
+# FEEDBACK_QUEUE_POLICY       排队策略：fair（默认，同优先级下各工作区轮流）或 fifo
+# FEEDBACK_QUEUE_SLOTS        同时显示的界面数量，默认 1
+# FEEDBACK_PROGRESS_INTERVAL  进度心跳间隔（秒），默认 10，0 表示不发送
+import os
+import json
+import time
+import asyncio
+import threading
+import itertools
+from collections import deque
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from lifecycle import get_runtime_dir
+from profiling import profile_enabled, summarize_durations, write_report
+
+QUEUE_POLICIES = ('fair', 'fifo')
+
+# 保留最近若干次请求的排队和处理耗时，用于统计
+METRIC_SAMPLES = 256
+
+# 等待其他进程释放界面锁时的轮询间隔（秒），轮询期间检查请求是否已被取消
+LOCK_POLL_INTERVAL = 0.1
+
+T = TypeVar('T')
+
+def get_queue_policy() -> str:
+    """读取 FEEDBACK_QUEUE_POLICY 环境变量"""
+    policy = os.environ.get('FEEDBACK_QUEUE_POLICY', 'fair').strip().lower()
+    return policy if policy in QUEUE_POLICIES else 'fair'
+
+def get_progress_interval() -> Optional[float]:
+    """读取 FEEDBACK_PROGRESS_INTERVAL 环境变量，0 或负数表示不发送心跳"""
+    try:
+        interval = float(os.environ.get('FEEDBACK_PROGRESS_INTERVAL', '10'))
+    except ValueError:
+        interval = 10.0
+    return interval if interval > 0 else None
+
+def get_queue_slots() -> int:
+    """读取 FEEDBACK_QUEUE_SLOTS 环境变量"""
+    try:
+        return max(1, int(os.environ.get('FEEDBACK_QUEUE_SLOTS', '1')))
+    except ValueError:
+        return 1
+
+class FeedbackCancelled(Exception):
+    """反馈请求在用户回答之前被客户端取消"""
+
+class Cancellation:
+    """一次反馈请求的取消信号，取消时依次调用注册的回调（结束界面进程、撤下会话中的问题等）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.cancelled_at = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancelled_at is not None
+
+    def cancel(self):
+        with self._lock:
+            if self.cancelled_at is not None:
+                return
+            self.cancelled_at = time.perf_counter()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """注册取消回调（已取消时立即调用），返回用于注销回调的函数"""
+        with self._lock:
+            if self.cancelled_at is None:
+                self._callbacks.append(callback)
+                return lambda: self._remove_callback(callback)
+        callback()
+        return lambda: None
+
+    def _remove_callback(self, callback: Callable[[], None]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+class RequestStatus:
+    """一次反馈请求的进度：排队中、界面已启动、页面已打开、用户正在输入
+
+    常驻会话在本进程内直接更新状态；界面子进程把状态写入 status_file，读取时取两者中更靠后的阶段。
+    """
+    STATES = ('queued', 'launched', 'opened', 'typing')
+    MESSAGES = {
+        'queued': "Queued behind other feedback requests",
+        'launched': "Feedback UI launched, waiting for the user to open it",
+        'opened': "Feedback UI opened, waiting for the user's answer",
+        'typing': "User is typing an answer",
+    }
+
+    def __init__(self):
+        self.state = 'queued'
+        self.status_file = None
+        self.started_at = time.perf_counter()
+        self.launched_at = None  # 界面显示的时间，此前的时间用于排队
+
+    def set(self, state: str):
+        if self.STATES.index(state) > self.STATES.index(self.state):
+            self.state = state
+            if self.launched_at is None:
+                self.launched_at = time.perf_counter()
+
+    def current(self) -> str:
+        if self.status_file:
+            try:
+                with open(self.status_file, 'r', encoding='utf-8') as f:
+                    state = json.load(f).get('state')
+                if state in self.STATES:
+                    self.set(state)
+            except (OSError, ValueError):
+                pass
+        return self.state
+
+    def message(self) -> str:
+        elapsed = int(time.perf_counter() - self.started_at)
+        return f"{self.MESSAGES[self.current()]} ({elapsed}s)"
+
+class _Ticket:
+    __slots__ = ('seq', 'priority', 'workspace', 'enqueued_at')
+
+    def __init__(self, seq: int, priority: int, workspace: str):
+        self.seq = seq
+        self.priority = priority
+        self.workspace = workspace
+        self.enqueued_at = time.perf_counter()
+
+class FeedbackScheduler:
+    """反馈请求队列：优先级高的先处理，同优先级按策略选择（fifo 按到达顺序，fair 优先服务次数最少的工作区）"""
+
+    def __init__(self, slots: Optional[int] = None, policy: Optional[str] = None):
+        self.slots = slots or get_queue_slots()
+        self.policy = policy or get_queue_policy()
+        self._cond = threading.Condition()
+        self._pending = []
+        self._active = 0
+        self._served = {}  # 工作区 -> 已服务次数，只保留有请求在排队的工作区
+        self._seq = itertools.count()
+        self._queue_waits = deque(maxlen=METRIC_SAMPLES)
+        self._service_times = deque(maxlen=METRIC_SAMPLES)
+        self._cancel_latencies = deque(maxlen=METRIC_SAMPLES)
+        self._completed = 0
+        self._cancelled = 0
+
+    def pending_count(self) -> int:
+        """排队等待显示的请求数量（不含正在显示的）"""
+        with self._cond:
+            return len(self._pending)
+
+    def _next_ticket(self) -> _Ticket:
+        if self.policy == 'fifo':
+            return min(self._pending, key=lambda t: (-t.priority, t.seq))
+        return min(self._pending, key=lambda t: (-t.priority, self._served.get(t.workspace, 0), t.seq))
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def run(self, func: Callable[[], T], priority: int = 0, workspace: str = '',
+            cancellation: Optional[Cancellation] = None) -> T:
+        """排队等待轮到当前请求后执行 func（显示界面并等待回答），返回其结果
+
+        排队期间被取消时直接出队并抛出 FeedbackCancelled；执行期间的取消由 func 自己响应。
+        """
+        cancelled = lambda: cancellation is not None and cancellation.cancelled
+        remove_callback = cancellation.add_callback(self._wake) if cancellation is not None else None
+        with self._cond:
+            if workspace not in self._served:
+                # 新加入的工作区从当前最少的服务次数开始计数，避免长期占先
+                self._served[workspace] = min((self._served.get(t.workspace, 0) for t in self._pending), default=0)
+            ticket = _Ticket(next(self._seq), priority, workspace)
+            self._pending.append(ticket)
+            self._cond.wait_for(lambda: cancelled() or (self._active < self.slots and self._next_ticket() is ticket))
+            self._pending.remove(ticket)
+            if cancelled():
+                # 还没显示就被取消：直接出队，让后面的请求补上
+                self._cancelled += 1
+                self._cancel_latencies.append((time.perf_counter() - cancellation.cancelled_at) * 1000)
+                if not any(t.workspace == workspace for t in self._pending):
+                    self._served.pop(workspace, None)
+                self._cond.notify_all()
+                raise FeedbackCancelled("Feedback request was cancelled while waiting in the queue")
+            self._active += 1
+            self._served[workspace] += 1
+        if remove_callback is not None:
+            remove_callback()
+
+        started_at = time.perf_counter()
+        try:
+            return func()
+        finally:
+            finished_at = time.perf_counter()
+            with self._cond:
+                self._active -= 1
+                self._completed += 1
+                self._queue_waits.append((started_at - ticket.enqueued_at) * 1000)
+                self._service_times.append((finished_at - started_at) * 1000)
+                if cancelled():
+                    # 从收到取消到界面进程退出（或会话撤下问题）的耗时
+                    self._cancelled += 1
+                    self._cancel_latencies.append((finished_at - cancellation.cancelled_at) * 1000)
+                if not any(t.workspace == workspace for t in self._pending):
+                    self._served.pop(workspace, None)
+                self._cond.notify_all()
+            if profile_enabled('queue'):
+                write_report("feedback-queue", self.stats())
+
+    def stats(self) -> dict:
+        """排队耗时、处理耗时（从界面显示到用户回答）和取消耗时（从收到取消到界面关闭）的统计"""
+        with self._cond:
+            return {
+                'policy': self.policy,
+                'slots': self.slots,
+                'pending': len(self._pending),
+                'active': self._active,
+                'completed': self._completed,
+                'cancelled': self._cancelled,
+                'queue_wait': summarize_durations(list(self._queue_waits)),
+                'service': summarize_durations(list(self._service_times)),
+                'cancel_latency': summarize_durations(list(self._cancel_latencies)),
+            }
+
+class _Flight:
+    __slots__ = ('task', 'cancellation', 'status', 'waiters')
+
+    def __init__(self, cancellation: Cancellation, status: RequestStatus):
+        self.task = None
+        self.cancellation = cancellation
+        self.status = status
+        self.waiters = 0
+
+class SingleFlight:
+    """合并相同的并发请求：同一个键只执行一次，重复的调用等待并共享同一个结果
+
+    MCP客户端在长时间阻塞的工具调用超时后可能重试，重试的调用附加到已在等待的会话上，
+    不会再打开第二个界面。实际执行放在独立的任务中，单个调用者被取消不影响其他等待者；
+    所有等待者都被取消后才触发 Cancellation，关闭对应的界面。每个等待者可以按间隔收到心跳回调。
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, _Flight] = {}
+        self.shared = 0  # 被合并的重复调用次数
+
+    async def do(self, key: str, func: Callable[[Cancellation, RequestStatus], Awaitable[T]],
+                 heartbeat: Optional[Callable[[RequestStatus], Awaitable[None]]] = None,
+                 interval: Optional[float] = None) -> T:
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = _Flight(Cancellation(), RequestStatus())
+            flight.task = asyncio.ensure_future(func(flight.cancellation, flight.status))
+            self._inflight[key] = flight
+            flight.task.add_done_callback(lambda task: self._finished(key, flight))
+        else:
+            self.shared += 1
+
+        flight.waiters += 1
+        try:
+            # asyncio.wait 不会在调用者被取消时取消任务本身
+            while not flight.task.done():
+                await asyncio.wait({flight.task}, timeout=interval if heartbeat is not None else None)
+                if heartbeat is not None and not flight.task.done():
+                    await heartbeat(flight.status)
+            return flight.task.result()
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # 没有调用者在等待结果了，不再占用界面
+                self._inflight.pop(key, None)
+                flight.cancellation.cancel()
+
+    def _finished(self, key: str, flight: _Flight):
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+        if not flight.task.cancelled():
+            flight.task.exception()  # 已取消的请求没有调用者读取异常，这里标记为已处理
+
+@contextmanager
+def interprocess_lock(name: str, cancellation: Optional[Cancellation] = None):
+    """跨进程互斥：多个MCP服务器进程（例如多个Cursor窗口）依次使用同一个界面端口
+
+    Windows 上没有 fcntl，此时不加锁，行为与之前相同。等待期间请求被取消时抛出 FeedbackCancelled。
+    """
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+
+    path = os.path.join(get_runtime_dir(), f"{name}.lock")
+    with open(path, 'a') as lock_file:
+        while True:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if cancellation is not None and cancellation.cancelled:
+                    raise FeedbackCancelled("Feedback request was cancelled while waiting for another server's UI")
+                time.sleep(LOCK_POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
@@ -5,15 +5,37 @@
 # Enhanced with Web UI support for SSH remote usage
 import os
 import sys
+import base64
+import argparse
 import json
+import time
+import signal
+import hashlib
 import tempfile
+import threading
 import subprocess
+from urllib.parse import unquote, urlparse
 
-from typing import Annotated, Dict
+from typing import Annotated, Any, Callable, Dict
 
-from fastmcp import FastMCP
+import anyio
+from fastmcp import Context, FastMCP
+from fastmcp.exceptions import ResourceError
+from fastmcp.tools.tool import ToolResult
+from mcp.types import ImageContent, ResourceLink, TextContent
 from pydantic import Field
 
+from attachments import (AttachmentNotFound, AttachmentTooLarge, describe_size, get_resource_max_bytes,
+                         load_attachment_meta, read_attachment, read_attachment_bytes, sweep_attachments)
+from autoresponder import AutoResponder
+from broker import BrokerUnavailable, ask_broker, broker_enabled
+from history import get_history_store
+from lifecycle import sweep_stale_sessions
+from uploads import UploadSpool
+from transport import TRANSPORTS, ClientTracker, get_http_config, get_transport
+from scheduler import (Cancellation, FeedbackCancelled, FeedbackScheduler, RequestStatus, SingleFlight,
+                       get_progress_interval, interprocess_lock)
+
 # The log_level is necessary for Cline to work: https://github.com/jlowin/fastmcp/issues/81
 mcp = FastMCP("Interactive Feedback MCP", log_level="ERROR")
 
@@ -48,10 +70,187 @@ def get_web_ui_config() -> dict:
     port = int(os.environ.get('FEEDBACK_WEB_PORT', '8080'))
     return {'host': host, 'port': port}
 
-def launch_feedback_ui(summary: str, predefinedOptions: list[str] | None = None) -> dict[str, str]:
+def persistent_web_enabled() -> bool:
+    """是否启用常驻Web会话（FEEDBACK_WEB_PERSISTENT=1）"""
+    return os.environ.get('FEEDBACK_WEB_PERSISTENT', '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+# 并发的反馈请求在这里排队，同一时间只显示一个界面
+feedback_scheduler = FeedbackScheduler()
+
+# 同一客户端重复发起的相同请求只显示一次，用户的一次回答返回给所有等待者
+feedback_flights = SingleFlight()
+auto_responder = AutoResponder()
+
+_web_session = None
+_web_session_lock = threading.Lock()
+
+def get_web_session():
+    """获取常驻的Web反馈会话，第一次调用时在本进程的后台线程中启动Web服务器"""
+    global _web_session
+    with _web_session_lock:
+        if _web_session is None:
+            from web_ui import WebFeedbackUI
+
+            web_config = get_web_ui_config()
+            session = WebFeedbackUI("", None, web_config['host'], web_config['port'], session=True)
+            session.pending_provider = feedback_scheduler.pending_count
+            try:
+                session.start_background()
+            except OSError as e:
+                raise Exception(f"Failed to start persistent Web feedback session on port {web_config['port']}: {e}")
+            _web_session = session
+        return _web_session
+
+# 未配置 FEEDBACK_DEFAULT_ANSWER 且没有预定义选项时，超时后使用的回答
+DEFAULT_ANSWER_FALLBACK = "proceed"
+
+def get_feedback_timeout(timeout: float | None = None) -> float | None:
+    """单次调用的等待上限（秒）：调用参数优先，未指定时读取 FEEDBACK_TIMEOUT；0 或未设置表示一直等待"""
+    if timeout is None:
+        try:
+            timeout = float(os.environ.get('FEEDBACK_TIMEOUT', '0'))
+        except ValueError:
+            timeout = 0
+    return timeout if timeout > 0 else None
+
+def render_default_answer(template: str | None, message: str, options: list[str] | None, timeout: float) -> str:
+    """生成超时后的默认回答
+
+    模板可使用 {message}、{first_option}、{timeout} 占位符；调用参数和 FEEDBACK_DEFAULT_ANSWER 都未配置时，
+    使用第一个预定义选项，没有选项时使用 "proceed"。
+    """
+    first_option = options[0] if options else ""
+    if template is None:
+        template = os.environ.get('FEEDBACK_DEFAULT_ANSWER') or None
+    if template is None:
+        return first_option or DEFAULT_ANSWER_FALLBACK
+    try:
+        return template.format(message=message, first_option=first_option or DEFAULT_ANSWER_FALLBACK, timeout=f"{timeout:g}")
+    except (KeyError, IndexError, ValueError):
+        return template
+
+def auto_resolved_result(summary: str, predefinedOptions: list[str] | None, questions: list[dict] | None,
+                         default_answer: str | None, timeout: float) -> dict[str, Any]:
+    """用户在等待上限内没有回答时返回的结果，并标明是自动回复"""
+    if questions:
+        answers = []
+        for question in questions:
+            options = question.get('predefined_options') or []
+            if default_answer is None and not os.environ.get('FEEDBACK_DEFAULT_ANSWER') and options:
+                answers.append({'question': question['question'], 'selected_options': options[:1], 'feedback': ""})
+            else:
+                answers.append({'question': question['question'], 'selected_options': [],
+                                'feedback': render_default_answer(default_answer, question['question'], options, timeout)})
+        result = {'answers': answers}
+    else:
+        result = {'cursor_usage_opt': render_default_answer(default_answer, summary, predefinedOptions, timeout)}
+    result['auto_resolved'] = True
+    result['auto_resolved_reason'] = f"The user did not answer within {timeout:g} seconds; the default answer was used."
+    return result
+
+def normalize_questions(questions: list) -> list[dict]:
+    """整理批量提问的参数：每项可以是字符串，或包含 question/message 和 predefined_options 的对象"""
+    normalized = []
+    for item in questions:
+        if isinstance(item, str):
+            item = {'question': item}
+        if not isinstance(item, dict):
+            raise ValueError(f"Invalid question: {item!r}")
+        text = item.get('question') or item.get('message')
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError(f"Question text is required: {item!r}")
+        options = item.get('predefined_options')
+        normalized.append({
+            'question': text,
+            'predefined_options': [str(option) for option in options] if isinstance(options, list) else [],
+        })
+    if not normalized:
+        raise ValueError("At least one question is required")
+    return normalized
+
+def signal_process_group(process: subprocess.Popen, sig: int):
+    """向界面进程所在的进程组发送信号（包括它的渲染进程池），非POSIX平台只结束进程本身"""
+    if process.poll() is not None:
+        return
+    try:
+        if os.name == 'posix':
+            os.killpg(process.pid, sig)
+        elif sig == signal.SIGTERM:
+            process.terminate()
+        else:
+            process.kill()
+    except OSError:
+        pass
+
+def terminate_process(process: subprocess.Popen):
+    """结束界面进程：先发送SIGTERM，2秒内没有退出再强制结束"""
+    signal_process_group(process, signal.SIGTERM)
+    threading.Timer(2.0, signal_process_group, (process, getattr(signal, 'SIGKILL', signal.SIGTERM))).start()
+
+def run_ui_process(args: list[str], cancellation: Cancellation | None = None,
+                   capture_output: bool = False, status: RequestStatus | None = None) -> subprocess.CompletedProcess:
+    """运行界面进程直到退出；请求被取消时立即结束进程，释放端口和内存"""
+    output = subprocess.PIPE if capture_output else subprocess.DEVNULL
+    # 界面进程放在独立的进程组中，结束时连同渲染进程池一起结束；
+    # 通过 --parent-pid 与本进程绑定，本进程被强制结束时界面进程也会退出
+    process = subprocess.Popen(
+        [*args, "--parent-pid", str(os.getpid())],
+        shell=False,
+        stdout=output,
+        stderr=output,
+        stdin=subprocess.DEVNULL,
+        close_fds=True,
+        text=True,
+        start_new_session=os.name == 'posix'
+    )
+    if status is not None:
+        status.set('launched')
+    remove_callback = cancellation.add_callback(lambda: terminate_process(process)) if cancellation is not None else None
+    try:
+        stdout, stderr = process.communicate()
+    finally:
+        if remove_callback is not None:
+            remove_callback()
+    if cancellation is not None and cancellation.cancelled:
+        raise FeedbackCancelled("Feedback request was cancelled by the client")
+    return subprocess.CompletedProcess(args, process.returncode, stdout, stderr)
+
+def launch_feedback_ui(summary: str, predefinedOptions: list[str] | None = None,
+                       questions: list[dict] | None = None,
+                       cancellation: Cancellation | None = None,
+                       status: RequestStatus | None = None,
+                       start_deadline: Callable[[], float] | None = None,
+                       default_answer: str | None = None) -> dict[str, Any]:
+    """显示界面并等待回答；start_deadline 在界面真正显示时（拿到界面锁之后）才调用，开始计时并返回截止时间"""
+    # 常驻Web会话：问题推送到已打开的页面，不再为每次调用启动新进程
+    if not has_gui_environment() and persistent_web_enabled():
+        return get_web_session().ask(summary, predefinedOptions, questions, cancellation, status, start_deadline, default_answer)
+
+    # 显示给用户的排队数量：当前请求之后还在等待的请求
+    pending_args = ["--pending", str(feedback_scheduler.pending_count())]
+
+    def deadline_args() -> list[str]:
+        """界面显示倒计时和超时后的默认回答"""
+        if start_deadline is None:
+            return []
+        return ["--deadline", str(start_deadline()), "--default-answer", default_answer or ""]
+
     # Create a temporary file for the feedback result
     with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
         output_file = tmp.name
+    # 界面进程把进度（页面已打开、用户正在输入）写入状态文件
+    status_file = f"{output_file}.status"
+    if status is not None:
+        status.status_file = status_file
+
+    # 批量提问的问题列表通过JSON文件传给界面进程
+    questions_args = []
+    questions_file = None
+    if questions:
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding='utf-8') as tmp:
+            json.dump(questions, tmp, ensure_ascii=False)
+            questions_file = tmp.name
+        questions_args = ["--questions-file", questions_file]
 
     try:
         script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -70,17 +269,14 @@ def launch_feedback_ui(summary: str, predefinedOptions: list[str] | None = None)
                 feedback_ui_path,
                 "--prompt", summary,
                 "--output-file", output_file,
-                "--predefined-options", "|||".join(predefinedOptions) if predefinedOptions else ""
+                "--predefined-options", "|||".join(predefinedOptions) if predefinedOptions else "",
+                *questions_args,
+                *pending_args,
+                "--status-file", status_file
             ]
-            result = subprocess.run(
-                args,
-                check=False,
-                shell=False,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                stdin=subprocess.DEVNULL,
-                close_fds=True
-            )
+            # 其他MCP服务器进程的窗口关闭后再显示
+            with interprocess_lock("gui", cancellation):
+                result = run_ui_process([*args, *deadline_args()], cancellation, status=status)
             if result.returncode != 0:
                 raise Exception(f"Failed to launch GUI feedback UI: {result.returncode}")
         else:
@@ -96,18 +292,14 @@ def launch_feedback_ui(summary: str, predefinedOptions: list[str] | None = None)
                 "--output-file", output_file,
                 "--predefined-options", "|||".join(predefinedOptions) if predefinedOptions else "",
                 "--host", web_config['host'],
-                "--port", str(web_config['port'])
+                "--port", str(web_config['port']),
+                *questions_args,
+                *pending_args,
+                "--status-file", status_file
             ]
-            result = subprocess.run(
-                args,
-                check=False,
-                shell=False,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                stdin=subprocess.DEVNULL,
-                close_fds=True,
-                text=True
-            )
+            # 多个MCP服务器进程共用同一个端口，依次启动而不是绑定失败
+            with interprocess_lock(f"web-{web_config['port']}", cancellation):
+                result = run_ui_process([*args, *deadline_args()], cancellation, capture_output=True, status=status)
             if result.returncode != 0:
                 print(f"Web UI stdout: {result.stdout}")
                 print(f"Web UI stderr: {result.stderr}")
@@ -122,15 +314,267 @@ def launch_feedback_ui(summary: str, predefinedOptions: list[str] | None = None)
         if os.path.exists(output_file):
             os.unlink(output_file)
         raise e
+    finally:
+        if questions_file and os.path.exists(questions_file):
+            os.unlink(questions_file)
+        if os.path.exists(status_file):
+            os.unlink(status_file)
+
+def launch_with_timeout(summary: str, predefinedOptions: list[str] | None, questions: list[dict] | None,
+                        cancellation: Cancellation | None, status: RequestStatus | None,
+                        timeout: float | None, default_answer: str | None) -> dict[str, Any]:
+    """显示界面并最多等待 timeout 秒，超时后关闭界面并返回默认回答"""
+    if timeout is None:
+        return launch_feedback_ui(summary, predefinedOptions, questions, cancellation, status)
+
+    # 超时和客户端取消都会结束界面，结束后根据是哪一个触发决定返回默认回答还是继续抛出取消
+    bounded = Cancellation()
+    remove_callback = cancellation.add_callback(bounded.cancel) if cancellation is not None else None
+    timers = []
+
+    def start_deadline() -> float:
+        # 等待其他服务器的窗口或同一页面上的其他问题的时间不计入，用户看到问题后才开始计时
+        timer = threading.Timer(timeout, bounded.cancel)
+        timer.daemon = True
+        timer.start()
+        timers.append(timer)
+        return time.time() + timeout
+
+    try:
+        preview = None if questions else render_default_answer(default_answer, summary, predefinedOptions, timeout)
+        return launch_feedback_ui(summary, predefinedOptions, questions, bounded, status, start_deadline, preview)
+    except FeedbackCancelled:
+        if cancellation is not None and cancellation.cancelled:
+            raise
+        return auto_resolved_result(summary, predefinedOptions, questions, default_answer, timeout)
+    finally:
+        for timer in timers:
+            timer.cancel()
+        if remove_callback is not None:
+            remove_callback()
+
+def answer_request(request: dict, cancellation: Cancellation | None = None,
+                   status: RequestStatus | None = None) -> dict[str, Any]:
+    """显示界面回答一个反馈请求（在本进程内，或在代理进程内代替转发请求的服务器）"""
+    return launch_with_timeout(request['summary'], request['predefined_options'], request['questions'],
+                               cancellation, status, request['timeout'], request['default_answer'])
+
+def run_request(request: dict, priority: int, workspace: str,
+                cancellation: Cancellation, status: RequestStatus, workspace_root: str = "") -> dict[str, Any]:
+    """排队并等待用户回答；启用代理时转发给本机的代理进程，由它统一排队和显示界面
+
+    workspace 是排队时区分客户端的会话ID，workspace_root 是客户端的工作区目录，记录到历史中。
+    """
+    result = None
+    if broker_enabled():
+        # 默认回答模板按本服务器的配置解析，而不是代理进程的
+        forwarded = dict(request, default_answer=request['default_answer'] or os.environ.get('FEEDBACK_DEFAULT_ANSWER') or None)
+        try:
+            result = ask_broker(forwarded, priority, f"{os.getpid()}:{workspace}", cancellation, status)
+        except BrokerUnavailable as e:
+            print(f"⚠️ {e}，改为直接显示界面", file=sys.stderr)
+    if result is None:
+        result = feedback_scheduler.run(lambda: answer_request(request, cancellation, status), priority, workspace, cancellation)
+    record_history(request, result, workspace_root, status)
+    return result
+
+# 向客户端查询工作区目录（MCP roots）的最长等待时间（秒）
+ROOTS_TIMEOUT = 1.0
+
+async def client_workspace(ctx: Context | None) -> str:
+    """客户端的工作区目录（MCP roots 中的第一个）；客户端不支持 roots 时为空"""
+    if ctx is None:
+        return ""
+    try:
+        if ctx.session.client_params.capabilities.roots is None:
+            return ""
+        with anyio.move_on_after(ROOTS_TIMEOUT):
+            roots = await ctx.list_roots()
+            if roots:
+                uri = urlparse(str(roots[0].uri))
+                return unquote(uri.path) if uri.scheme == 'file' else str(roots[0].uri)
+    except Exception:
+        pass  # 查询失败不影响反馈请求
+    return ""
+
+def record_history(request: dict, result: dict, workspace: str, status: RequestStatus | None = None):
+    """把回答加入历史记录（后台批量写入），附带排队和等待回答的耗时"""
+    queue_ms = answer_ms = None
+    if status is not None and status.launched_at is not None:
+        queue_ms = round((status.launched_at - status.started_at) * 1000, 3)
+        answer_ms = round((time.perf_counter() - status.launched_at) * 1000, 3)
+    get_history_store().record(request, result, workspace, queue_ms, answer_ms)
+
+def request_key(client: str, *parts) -> str:
+    """请求内容（问题、选项）和调用方的哈希，用于识别客户端的重试"""
+    payload = json.dumps([client, *parts], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+async def schedule_feedback(request: dict, priority: int, ctx: Context | None, *key_parts) -> dict:
+    """在工作线程中排队并等待用户回答，事件循环在等待期间仍可处理其他客户端的请求
+
+    客户端取消调用（notifications/cancelled）时等待被取消，所有等待者都取消后关闭对应的界面。
+    等待期间按 FEEDBACK_PROGRESS_INTERVAL 发送进度通知，报告界面当前所处的阶段。
+    """
+    workspace = ctx.session_id if ctx is not None else ""
+    workspace_root = await client_workspace(ctx)
+    # 匹配用户自动回复规则的请求直接返回，不排队也不显示界面
+    answered = auto_responder.respond(request)
+    if answered is not None:
+        record_history(request, answered, workspace_root)
+        return answered
+
+    client = (ctx.client_id if ctx is not None else None) or workspace
+    beats = 0
+
+    async def heartbeat(status: RequestStatus):
+        nonlocal beats
+        beats += 1
+        try:
+            await ctx.report_progress(beats, None, status.message())
+        except Exception:
+            pass  # 心跳发送失败不影响等待用户回答
+
+    return await feedback_flights.do(
+        request_key(client, *key_parts),
+        lambda cancellation, status: anyio.to_thread.run_sync(
+            run_request, request, priority, workspace, cancellation, status, workspace_root
+        ),
+        heartbeat if ctx is not None else None,
+        get_progress_interval(),
+    )
+
+def tool_result(result: dict) -> dict | ToolResult:
+    """用户附加的内容不放进回答文本：图片（界面中已缩小）作为图片内容附在结果之后，
+    大段文本和上传的文件附上 MCP 资源链接，智能体按需读取。批量提问中每个回答的附件也一样处理"""
+    attachments = [*result.get('attachments', []),
+                   *(attachment for answer in result.get('answers', []) for attachment in answer.get('attachments', []))]
+    if not attachments:
+        return result
+    content = [TextContent(type='text', text=json.dumps(result, ensure_ascii=False, indent=2))]
+    for attachment in attachments:
+        if attachment['mime_type'].startswith('image/') and 'width' in attachment:  # 上传的原图不内联
+            try:
+                data = read_attachment_bytes(attachment['id'])
+            except AttachmentNotFound:
+                continue
+            content.append(ImageContent(type='image', data=base64.b64encode(data).decode('ascii'),
+                                        mimeType=attachment['mime_type']))
+            continue
+        if 'sha256' in attachment:
+            description = f"Uploaded by the user (SHA-256 {attachment['sha256']}), saved at {attachment['path']}"
+        else:
+            description = "Attached by the user"
+        if 'lines' in attachment:
+            description += (f": {attachment['lines']} lines. "
+                            f"Read a line range with {attachment['uri']}/lines/{{start}}/{{end}}")
+        if attachment['size'] > get_resource_max_bytes():
+            hints = (["read line ranges"] if 'lines' in attachment else []) + \
+                    (["open the saved file"] if 'path' in attachment else [])
+            description += ". Too large to read in full through the resource" + (f"; {' or '.join(hints)}" if hints else "")
+        content.append(ResourceLink(
+            type='resource_link', uri=attachment['uri'], name=attachment['name'], mimeType=attachment['mime_type'],
+            size=attachment['size'], description=description,
+        ))
+    return ToolResult(content=content, structured_content=result)
+
+@mcp.resource("feedback://attachments/{attachment_id}", mime_type="text/plain")
+def get_attachment(attachment_id: str) -> str | bytes:
+    """Full content of a file, paste or image the user attached to an answer"""
+    try:
+        meta = load_attachment_meta(attachment_id)
+        limit = get_resource_max_bytes()
+        # 上传的文件可能有几百 MB，不整个读入内存：超过上限时让智能体按行读取或直接打开保存的文件
+        if meta['size'] > limit:
+            raise ResourceError(attachment_too_large_message(meta, limit))
+        if not meta['mime_type'].startswith('text/'):
+            return read_attachment_bytes(attachment_id, limit)
+        return read_attachment(attachment_id, max_chars=limit)
+    except AttachmentNotFound as e:
+        raise ResourceError(str(e)) from e
+    except AttachmentTooLarge as e:
+        raise ResourceError(attachment_too_large_message(meta, limit)) from e
+
+def attachment_too_large_message(meta: dict, limit: int) -> str:
+    """附件超过读取上限时给智能体的说明"""
+    message = f"Attachment {meta['id']} is {describe_size(meta['size'])}, more than the {describe_size(limit)} resource limit."
+    if 'lines' in meta:
+        message += f" Read a line range with {meta['uri']}/lines/{{start}}/{{end}}."
+    if 'path' in meta:
+        message += f" The file is saved at {meta['path']}."
+    return message
+
+@mcp.resource("feedback://attachments/{attachment_id}/lines/{start}/{end}", mime_type="text/plain")
+def get_attachment_lines(attachment_id: str, start: int, end: int) -> str:
+    """Lines start..end (1-based, inclusive) of an attachment, for reading large pastes selectively"""
+    try:
+        load_attachment_meta(attachment_id)
+        return read_attachment(attachment_id, start, end, max_chars=get_resource_max_bytes())
+    except AttachmentNotFound as e:
+        raise ResourceError(str(e)) from e
+    except AttachmentTooLarge as e:
+        raise ResourceError(f"{e}; request fewer lines") from e
 
 @mcp.tool()
-def cursor_usage_opt(
+async def cursor_usage_opt(
     message: str = Field(description="The specific question for the user"),
     predefined_options: list = Field(default=None, description="Predefined options for the user to choose from (optional)"),
-) -> Dict[str, str]:
-    """Request interactive feedback from the user"""
+    priority: int = Field(default=0, description="Queue priority when several requests are waiting for the user; higher is shown first (optional)"),
+    timeout: float = Field(default=None, description="Seconds to wait for the user before answering with the default answer (optional; FEEDBACK_TIMEOUT applies when omitted, 0 waits forever)"),
+    default_answer: str = Field(default=None, description="Answer returned when the timeout expires; may use {message}, {first_option} and {timeout} placeholders (optional; defaults to the first predefined option or 'proceed')"),
+    ctx: Context = None,
+) -> Dict[str, Any]:
+    """Request interactive feedback from the user. If the wait is bounded and the user does not answer in time, the result contains the default answer and 'auto_resolved': true. Large pastes come back in 'attachments' as feedback:// resources to read on demand; pasted screenshots come back as image content"""
     predefined_options_list = predefined_options if isinstance(predefined_options, list) else None
-    return launch_feedback_ui(message, predefined_options_list)
+    request = {'summary': message, 'predefined_options': predefined_options_list, 'questions': None,
+               'timeout': get_feedback_timeout(timeout), 'default_answer': default_answer}
+    return tool_result(await schedule_feedback(request, priority, ctx, message, predefined_options_list))
+
+@mcp.tool()
+async def cursor_usage_opt_batch(
+    questions: list = Field(description="The questions for the user, answered together in one form. Each item is an object with 'question' (string) and optional 'predefined_options' (list of strings), or just a question string"),
+    priority: int = Field(default=0, description="Queue priority when several requests are waiting for the user; higher is shown first (optional)"),
+    timeout: float = Field(default=None, description="Seconds to wait for the user before answering every question with the default answer (optional; FEEDBACK_TIMEOUT applies when omitted, 0 waits forever)"),
+    default_answer: str = Field(default=None, description="Answer used for each question when the timeout expires; may use {message}, {first_option} and {timeout} placeholders (optional; defaults to each question's first option or 'proceed')"),
+    ctx: Context = None,
+) -> Dict[str, Any]:
+    """Ask the user several questions at once and collect all answers in a single interaction. Returns {'answers': [{'question', 'selected_options', 'feedback'}]} in the same order as the questions, plus 'auto_resolved': true when the default answers were used after a timeout. Large pastes and images attached to one answer come back in that answer's 'attachments'; files attached to the whole form come back in the top-level 'attachments'. They are feedback:// resources to read on demand, and images come back as image content"""
+    normalized = normalize_questions(questions if isinstance(questions, list) else [])
+    request = {'summary': "", 'predefined_options': None, 'questions': normalized,
+               'timeout': get_feedback_timeout(timeout), 'default_answer': default_answer}
+    return tool_result(await schedule_feedback(request, priority, ctx, normalized))
+
+# HTTP 模式下记录连接的客户端，stdio 模式下只有一个客户端，不需要记录
+client_tracker: ClientTracker | None = None
+
+@mcp.custom_route("/stats", methods=["GET"])
+async def server_stats(request):
+    """HTTP 模式下的运行状态：客户端数量和内存、排队统计、被合并的重复调用次数"""
+    from starlette.responses import JSONResponse
+    return JSONResponse({
+        'clients': client_tracker.stats() if client_tracker is not None else None,
+        'queue': feedback_scheduler.stats(),
+        'shared_calls': feedback_flights.shared,
+        'auto_response_hits': auto_responder.hit_counts(),
+    })
 
 if __name__ == "__main__":
-    mcp.run(transport="stdio")
+    parser = argparse.ArgumentParser(description="运行 Interactive Feedback MCP 服务器")
+    parser.add_argument("--transport", choices=TRANSPORTS, default=get_transport(),
+                        help="stdio：由客户端启动（默认）；http / sse：常驻进程，同时服务多个客户端")
+    parser.add_argument("--host", default=get_http_config()['host'], help="HTTP 模式的监听地址")
+    parser.add_argument("--port", type=int, default=get_http_config()['port'], help="HTTP 模式的监听端口")
+    args = parser.parse_args()
+
+    # 清理上一个服务器实例遗留的界面进程，避免第一次调用因端口被占用而失败
+    sweep_stale_sessions()
+    # 启动时编译自动回复规则，第一次调用不用等待
+    auto_responder.load()
+    sweep_attachments()
+    UploadSpool().sweep()
+    if args.transport == "stdio":
+        mcp.run(transport="stdio")
+    else:
+        client_tracker = ClientTracker()
+        mcp.add_middleware(client_tracker)
+        mcp.run(transport=args.transport, host=args.host, port=args.port)
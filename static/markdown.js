@@ -0,0 +1,393 @@
+// Markdown renderer for the Web UI client-side rendering mode
+// 客户端渲染模式使用的轻量Markdown渲染器和代码高亮，无外部依赖，由本地Web服务器提供
+// 支持的语法与服务端扩展保持一致：围栏代码块、表格、列表、引用、标题、nl2br 换行
+(function (global) {
+    'use strict';
+
+    // 与服务端 Pygments monokai 主题一致的颜色
+    const COLORS = {
+        keyword: '#66D9EF',
+        string: '#E6DB74',
+        comment: '#959077',
+        number: '#AE81FF',
+        function: '#A6E22E',
+        operator: '#FF4689'
+    };
+
+    const JS_KEYWORDS = 'async await break case catch class const continue debugger default delete do else export extends false finally for from function if import in instanceof let new null of return static super switch this throw true try typeof undefined var void while with yield';
+    const C_KEYWORDS = 'auto break case char const continue default do double else enum extern float for goto if inline int long register return short signed sizeof static struct switch typedef union unsigned void volatile while NULL true false bool';
+
+    const LANGUAGES = {
+        python: { keywords: 'and as assert async await break class continue def del elif else except False finally for from global if import in is lambda None nonlocal not or pass raise return True try while with yield self', comments: ['#'], triple: true },
+        javascript: { keywords: JS_KEYWORDS, comments: ['//', '/*'], template: true },
+        typescript: { keywords: JS_KEYWORDS + ' interface type enum implements private public protected readonly declare namespace abstract as any number string boolean', comments: ['//', '/*'], template: true },
+        go: { keywords: 'break case chan const continue default defer else fallthrough for func go goto if import interface map package range return select struct switch type var nil true false', comments: ['//', '/*'], template: true },
+        rust: { keywords: 'as async await break const continue crate dyn else enum extern false fn for if impl in let loop match mod move mut pub ref return self Self static struct super trait true type unsafe use where while Some None Ok Err', comments: ['//', '/*'] },
+        java: { keywords: 'abstract assert boolean break byte case catch char class const continue default do double else enum extends final finally float for if implements import instanceof int interface long native new null package private protected public return short static super switch synchronized this throw throws transient try void volatile while true false var', comments: ['//', '/*'] },
+        c: { keywords: C_KEYWORDS, comments: ['//', '/*'] },
+        cpp: { keywords: C_KEYWORDS + ' class namespace template typename public private protected virtual override new delete using nullptr this operator friend constexpr auto', comments: ['//', '/*'] },
+        css: { keywords: 'important', comments: ['/*'] },
+        bash: { keywords: 'if then else elif fi for while until do done case esac function in return local export readonly echo exit source set unset', comments: ['#'] },
+        sql: { keywords: 'select from where insert into values update set delete create table drop alter join left right inner outer on group by order having limit and or not null as distinct union all index primary key foreign references', comments: ['--', '/*'], ignoreCase: true },
+        json: { keywords: 'true false null', comments: [] },
+        yaml: { keywords: 'true false null yes no on off', comments: ['#'] },
+        html: { keywords: '', comments: ['<!--'] }
+    };
+
+    const ALIASES = {
+        py: 'python', python3: 'python', js: 'javascript', jsx: 'javascript', ts: 'typescript', tsx: 'typescript',
+        sh: 'bash', shell: 'bash', zsh: 'bash', console: 'bash', golang: 'go', rs: 'rust', 'c++': 'cpp', cc: 'cpp',
+        h: 'c', hpp: 'cpp', yml: 'yaml', xml: 'html', scss: 'css', less: 'css', postgresql: 'sql', mysql: 'sql'
+    };
+
+    const tokenizers = {};
+
+    function escapeHtml(text) {
+        return text.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;').replace(/"/g, '&quot;');
+    }
+
+    function span(color, text) {
+        return `<span style="color: ${color}">${escapeHtml(text)}</span>`;
+    }
+
+    // 每种语言编译一次的词法正则：注释 | 字符串 | 数字 | 标识符 | 运算符
+    function getTokenizer(name) {
+        if (tokenizers[name]) return tokenizers[name];
+        const language = LANGUAGES[name] || { keywords: '', comments: [] };
+        const comments = language.comments.map(start => {
+            if (start === '/*') return '\\/\\*[\\s\\S]*?(?:\\*\\/|$)';
+            if (start === '<!--') return '<!--[\\s\\S]*?(?:-->|$)';
+            return start.replace(/[/#-]/g, '\\$&') + '[^\\n]*';
+        });
+        const strings = [];
+        if (language.triple) strings.push('"""[\\s\\S]*?(?:"""|$)', "'''[\\s\\S]*?(?:'''|$)");
+        strings.push('"(?:\\\\.|[^"\\\\\\n])*"?', "'(?:\\\\.|[^'\\\\\\n])*'?");
+        if (language.template) strings.push('`(?:\\\\.|[^`\\\\])*`?');
+        const parts = [
+            comments.length ? comments.join('|') : '(?!)',
+            strings.join('|'),
+            '\\b(?:0[xX][0-9a-fA-F_]+|\\d[\\d_]*(?:\\.\\d+)?(?:[eE][+-]?\\d+)?)\\b',
+            '[A-Za-z_$][\\w$]*',
+            '[+\\-*/%=<>!&|^~?:]+'
+        ];
+        const keywords = new Set(language.keywords.split(' ').filter(Boolean).map(word => language.ignoreCase ? word.toLowerCase() : word));
+        tokenizers[name] = {
+            pattern: new RegExp(parts.map(part => `(${part})`).join('|'), 'g'),
+            keywords,
+            ignoreCase: !!language.ignoreCase
+        };
+        return tokenizers[name];
+    }
+
+    function highlightCode(code, lang) {
+        const name = ALIASES[(lang || '').toLowerCase()] || (lang || '').toLowerCase();
+        const tokenizer = getTokenizer(name);
+        const pattern = tokenizer.pattern;
+        let html = '';
+        let last = 0;
+        let previousWord = '';
+        let match;
+        pattern.lastIndex = 0;
+        while ((match = pattern.exec(code)) !== null) {
+            if (match[0] === '') {
+                pattern.lastIndex++;
+                continue;
+            }
+            html += escapeHtml(code.slice(last, match.index));
+            last = pattern.lastIndex;
+            const [token, comment, string, number, word] = match;
+            if (comment) {
+                html += span(COLORS.comment, token);
+            } else if (string) {
+                html += span(COLORS.string, token);
+            } else if (number) {
+                html += span(COLORS.number, token);
+            } else if (word) {
+                const key = tokenizer.ignoreCase ? word.toLowerCase() : word;
+                if (tokenizer.keywords.has(key)) {
+                    html += span(COLORS.keyword, token);
+                } else if (/^(def|function|fn|func|class)$/.test(previousWord) || code[last] === '(') {
+                    html += span(COLORS.function, token);
+                } else {
+                    html += escapeHtml(token);
+                }
+                previousWord = word;
+                continue;
+            } else {
+                html += span(COLORS.operator, token);
+            }
+            previousWord = '';
+        }
+        html += escapeHtml(code.slice(last));
+        return '<div class="highlight" style="background: #272822"><pre style="line-height: 125%; color: #F8F8F2;"><code>' +
+            html + '\n</code></pre></div>';
+    }
+
+    function safeUrl(url) {
+        const decoded = url.replace(/&amp;/g, '&');
+        return /^\s*(javascript|vbscript|data):/i.test(decoded) ? '#' : url;
+    }
+
+    function slugify(text) {
+        return text.toLowerCase().replace(/<[^>]*>/g, '').replace(/[^\p{L}\p{N}\s_-]/gu, '').trim().replace(/[\s]+/g, '-');
+    }
+
+    // 行内语法：先把代码、转义字符和自动链接替换为占位符，再处理链接和强调
+    function renderInline(text, refs) {
+        const stash = [];
+        const hold = html => `\u0000${stash.push(html) - 1}\u0000`;
+
+        text = text.replace(/(`+)([\s\S]*?[^`])\1(?!`)/g, (_, ticks, code) => hold(`<code>${escapeHtml(code.trim())}</code>`));
+        text = text.replace(/\\([\\`*_{}\[\]()#+\-.!|>~])/g, (_, char) => hold(escapeHtml(char)));
+        text = text.replace(/<(https?:\/\/[^\s>]+)>/g, (_, url) => hold(`<a href="${escapeHtml(url)}">${escapeHtml(url)}</a>`));
+        text = escapeHtml(text);
+
+        const link = (label, url, title, image) => {
+            const titleAttr = title ? ` title="${title}"` : '';
+            return image
+                ? hold(`<img alt="${label}" src="${safeUrl(url)}"${titleAttr} />`)
+                : `<a href="${safeUrl(url)}"${titleAttr}>${label}</a>`;
+        };
+        text = text.replace(/(!?)\[([^\]]*)\]\(\s*([^\s)]+)(?:\s+&quot;(.*?)&quot;)?\s*\)/g,
+            (_, bang, label, url, title) => link(label, url, title, bang === '!'));
+        text = text.replace(/(!?)\[([^\]]+)\](?:\s?\[([^\]]*)\])?/g, (whole, bang, label, ref) => {
+            const definition = refs[(ref || label).toLowerCase()];
+            return definition ? link(label, escapeHtml(definition.url), definition.title && escapeHtml(definition.title), bang === '!') : whole;
+        });
+
+        text = text.replace(/\*\*(?=\S)([\s\S]*?\S)\*\*/g, '<strong>$1</strong>');
+        text = text.replace(/(^|[^\w])__(?=\S)([\s\S]*?\S)__(?!\w)/g, '$1<strong>$2</strong>');
+        text = text.replace(/\*(?=\S)([\s\S]*?\S)\*/g, '<em>$1</em>');
+        text = text.replace(/(^|[^\w])_(?=\S)([\s\S]*?\S)_(?!\w)/g, '$1<em>$2</em>');
+
+        // 段内换行转为 <br />（与服务端 nl2br 扩展一致）
+        text = text.replace(/\n/g, '<br />\n');
+        while (text.includes('\u0000')) {
+            text = text.replace(/\u0000(\d+)\u0000/g, (_, index) => stash[Number(index)]);
+        }
+        return text;
+    }
+
+    const FENCE_RE = /^ {0,3}(`{3,}|~{3,})\s*\{?\.?([\w+#.-]*)[^`]*$/;
+    const HEADING_RE = /^ {0,3}(#{1,6})(?:\s+(.*?))?(?:\s+#+)?\s*$/;
+    const HR_RE = /^ {0,3}([-*_])(?:\s*\1){2,}\s*$/;
+    const QUOTE_RE = /^ {0,3}> ?/;
+    const LIST_RE = /^( {0,3})([*+-]|\d+[.)])(\s+|$)(.*)$/;
+    const TABLE_SEP_RE = /^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$/;
+    const INDENTED_RE = /^(?: {4}|\t)/;
+    const SETEXT_RE = /^ {0,3}(=+|-+)\s*$/;
+
+    function startsBlock(line) {
+        return FENCE_RE.test(line) || HEADING_RE.test(line) || HR_RE.test(line) || QUOTE_RE.test(line) || LIST_RE.test(line);
+    }
+
+    function splitRow(line) {
+        const cells = [];
+        let current = '';
+        const trimmed = line.trim().replace(/^\|/, '').replace(/(^|[^\\])\|$/, '$1');
+        for (let i = 0; i < trimmed.length; i++) {
+            if (trimmed[i] === '\\' && trimmed[i + 1] === '|') {
+                current += '|';
+                i++;
+            } else if (trimmed[i] === '|') {
+                cells.push(current.trim());
+                current = '';
+            } else {
+                current += trimmed[i];
+            }
+        }
+        cells.push(current.trim());
+        return cells;
+    }
+
+    function renderTable(header, separator, rows, refs) {
+        const aligns = splitRow(separator).map(cell => {
+            const left = cell.startsWith(':');
+            const right = cell.endsWith(':');
+            return left && right ? 'center' : right ? 'right' : left ? 'left' : '';
+        });
+        const cell = (tag, text, index) => {
+            const align = aligns[index] ? ` style="text-align: ${aligns[index]};"` : '';
+            return `<${tag}${align}>${renderInline(text || '', refs)}</${tag}>`;
+        };
+        const headerCells = splitRow(header);
+        let html = '<table>\n<thead>\n<tr>\n' + headerCells.map((text, index) => cell('th', text, index)).join('\n') + '\n</tr>\n</thead>\n<tbody>\n';
+        for (const row of rows) {
+            const cells = splitRow(row);
+            html += '<tr>\n' + headerCells.map((_, index) => cell('td', cells[index], index)).join('\n') + '\n</tr>\n';
+        }
+        return html + '</tbody>\n</table>';
+    }
+
+    function renderList(lines, start, refs) {
+        const first = lines[start].match(LIST_RE);
+        const ordered = /\d/.test(first[2]);
+        const markerType = ordered ? first[2].slice(-1) : first[2];
+        const items = [];
+        let loose = false;
+        let i = start;
+
+        while (i < lines.length) {
+            const match = lines[i].match(LIST_RE);
+            if (!match) break;
+            const type = /\d/.test(match[2]) ? match[2].slice(-1) : match[2];
+            if (type !== markerType || /\d/.test(match[2]) !== ordered) break;
+
+            const spaces = match[3].length > 4 || match[3].length === 0 ? 1 : match[3].length;
+            const indent = match[1].length + match[2].length + spaces;
+            const item = [match[4]];
+            i++;
+            while (i < lines.length) {
+                const line = lines[i];
+                if (!line.trim()) {
+                    // 空行之后仍然缩进的内容属于当前项，否则列表项结束
+                    let next = i + 1;
+                    while (next < lines.length && !lines[next].trim()) next++;
+                    if (next < lines.length && /^\s*/.exec(lines[next])[0].replace(/\t/g, '    ').length >= indent) {
+                        loose = true;
+                        for (; i < next; i++) item.push('');
+                        continue;
+                    }
+                    break;
+                }
+                const leading = /^\s*/.exec(line)[0].replace(/\t/g, '    ').length;
+                if (leading >= indent) {
+                    item.push(line.replace(/\t/g, '    ').slice(indent));
+                } else if (LIST_RE.test(line) || startsBlock(line)) {
+                    break;
+                } else {
+                    item.push(line.trim());  // 惰性续行
+                }
+                i++;
+            }
+            items.push(item);
+
+            // 列表项之间的空行使列表变为松散列表
+            let next = i;
+            while (next < lines.length && !lines[next].trim()) next++;
+            if (next > i && next < lines.length && LIST_RE.test(lines[next])) {
+                const nextMatch = lines[next].match(LIST_RE);
+                const nextType = /\d/.test(nextMatch[2]) ? nextMatch[2].slice(-1) : nextMatch[2];
+                if (nextType === markerType) {
+                    loose = true;
+                    i = next;
+                }
+            }
+        }
+
+        const startNumber = ordered ? parseInt(first[2], 10) : 1;
+        const open = ordered ? (startNumber !== 1 ? `<ol start="${startNumber}">` : '<ol>') : '<ul>';
+        const html = items.map(item => `<li>${renderBlocks(item, refs, !loose)}</li>`).join('\n');
+        return { html: `${open}\n${html}\n${ordered ? '</ol>' : '</ul>'}`, next: i };
+    }
+
+    // 块级语法；tight 为 true 时（紧凑列表项中）段落不包 <p>
+    function renderBlocks(lines, refs, tight) {
+        const out = [];
+        let i = 0;
+        while (i < lines.length) {
+            const line = lines[i];
+            if (!line.trim()) {
+                i++;
+                continue;
+            }
+            let match;
+
+            if ((match = line.match(FENCE_RE))) {
+                const fence = match[1];
+                const closing = new RegExp(`^ {0,3}${fence[0] === '`' ? '`' : '~'}{${fence.length},}\\s*$`);
+                const code = [];
+                for (i++; i < lines.length && !closing.test(lines[i]); i++) code.push(lines[i]);
+                i++;
+                out.push(highlightCode(code.join('\n'), match[2]));
+                continue;
+            }
+
+            if (INDENTED_RE.test(line)) {
+                const code = [];
+                while (i < lines.length && (INDENTED_RE.test(lines[i]) || !lines[i].trim())) {
+                    code.push(lines[i].replace(/^(?: {4}|\t)/, ''));
+                    i++;
+                }
+                while (code.length && !code[code.length - 1].trim()) code.pop();
+                out.push(highlightCode(code.join('\n'), ''));
+                continue;
+            }
+
+            if ((match = line.match(HEADING_RE))) {
+                const level = match[1].length;
+                const content = renderInline(match[2] || '', refs);
+                out.push(`<h${level} id="${slugify(content)}">${content}</h${level}>`);
+                i++;
+                continue;
+            }
+
+            if (HR_RE.test(line)) {
+                out.push('<hr />');
+                i++;
+                continue;
+            }
+
+            if (QUOTE_RE.test(line)) {
+                const quoted = [];
+                while (i < lines.length && lines[i].trim()) {
+                    quoted.push(lines[i].replace(QUOTE_RE, ''));
+                    i++;
+                }
+                out.push(`<blockquote>\n${renderBlocks(quoted, refs, false)}\n</blockquote>`);
+                continue;
+            }
+
+            if (LIST_RE.test(line) && (LIST_RE.exec(line)[4].trim() || LIST_RE.exec(line)[3])) {
+                const list = renderList(lines, i, refs);
+                out.push(list.html);
+                i = list.next;
+                continue;
+            }
+
+            if (line.includes('|') && i + 1 < lines.length && lines[i + 1].includes('|') && TABLE_SEP_RE.test(lines[i + 1])) {
+                const header = line;
+                const separator = lines[i + 1];
+                const rows = [];
+                for (i += 2; i < lines.length && lines[i].trim() && lines[i].includes('|'); i++) rows.push(lines[i]);
+                out.push(renderTable(header, separator, rows, refs));
+                continue;
+            }
+
+            // 段落，遇到空行或其他块级语法结束；下一行是 === / --- 时为 setext 标题
+            const paragraph = [line.trim()];
+            for (i++; i < lines.length && lines[i].trim() && !SETEXT_RE.test(lines[i]) && !startsBlock(lines[i]) && !INDENTED_RE.test(lines[i]); i++) {
+                paragraph.push(lines[i].trim());
+            }
+            const setext = i < lines.length ? lines[i].match(SETEXT_RE) : null;
+            if (setext) {
+                const level = setext[1][0] === '=' ? 1 : 2;
+                const content = renderInline(paragraph.join('\n'), refs);
+                out.push(`<h${level} id="${slugify(content)}">${content}</h${level}>`);
+                i++;
+                continue;
+            }
+            const content = renderInline(paragraph.join('\n'), refs);
+            out.push(tight ? content : `<p>${content}</p>`);
+        }
+        return out.join('\n');
+    }
+
+    // 收集引用式链接定义并从正文中移除
+    function extractReferences(text) {
+        const refs = {};
+        const body = text.replace(/^ {0,3}\[([^\]]+)\]:\s*<?(\S+?)>?(?:\s+["'(](.*)["')])?\s*$/gm, (_, label, url, title) => {
+            refs[label.toLowerCase()] = { url, title };
+            return '';
+        });
+        return { refs, body };
+    }
+
+    function render(text) {
+        if (!text) return '';
+        const { refs, body } = extractReferences(text.replace(/\r\n?/g, '\n'));
+        return renderBlocks(body.split('\n'), refs, false);
+    }
+
+    global.FeedbackMarkdown = { render, highlight: highlightCode };
+})(typeof window !== 'undefined' ? window : globalThis);
@@ -0,0 +1,201 @@
+# Answer suggestions for Interactive Feedback MCP
+# 用户经常输入相同的回答。输入时根据以前的回答给出补全建议：以已输入的内容为前缀，
+# 按使用次数和最近使用排序，曾经回答过相似问题的回答排在前面。
+# 索引在界面进程启动时从历史记录加载，之后每次回答都增量更新（常驻Web会话和代理进程）。
+#
+# FEEDBACK_SUGGESTIONS          设为 0 时关闭补全建议，默认开启
+# FEEDBACK_SUGGESTIONS_MAX_KB   建议索引的内存上限（KiB），默认 512，超过后淘汰最少使用的回答
+#
+# 索引是按小写文本排序的数组：前缀查询用二分查找定位区间，再从区间中取权重最高的几条；
+# 一到两个字符的前缀区间可能很大，其结果缓存到下一次更新。
+import os
+import re
+import sys
+import heapq
+import bisect
+import hashlib
+import threading
+from typing import Dict, List, Optional, Set
+
+# 作为建议的回答最大长度，更长的回答通常只适用于当时的问题
+MAX_SUGGESTION_LENGTH = 200
+
+# 每条建议除文本外的估算内存开销（字节），用于内存上限：条目对象、字典和数组中的引用、
+# 相似问题的键和反向索引
+ENTRY_OVERHEAD = 460
+
+# 超过内存上限时一次淘汰到上限的这个比例，避免之后每加入一条都要重新挑选
+EVICT_TO_RATIO = 0.9
+
+# 启动时从历史记录加载的最近回答数量
+STARTUP_ROWS = 5000
+
+# 每条回答记住的相似问题数量
+MAX_PROMPTS_PER_ANSWER = 8
+
+# 结果会被缓存的最长前缀
+CACHED_PREFIX_LENGTH = 2
+
+# 回答过相似问题时增加的权重，相当于多使用了这么多次
+SIMILAR_PROMPT_BOOST = 10
+
+def suggestions_enabled() -> bool:
+    """检查 FEEDBACK_SUGGESTIONS 环境变量"""
+    return os.environ.get('FEEDBACK_SUGGESTIONS', '1').lower() not in ('0', 'false', 'no', 'off')
+
+def get_max_bytes() -> int:
+    """读取 FEEDBACK_SUGGESTIONS_MAX_KB 环境变量"""
+    try:
+        return max(16, int(os.environ.get('FEEDBACK_SUGGESTIONS_MAX_KB', '512'))) * 1024
+    except ValueError:
+        return 512 * 1024
+
+def prompt_key(prompt: str) -> bytes:
+    """相似问题的键：忽略大小写、空白和数字的差异（例如"第 3 步完成，是否继续？"）"""
+    normalized = re.sub(r'\d+', '#', " ".join(prompt.lower().split()))
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).digest()
+
+class _Entry:
+    __slots__ = ('key', 'text', 'count', 'last_used', 'prompts')
+
+    def __init__(self, key: str, text: str):
+        self.key = key
+        self.text = text
+        self.count = 0
+        self.last_used = 0
+        self.prompts: tuple = ()  # 最近回答过的相似问题，最多 MAX_PROMPTS_PER_ANSWER 个
+
+class SuggestionIndex:
+    """以前回答的前缀索引，内存占用不超过 max_bytes"""
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes or get_max_bytes()
+        self._lock = threading.Lock()
+        self._keys: List[str] = []  # 按小写文本排序
+        self._entries: Dict[str, _Entry] = {}
+        self._by_prompt: Dict[bytes, Set[str]] = {}  # 相似问题 -> 回答过它的回答
+        self._cache: Dict[tuple, List[str]] = {}
+        self._bytes = 0
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def add(self, answer: str, prompt: Optional[str] = None):
+        """加入（或再次使用）一条回答"""
+        text = answer.strip()
+        if not text or len(text) > MAX_SUGGESTION_LENGTH:
+            return
+        key = text.lower()
+        with self._lock:
+            self._seq += 1
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(key, text)
+                bisect.insort(self._keys, key)
+                self._bytes += self._entry_size(entry)
+            elif entry.text != text:
+                self._bytes += self._text_size(text) - self._text_size(entry.text)
+            entry.text = key if text == key else text  # 全小写的回答不必保存两份
+            entry.count += 1
+            entry.last_used = self._seq
+            if prompt:
+                similar = prompt_key(prompt)
+                if similar not in entry.prompts:
+                    if len(entry.prompts) >= MAX_PROMPTS_PER_ANSWER:
+                        self._unlink_prompt(entry, entry.prompts[0])
+                        entry.prompts = entry.prompts[1:]
+                    entry.prompts += (similar,)
+                    self._by_prompt.setdefault(similar, set()).add(key)
+            if self._bytes > self.max_bytes:
+                self._evict(keep=key)
+            self._cache.clear()
+
+    @staticmethod
+    def _text_size(text: str) -> int:
+        return 0 if text == text.lower() else len(text.encode('utf-8'))
+
+    def _entry_size(self, entry: _Entry) -> int:
+        return ENTRY_OVERHEAD + len(entry.key.encode('utf-8')) + self._text_size(entry.text)
+
+    def _unlink_prompt(self, entry: _Entry, similar: bytes):
+        keys = self._by_prompt.get(similar)
+        if keys is not None:
+            keys.discard(entry.key)
+            if not keys:
+                del self._by_prompt[similar]
+
+    def _evict(self, keep: str):
+        """按使用次数和最近使用淘汰回答，直到内存占用降到上限的 EVICT_TO_RATIO"""
+        target = self.max_bytes * EVICT_TO_RATIO
+        for victim in sorted(self._entries.values(), key=lambda entry: (entry.count, entry.last_used)):
+            if self._bytes <= target:
+                break
+            if victim.key == keep:
+                continue
+            del self._entries[victim.key]
+            for similar in victim.prompts:
+                self._unlink_prompt(victim, similar)
+            self._bytes -= self._entry_size(victim)
+        self._keys = sorted(self._entries)
+
+    def _weight(self, entry: _Entry, similar: Optional[bytes]) -> tuple:
+        boost = SIMILAR_PROMPT_BOOST if similar is not None and similar in entry.prompts else 0
+        return (entry.count + boost, entry.last_used)
+
+    def suggest(self, prefix: str, prompt: Optional[str] = None, limit: int = 5) -> List[str]:
+        """返回以 prefix 开头的回答（不区分大小写）；prefix 为空时返回回答过相似问题的回答"""
+        key = prefix.lstrip().lower()
+        if len(key) > MAX_SUGGESTION_LENGTH:
+            return []
+        similar = prompt_key(prompt) if prompt else None
+        with self._lock:
+            cache_key = (key, similar, limit)
+            if len(key) <= CACHED_PREFIX_LENGTH and cache_key in self._cache:
+                return self._cache[cache_key]
+            if key:
+                low = bisect.bisect_left(self._keys, key)
+                high = bisect.bisect_left(self._keys, key + '\U0010ffff')
+                candidates = (self._entries[k] for k in self._keys[low:high] if k != key)
+            elif similar is not None:
+                candidates = (self._entries[k] for k in self._by_prompt.get(similar, ()))
+            else:
+                return []
+            best = heapq.nlargest(limit, candidates, key=lambda entry: self._weight(entry, similar))
+            result = [entry.text for entry in best]
+            if len(key) <= CACHED_PREFIX_LENGTH:
+                self._cache[cache_key] = result
+            return result
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_suggestion_index() -> Optional[SuggestionIndex]:
+    """进程内共用的建议索引，第一次调用时从历史记录加载；关闭建议时返回None"""
+    global _index
+    if not suggestions_enabled():
+        return None
+    with _index_lock:
+        if _index is None:
+            index = SuggestionIndex()
+            try:
+                from history import get_history_store
+                for prompt, answer in get_history_store().recent_answers(STARTUP_ROWS, MAX_SUGGESTION_LENGTH):
+                    index.add(answer, prompt)
+            except Exception as e:
+                print(f"⚠️ 加载回答建议失败: {e}", file=sys.stderr)
+            _index = index
+        return _index
+
+def preload_suggestion_index():
+    """在后台线程中加载建议索引，界面显示后调用，用户开始输入时不用再等待"""
+    if suggestions_enabled() and _index is None:
+        threading.Thread(target=get_suggestion_index, name="feedback-suggestions", daemon=True).start()
+
+def loaded_suggestion_index() -> Optional[SuggestionIndex]:
+    """已经加载的建议索引（没有加载时不触发加载），用于增量更新"""
+    return _index
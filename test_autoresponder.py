@@ -0,0 +1,52 @@
+"""
+自动回复规则的回归测试（python -m pytest test_autoresponder.py）
+自动回复不显示界面，规则写错时会悄悄替用户作答，这里覆盖匹配和规则校验
+"""
+
+import json
+
+from autoresponder import AutoResponder, RuleSet
+
+DANGEROUS = "Delete the production database now?"
+
+def test_keywords_require_every_word():
+    rules = RuleSet([{"name": "tests", "keywords": ["run", "tests"], "answer": "yes"}])
+    assert rules.match("Should I run the tests?").name == "tests"
+    assert rules.match("Should I run the migration?") is None
+
+def test_pattern_and_options():
+    rules = RuleSet([
+        {"name": "continue", "pattern": "是否继续|should I (continue|proceed)", "answer": "继续"},
+        {"name": "yes-no", "options": ["是", "否"], "answer": "{first_option}"},
+    ])
+    assert rules.match("第 3 步完成，是否继续？").name == "continue"
+    assert rules.match("Should I proceed with the deploy?").name == "continue"
+    assert rules.match("随便问问", ["否", "是"]).name == "yes-no"
+    assert rules.match("随便问问", ["是"]) is None
+
+def test_string_keywords_rule_is_rejected(capsys):
+    # "keywords": "continue" 会被逐字拆开，几乎匹配所有问题
+    rules = RuleSet([{"name": "typo", "keywords": "continue", "answer": "y"}])
+    assert rules.rules == []
+    assert rules.match(DANGEROUS) is None
+    assert "忽略自动回复规则 #1" in capsys.readouterr().err
+
+def test_string_options_rule_is_rejected():
+    rules = RuleSet([{"name": "typo", "options": "yes", "answer": "y"}])
+    assert rules.rules == []
+    assert rules.match(DANGEROUS, ["y", "e", "s"]) is None
+
+def test_non_string_items_are_rejected():
+    rules = RuleSet([
+        {"name": "numbers", "keywords": [1, 2], "answer": "y"},
+        {"name": "pattern", "pattern": ["delete"], "answer": "y"},
+        {"name": "ok", "keywords": ["deploy"], "answer": "y"},
+    ])
+    assert [rule.name for rule in rules.rules] == ["ok"]
+
+def test_invalid_rule_does_not_answer_request(tmp_path, monkeypatch):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"rules": [{"name": "typo", "keywords": "continue", "answer": "y"}]}), encoding="utf-8")
+    monkeypatch.setenv("FEEDBACK_RULES_FILE", str(path))
+    request = {"summary": DANGEROUS, "predefined_options": None, "questions": None}
+    assert AutoResponder().respond(request) is None
@@ -0,0 +1,34 @@
+"""
+回答历史的回归测试（python -m pytest test_history.py）
+"""
+
+import os
+import stat
+
+import pytest
+
+from history import HistoryStore
+
+def record_and_flush(store: HistoryStore):
+    store.record({'summary': 'deploy the service now', 'predefined_options': []}, {'cursor_usage_opt': 'yes please'}, 'ws')
+    store.flush()
+
+@pytest.mark.skipif(os.name != 'posix', reason="文件权限只在 POSIX 平台上检查")
+def test_database_is_private(tmp_path):
+    directory = tmp_path / "history"
+    directory.mkdir(mode=0o755)
+    store = HistoryStore(str(directory / "h.sqlite3"))
+    record_and_flush(store)
+    assert stat.S_IMODE(directory.stat().st_mode) == 0o700
+    for suffix in ('', '-wal', '-shm'):
+        path = directory / f"h.sqlite3{suffix}"
+        if path.exists():
+            assert stat.S_IMODE(path.stat().st_mode) == 0o600
+
+def test_reader_opened_before_schema(tmp_path):
+    path = tmp_path / "h.sqlite3"
+    path.touch()  # 写入线程已创建文件，还没有建表
+    store = HistoryStore(str(path))
+    assert store.search('service') == []
+    record_and_flush(store)
+    assert [row['answer'] for row in store.search('service')] == ['yes please']
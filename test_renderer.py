@@ -0,0 +1,32 @@
+"""
+按块渲染的回归测试（python -m pytest test_renderer.py）
+按块渲染拼接的结果必须与整篇渲染一致，用例与 benchmark.py blocks 相同
+"""
+
+import re
+
+import pytest
+
+from benchmark import BLOCK_CASES
+from renderer import BlockRenderer, split_markdown_blocks
+
+def normalize(html_content: str) -> str:
+    return re.sub(r'>\s+<', '><', html_content.strip())
+
+@pytest.mark.parametrize("case", BLOCK_CASES)
+def test_blocks_match_whole_document(case):
+    renderer = BlockRenderer(use_pool=False)
+    whole = renderer.render(case)
+    blocks = "\n".join(html_content for _, html_content in renderer.iter_blocks(case))
+    assert normalize(blocks) == normalize(whole)
+
+def test_html_comment_is_not_split():
+    assert split_markdown_blocks("<!--\n\ncomment\n\n-->\n\nafter") == ["<!--\n\ncomment\n\n-->", "after"]
+
+def test_renumbered_heading_changes_block_id():
+    # 两篇文档中的 "# a" 是同一个块，但标题ID取决于前面的块，块ID必须不同，页面才不会沿用旧的HTML
+    renderer = BlockRenderer(use_pool=False)
+    (_, first), (renumbered_id, renumbered) = renderer.render_blocks("## a\n\n# a")
+    (_, _), (plain_id, plain) = renderer.render_blocks("# b\n\n# a")
+    assert (renumbered, plain) == ('<h1 id="a_1">a</h1>', '<h1 id="a">a</h1>')
+    assert renumbered_id != plain_id
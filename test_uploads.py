@@ -0,0 +1,62 @@
+"""
+分块上传的回归测试（python -m pytest test_uploads.py）
+续传只凭上传编号找到部分文件，这里覆盖元数据相同的不同文件和完成时的校验
+"""
+
+import hashlib
+import io
+
+import pytest
+
+from uploads import UPLOAD_HEAD_SIZE, UploadError, UploadSpool
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+@pytest.fixture
+def spool(tmp_path, monkeypatch):
+    monkeypatch.setenv("FEEDBACK_ATTACHMENT_DIR", str(tmp_path / "attachments"))
+    return UploadSpool(str(tmp_path / "uploads"))
+
+def upload(spool, data: bytes, chunk: int, **hashes):
+    state = spool.start("report.bin", len(data), "", "1700000000000", **hashes)
+    while 'attachment' not in state:
+        piece = data[state['offset']:state['offset'] + chunk]
+        state = spool.write_chunk(state['upload_id'], state['offset'], io.BytesIO(piece), len(piece), sha256(piece))
+    return state['attachment']
+
+def test_same_metadata_different_content_gets_new_upload(spool):
+    first = b"a" * 100
+    second = b"b" * 100
+    state = spool.start("report.bin", 100, "", "1700000000000", head_sha256=sha256(first))
+    spool.write_chunk(state['upload_id'], 0, io.BytesIO(first[:40]), 40)
+    other = spool.start("report.bin", 100, "", "1700000000000", head_sha256=sha256(second))
+    assert other['upload_id'] != state['upload_id']
+    assert other['offset'] == 0
+    resumed = spool.start("report.bin", 100, "", "1700000000000", head_sha256=sha256(first))
+    assert resumed['offset'] == 40
+
+def test_checksum_is_required(spool):
+    with pytest.raises(UploadError):
+        spool.start("report.bin", 10, "", "1")
+
+def test_upload_verifies_head_and_full_hash(spool):
+    data = bytes(range(256)) * (UPLOAD_HEAD_SIZE // 256 + 10)
+    attachment = upload(spool, data, 300_000, head_sha256=sha256(data[:UPLOAD_HEAD_SIZE]), sha256=sha256(data))
+    assert attachment['sha256'] == sha256(data)
+    with open(attachment['path'], 'rb') as f:
+        assert f.read() == data
+
+def test_spliced_content_is_rejected(spool):
+    # 开头相同、后面不同的两个文件得到同一个编号，前一个文件的内容留在部分文件中
+    size = UPLOAD_HEAD_SIZE + 100
+    original = b"x" * UPLOAD_HEAD_SIZE + b"1" * 100
+    changed = b"x" * UPLOAD_HEAD_SIZE + b"2" * 100
+    state = spool.start("report.bin", size, "", "1", head_sha256=sha256(original[:UPLOAD_HEAD_SIZE]))
+    spool.write_chunk(state['upload_id'], 0, io.BytesIO(original[:size - 20]), size - 20)
+    resumed = spool.start("report.bin", size, "", "1", head_sha256=sha256(changed[:UPLOAD_HEAD_SIZE]), sha256=sha256(changed))
+    assert resumed['offset'] == size - 20
+    with pytest.raises(UploadError, match="checksum mismatch"):
+        spool.write_chunk(state['upload_id'], size - 20, io.BytesIO(changed[-20:]), 20)
+    with pytest.raises(UploadError):
+        spool.status(state['upload_id'])  # 丢弃后重新选择文件会从头上传
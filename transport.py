@@ -0,0 +1,111 @@
+# Network transport for Interactive Feedback MCP
+# 默认每个 Cursor / Cline / Windsurf 窗口通过 stdio 启动一个服务器进程，各自启动界面、占用端口。
+# HTTP 模式下由一个常驻的服务器进程同时服务多个客户端：共享同一个排队队列、同一个常驻 Web 会话
+# （同一个端口和渲染缓存），每增加一个客户端只多一个 MCP 会话的开销。
+#
+# FEEDBACK_TRANSPORT   stdio（默认）、http（Streamable HTTP）或 sse
+# FEEDBACK_HTTP_HOST   HTTP 模式的监听地址，默认 127.0.0.1
+# FEEDBACK_HTTP_PORT   HTTP 模式的监听端口，默认 8765
+import os
+import time
+import weakref
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+
+from profiling import current_rss_kb
+
+TRANSPORTS = ('stdio', 'http', 'sse')
+
+# 最多记录的客户端会话数量，超过后丢弃最久没有活动的会话
+MAX_TRACKED_CLIENTS = 1024
+
+def get_transport() -> str:
+    """读取 FEEDBACK_TRANSPORT 环境变量"""
+    transport = os.environ.get('FEEDBACK_TRANSPORT', 'stdio').strip().lower()
+    if transport == 'streamable-http':
+        return 'http'
+    return transport if transport in TRANSPORTS else 'stdio'
+
+def get_http_config() -> dict:
+    """读取 HTTP 模式的监听地址和端口"""
+    host = os.environ.get('FEEDBACK_HTTP_HOST', '127.0.0.1')
+    try:
+        port = int(os.environ.get('FEEDBACK_HTTP_PORT', '8765'))
+    except ValueError:
+        port = 8765
+    return {'host': host, 'port': port}
+
+class ClientTracker(Middleware):
+    """记录连接到服务器的客户端会话，并估算每个客户端的内存开销
+
+    基准内存在第一个客户端连接时读取（此时服务器已完成启动），之后的内存增长按客户端数量平均。
+    每条记录持有MCP会话对象的弱引用，客户端断开、会话对象被回收后记录随之删除。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = OrderedDict()  # 会话ID -> 客户端信息，按最近活动排序
+        self.total_clients = 0
+        self.baseline_rss_kb = None
+
+    async def on_message(self, context: MiddlewareContext, call_next):
+        ctx = context.fastmcp_context
+        session_id = session = None
+        if ctx is not None:
+            try:
+                session_id = ctx.session_id
+                session = ctx.session
+            except Exception:
+                session_id = None  # 初始化完成之前还没有会话
+        if session_id:
+            self._touch(session_id, context.method, session)
+        return await call_next(context)
+
+    def _touch(self, session_id: str, method: Optional[str], session=None):
+        now = time.time()
+        with self._lock:
+            self._prune()
+            client = self._clients.get(session_id)
+            if client is None:
+                if self.baseline_rss_kb is None:
+                    self.baseline_rss_kb = current_rss_kb()
+                client = {'first_seen': now, 'messages': 0, 'tool_calls': 0,
+                          'session': weakref.ref(session) if session is not None else None}
+                self._clients[session_id] = client
+                self.total_clients += 1
+                while len(self._clients) > MAX_TRACKED_CLIENTS:
+                    self._clients.popitem(last=False)
+            else:
+                self._clients.move_to_end(session_id)
+            client['last_seen'] = now
+            client['messages'] += 1
+            if method == 'tools/call':
+                client['tool_calls'] += 1
+
+    def _prune(self):
+        """删除会话已经结束（会话对象已被回收）的客户端，调用方持有锁"""
+        closed = [session_id for session_id, client in self._clients.items()
+                  if client['session'] is not None and client['session']() is None]
+        for session_id in closed:
+            del self._clients[session_id]
+
+    def stats(self) -> dict:
+        """已连接的客户端数量、当前内存以及平均每个客户端增加的内存"""
+        rss = current_rss_kb()
+        with self._lock:
+            self._prune()
+            clients = len(self._clients)
+            total = self.total_clients
+        per_client = None
+        if rss is not None and self.baseline_rss_kb is not None and clients:
+            per_client = round((rss - self.baseline_rss_kb) / clients, 1)
+        return {
+            'clients': clients,
+            'total_clients': total,
+            'rss_kb': rss,
+            'baseline_rss_kb': self.baseline_rss_kb,
+            'rss_per_client_kb': per_client,
+        }
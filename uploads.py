@@ -0,0 +1,241 @@
+# Chunked uploads for Interactive Feedback MCP
+# Web 界面（通常经过 ssh -L 隧道）上传文件附件：页面把文件切成小块逐块上传，每块附带 SHA-256，
+# 服务器校验后追加到暂存目录中的部分文件。连接中断后页面查询已收到的字节数，从断点继续上传；
+# 页面刷新后重新选择同一个文件也能继续（上传编号由文件名、大小、修改时间和文件开头 1 MiB 的 SHA-256 决定，
+# 元数据相同的不同文件不会续传到对方的部分文件中）。较小的文件页面还附带整个文件的 SHA-256，完成时一并核对。
+# 请求体按块写入磁盘，内存占用与文件大小无关。上传完成后文件移入附件目录，工具结果中引用该附件。
+#
+# FEEDBACK_UPLOAD_MAX_MB   单个上传文件的大小上限（MiB），默认 512
+# FEEDBACK_UPLOAD_DIR      未完成上传的暂存目录，默认为附件目录下的 uploads
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from typing import BinaryIO, Dict, Optional
+
+from attachments import CHUNK_SIZE, describe_size, get_attachment_dir, get_attachment_ttl, register_attachment
+
+# 页面每次上传的块大小，以及服务器接受的最大块
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_CHUNK_SIZE = 8 * 1024 * 1024
+# 页面对文件开头这么多字节计算 SHA-256，作为上传编号的一部分
+UPLOAD_HEAD_SIZE = UPLOAD_CHUNK_SIZE
+
+_ID_PATTERN = re.compile(r'^[0-9a-f]{16}$')
+_SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+class UploadError(Exception):
+    """上传请求无效；status 为返回给页面的 HTTP 状态码"""
+
+    def __init__(self, message: str, status: int = 400, offset: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+def get_upload_max_bytes() -> int:
+    """读取 FEEDBACK_UPLOAD_MAX_MB 环境变量"""
+    try:
+        return int(max(0.0, float(os.environ.get('FEEDBACK_UPLOAD_MAX_MB', '512'))) * 1024 * 1024)
+    except ValueError:
+        return 512 * 1024 * 1024
+
+def get_upload_dir() -> str:
+    """读取 FEEDBACK_UPLOAD_DIR 环境变量"""
+    return os.environ.get('FEEDBACK_UPLOAD_DIR') or os.path.join(get_attachment_dir(), 'uploads')
+
+def upload_id(name: str, size: int, last_modified: str, head_sha256: str) -> str:
+    """同一个文件（文件名、大小、修改时间和开头内容相同）总是得到同一个上传编号，页面刷新后可以继续上传"""
+    key = f"{name}\0{size}\0{last_modified}\0{head_sha256}".encode('utf-8')
+    return hashlib.blake2b(key, digest_size=8).hexdigest()
+
+class UploadSpool:
+    """暂存目录中的上传：<编号>.json 记录文件信息，<编号>.part 是已收到的内容
+
+    上传完成后 .json 中记录生成的附件，页面没有收到最后一块的响应时，重试或查询仍能取得附件。
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.directory = directory or get_upload_dir()
+        self.max_bytes = get_upload_max_bytes() if max_bytes is None else max_bytes
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def _paths(self, upload: str) -> tuple:
+        if not _ID_PATTERN.match(upload or ''):
+            raise UploadError(f"Invalid upload id: {upload!r}", 404)
+        base = os.path.join(self.directory, upload)
+        return base + '.part', base + '.json'
+
+    def _lock(self, upload: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(upload, threading.Lock())
+
+    def _state(self, upload: str) -> dict:
+        part_path, state_path = self._paths(upload)
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            raise UploadError("Upload not found", 404)
+        if 'attachment' in state:
+            state['offset'] = state['size']
+        else:
+            state['offset'] = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        return state
+
+    @staticmethod
+    def _result(state: dict) -> dict:
+        result = {'upload_id': state['id'], 'offset': state['offset'], 'size': state['size']}
+        if 'attachment' in state:
+            result['attachment'] = state['attachment']
+        return result
+
+    def start(self, name: str, size: int, mime_type: str = '', last_modified: str = '',
+              head_sha256: str = '', sha256: str = '') -> dict:
+        """开始（或继续）上传，返回上传编号和已收到的字节数
+
+        head_sha256 是文件开头 UPLOAD_HEAD_SIZE 字节的 SHA-256（必需）；sha256 是整个文件的 SHA-256（可选），
+        两者都在上传完成时核对。
+        """
+        name = os.path.basename(name or '') or 'upload.bin'
+        head_sha256 = (head_sha256 or '').lower()
+        sha256 = (sha256 or '').lower()
+        if size < 0:
+            raise UploadError("Invalid file size")
+        if size > self.max_bytes:
+            raise UploadError(f"File exceeds the upload limit of {describe_size(self.max_bytes)}", 413)
+        if not _SHA256_PATTERN.match(head_sha256) or (sha256 and not _SHA256_PATTERN.match(sha256)):
+            raise UploadError("Missing or invalid file checksum")
+        upload = upload_id(name, size, last_modified, head_sha256)
+        part_path, state_path = self._paths(upload)
+        with self._lock(upload):
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            try:
+                state = self._state(upload)
+                if 'attachment' in state and not os.path.exists(state['attachment']['path']):
+                    state = None  # 上次上传的附件已被删除，重新上传
+            except UploadError:
+                state = None
+            if state is None:
+                state = {'id': upload, 'name': name, 'size': size, 'mime_type': mime_type or 'application/octet-stream',
+                         'head_sha256': head_sha256}
+                self._save_state(upload, state)
+                open(part_path, 'wb').close()
+                state['offset'] = 0
+            if sha256 and 'attachment' not in state:
+                state['sha256'] = sha256  # 上传完成时与收到的内容核对
+                self._save_state(upload, state)
+            if size == 0 and 'attachment' not in state:
+                self._finish(upload, state)  # 空文件不会再上传任何块
+        return {**self._result(state), 'chunk_size': UPLOAD_CHUNK_SIZE}
+
+    def _save_state(self, upload: str, state: dict):
+        _, state_path = self._paths(upload)
+        with open(state_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({key: value for key, value in state.items() if key != 'offset'}, f, ensure_ascii=False)
+        os.replace(state_path + '.tmp', state_path)
+
+    def status(self, upload: str) -> dict:
+        """已收到的字节数（页面断线重连后从这里继续），上传完成时带有附件信息"""
+        return self._result(self._state(upload))
+
+    def write_chunk(self, upload: str, offset: int, stream: BinaryIO, length: Optional[int],
+                    sha256: Optional[str] = None) -> dict:
+        """把一块内容逐段追加到部分文件；offset 必须等于已收到的字节数，校验失败时撤销这一块
+
+        收到全部内容后文件移入附件目录，返回值中带有附件信息。
+        """
+        with self._lock(upload):
+            state = self._state(upload)
+            if 'attachment' in state:
+                return self._result(state)  # 最后一块的重试
+            if offset != state['offset']:
+                raise UploadError("Offset does not match the received size", 409, state['offset'])
+            if length is not None and (length > MAX_CHUNK_SIZE or offset + length > state['size']):
+                raise UploadError("Chunk is too large", 413, state['offset'])
+            part_path, _ = self._paths(upload)
+            digest = hashlib.sha256()
+            received = 0
+            try:
+                with open(part_path, 'r+b') as f:
+                    f.seek(offset)
+                    try:
+                        for piece in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                            received += len(piece)
+                            if received > MAX_CHUNK_SIZE or offset + received > state['size']:
+                                raise UploadError("Chunk is too large", 413, offset)
+                            digest.update(piece)
+                            f.write(piece)
+                        if sha256 and digest.hexdigest() != sha256.lower():
+                            raise UploadError("Chunk checksum mismatch", 422, offset)
+                    except BaseException:
+                        f.truncate(offset)  # 撤销这一块（包括连接中断时收到的半块），页面从 offset 重新上传
+                        raise
+            except OSError as e:
+                raise UploadError(f"Cannot write upload: {e}", 500, offset) from e
+            state['offset'] = offset + received
+            if state['offset'] == state['size']:
+                self._finish(upload, state)
+        return self._result(state)
+
+    def _finish(self, upload: str, state: dict):
+        """计算整个文件的 SHA-256，与页面给出的校验和核对后移入附件目录
+
+        不一致说明续传拼接了另一个文件的内容（或文件在上传中被修改），丢弃这次上传。
+        """
+        part_path, _ = self._paths(upload)
+        digest = hashlib.sha256()
+        head = hashlib.sha256()
+        head_left = UPLOAD_HEAD_SIZE
+        lines = 0
+        last = b''
+        text = state['mime_type'].startswith('text/')
+        with open(part_path, 'rb') as f:
+            for piece in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(piece)
+                if head_left:
+                    head.update(piece[:head_left])
+                    head_left = max(0, head_left - len(piece))
+                if text:
+                    lines += piece.count(b'\n')
+                last = piece
+        if last and not last.endswith(b'\n'):
+            lines += 1  # 最后一行没有换行符
+        if (state.get('head_sha256', head.hexdigest()) != head.hexdigest()
+                or state.get('sha256', digest.hexdigest()) != digest.hexdigest()):
+            self._discard(upload)
+            raise UploadError("File checksum mismatch, please select the file again")
+        state['attachment'] = register_attachment(part_path, state['name'], state['mime_type'],
+                                                  sha256=digest.hexdigest(), **({'lines': lines} if text else {}))
+        self._save_state(upload, state)
+
+    def cancel(self, upload: str):
+        with self._lock(upload):
+            self._discard(upload)
+
+    def _discard(self, upload: str):
+        for path in self._paths(upload):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def sweep(self) -> int:
+        """删除超过附件保留时间仍未完成的上传"""
+        cutoff = time.time() - get_attachment_ttl()
+        removed = 0
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return 0
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.unlink(path)
+                    removed += name.endswith('.json')
+            except OSError:
+                continue
+        return removed
@@ -2,75 +2,392 @@
 # Enhanced version supporting both GUI and Web modes for SSH remote usage
 import os
 import json
+import secrets
+import ipaddress
 import threading
 import time
 import tempfile
-from typing import Optional, List, Dict
-from flask import Flask, render_template_string, request, jsonify
+from collections import OrderedDict
+from typing import Callable, Optional, List, Dict
+from flask import Flask, Response, render_template_string, request, jsonify, g, stream_with_context
 from flask_cors import CORS
-import markdown
-from markdown.extensions import codehilite, fenced_code, tables, toc
+
+from attachments import (IMAGE_MIME_TYPES, MAX_IMAGE_BYTES, MAX_TEXT_BYTES, AttachmentTooLarge, delete_attachment,
+                         get_attachment_threshold, get_image_max_dimension, get_image_quality, save_stream_attachment)
+from profiling import ProfileSession
+from scheduler import Cancellation, FeedbackCancelled, RequestStatus
+from uploads import UPLOAD_HEAD_SIZE, UploadError, UploadSpool
+from suggestions import get_suggestion_index, loaded_suggestion_index, preload_suggestion_index
+from renderer import assign_block_ids, get_renderer, prepare_blocks, should_stream
+
+# 保留最近若干个内容版本的块ID，用于计算客户端的增量更新
+CONTENT_HISTORY_SIZE = 16
+
+# 只允许本机浏览器访问的接口（历史回答和回答建议会返回以前的回答），且需携带页面中嵌入的令牌
+PRIVATE_TOKEN_HEADER = 'X-Feedback-Token'
+
+def is_loopback(address: Optional[str]) -> bool:
+    """请求是否来自本机"""
+    try:
+        return ipaddress.ip_address(address or '').is_loopback
+    except ValueError:
+        return False
+
+# Markdown渲染位置：server（默认）在服务端渲染HTML；client 只发送Markdown源码，由浏览器渲染
+RENDER_MODES = ('server', 'client')
+
+def get_render_mode() -> str:
+    """读取 FEEDBACK_WEB_RENDER 环境变量"""
+    mode = os.environ.get('FEEDBACK_WEB_RENDER', 'server').strip().lower()
+    return mode if mode in RENDER_MODES else 'server'
 
 class WebFeedbackUI:
     def __init__(self, prompt: str, predefined_options: Optional[List[str]] = None,
-                 host: str = "0.0.0.0", port: int = 8080, persistent: bool = False):
+                 host: str = "0.0.0.0", port: int = 8080, persistent: bool = False,
+                 render_mode: Optional[str] = None, session: bool = False,
+                 questions: Optional[List[dict]] = None):
         self.prompt = prompt
         self.predefined_options = predefined_options or []
         self.host = host
         self.port = port
-        self.persistent = persistent  # 是否持续运行模式
+        self.session = session  # 由MCP服务器驱动的常驻会话，问题通过 ask() 推送
+        self.persistent = persistent or session  # 是否持续运行模式
+        self.render_mode = render_mode or get_render_mode()
         self.feedback_result = None
         self.current_prompt = prompt if prompt else ""  # 当前显示的提示
         self.current_options = predefined_options or []  # 当前选项
-        self.has_content = bool(prompt)  # 是否有有效内容
-        self.initial_empty = not bool(prompt)  # 标记是否初始就为空
+        self.current_questions = questions or []  # 批量提问：[{'question': ..., 'predefined_options': [...]}]
+        self.has_content = bool(prompt) or bool(questions)  # 是否有有效内容
+        self.initial_empty = not self.has_content and not session  # 标记是否初始就为空
+        self.content_version = 1  # 内容版本号，每次内容变化时递增
+        self._content_lock = threading.Lock()
+        self._rendered = None  # (版本号, [(块ID, HTML或Markdown源码)], [选项ID], [选项])
+        self._rendered_questions = None  # (版本号, 批量问题的页面数据)
+        self._content_history = OrderedDict()  # 版本号 -> (块ID集合, 选项ID列表)
+        self._ask_lock = threading.Lock()  # 常驻会话中同一时间只展示一个问题
+        self._submitted = threading.Condition()
+        self._submission_count = 0
+        self._server = None
+        self.pending = 0  # 排在当前请求之后的请求数量
+        self.pending_provider = None  # 常驻会话中由调度器提供实时的排队数量
+        self.status_file = None  # 界面子进程向MCP服务器报告进度的状态文件
+        self.deadline = None  # 等待上限（time.time() 时间戳），到期后服务器使用默认回答
+        self.default_answer = None  # 超时后使用的默认回答，显示在倒计时中
+        self._request_status = None  # 常驻会话中当前问题的进度
+        self._reported_state = None
+        self.attachments: Dict[str, dict] = {}  # 当前问题的回答中附加的附件：编号 -> 附件信息
+        self.upload_spool = UploadSpool()  # 分块上传的文件，断线后从已收到的位置继续
+        self.private_token = secrets.token_urlsafe(16)  # 本机页面访问历史回答的令牌，每个进程不同
         self.app = Flask(__name__)
-        CORS(self.app)
+        # 页面（其中嵌入了令牌）、历史回答和回答建议接口不允许跨域读取
+        CORS(self.app, resources={r'/api/(?!history|suggest).*': {}})
         self.setup_markdown()
         self.setup_routes()
 
+    def _private_request(self) -> bool:
+        """请求是否来自本机并携带了页面中的令牌"""
+        token = request.headers.get(PRIVATE_TOKEN_HEADER, '')
+        return is_loopback(request.remote_addr) and secrets.compare_digest(token, self.private_token)
+
+    def _refuse_attachment(self):
+        """不接受附件时返回错误响应：请求不是来自本机页面，或者没有等待回答的问题"""
+        if not self._private_request():
+            return jsonify({'status': 'error', 'message': '附件只能在本机页面中添加'}), 403
+        if not self.has_content:
+            return jsonify({'status': 'error', 'message': '当前没有等待回答的问题'}), 409
+        return None
+
     def setup_markdown(self):
         """设置Markdown渲染器"""
-        self.md = markdown.Markdown(
-            extensions=[
-                'fenced_code',
-                'codehilite',
-                'tables',
-                'toc',
-                'nl2br',
-                'sane_lists'
-            ],
-            extension_configs={
-                'codehilite': {
-                    'css_class': 'highlight',
-                    'use_pygments': True,
-                    'noclasses': True,
-                    'pygments_style': 'monokai'
-                }
-            }
-        )
+        self.renderer = get_renderer()
 
     def render_markdown(self, text: str) -> str:
         """渲染Markdown文本为HTML"""
-        if not text:
-            return ""
-        return self.md.convert(text)
+        return self.renderer.render(text)
+
+    def set_content(self, prompt: str, options: Optional[List[str]] = None, questions: Optional[List[dict]] = None):
+        """替换当前内容并递增版本号"""
+        with self._content_lock:
+            self.current_prompt = prompt or ""
+            self.current_options = options if options is not None else []
+            self.current_questions = questions or []
+            self.has_content = bool(prompt) or bool(questions)
+            self.content_version += 1
+
+    def _report_status(self, state: str):
+        """报告界面进度（opened / typing），只在进入新阶段时写入"""
+        if not self.has_content or state == self._reported_state or self._reported_state == 'typing':
+            return
+        self._reported_state = state
+        if self._request_status is not None:
+            self._request_status.set(state)
+        if self.status_file:
+            from lifecycle import write_status_file
+            write_status_file(self.status_file, state)
+
+    def _questions_payload(self) -> list:
+        """批量问题的页面数据，每个问题单独渲染，同一版本只生成一次"""
+        with self._content_lock:
+            version = self.content_version
+            questions = list(self.current_questions)
+            cached = self._rendered_questions
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        items = []
+        for question_id, question in zip(assign_block_ids([q['question'] for q in questions]), questions):
+            options = question.get('predefined_options') or []
+            item = {
+                'id': question_id,
+                'options': [{'id': option_id, 'text': option} for option_id, option in zip(assign_block_ids(options), options)],
+            }
+            if self.render_mode == 'client':
+                item['markdown'] = question['question']
+            else:
+                item['html'] = self.renderer.render(question['question'])
+            items.append(item)
+        with self._content_lock:
+            self._rendered_questions = (version, items)
+        return items
+
+    def _rendered_content(self):
+        """按块渲染当前内容（同一版本只渲染一次），并记录到版本历史中"""
+        with self._content_lock:
+            version = self.content_version
+            prompt = self.current_prompt if self.has_content else ""
+            options = list(self.current_options)
+            rendered = self._rendered
+        if rendered is not None and rendered[0] == version:
+            return rendered
+
+        if self.render_mode == 'client':
+            # 客户端渲染：服务端只切分块，不做任何Markdown转换
+            blocks = prepare_blocks(prompt) if prompt else []
+        else:
+            blocks = self.renderer.render_blocks(prompt)
+        return self._store_rendered(version, blocks, options)
+
+    def _store_rendered(self, version: int, blocks: list, options: List[str]):
+        """保存某个版本的渲染结果并记录块ID历史"""
+        option_ids = assign_block_ids(options)
+        rendered = (version, blocks, option_ids, options)
+        with self._content_lock:
+            self._rendered = rendered
+            self._content_history[version] = ({block_id for block_id, _ in blocks}, option_ids)
+            while len(self._content_history) > CONTENT_HISTORY_SIZE:
+                self._content_history.popitem(last=False)
+        return rendered
+
+    def stream_content(self, version: int):
+        """以SSE分片输出某个版本的渲染结果，首个分片只含第一个块以尽快显示首屏"""
+        with self._content_lock:
+            current_version = self.content_version
+            prompt = self.current_prompt if self.has_content else ""
+            options = list(self.current_options)
+
+        if version != current_version:
+            # 内容已经变化，客户端需要重新获取
+            yield f"event: stale\ndata: {json.dumps({'version': current_version})}\n\n"
+            return
+
+        blocks = []
+        for chunk in self.renderer.iter_chunks(prompt):
+            blocks.extend(chunk)
+            data = {'blocks': [{'id': block_id, 'html': html} for block_id, html in chunk]}
+            yield f"event: blocks\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+        self._store_rendered(version, blocks, options)
+        yield f"event: done\ndata: {json.dumps({'version': version})}\n\n"
+
+    def get_content_payload(self, client_version: Optional[int] = None) -> dict:
+        """生成页面内容；客户端携带已知版本号时只返回变化的块和选项"""
+        payload = {
+            'version': self.content_version,
+            'render': self.render_mode,
+            'persistent': self.persistent,
+            'session': self.session,
+            'has_content': self.has_content,
+            'initial_empty': self.initial_empty,
+            'pending': self.pending_provider() if self.pending_provider else self.pending,
+            'attachment_threshold': get_attachment_threshold(),
+            'image_max_dimension': get_image_max_dimension(),
+            'image_quality': get_image_quality(),
+            'upload_max_bytes': self.upload_spool.max_bytes,
+            'upload_head_bytes': UPLOAD_HEAD_SIZE,
+        }
+        if self.has_content and self.deadline is not None:
+            # 返回剩余秒数而不是时间戳，不受浏览器所在机器时钟的影响
+            payload['countdown'] = {'remaining': max(0.0, self.deadline - time.time()), 'default_answer': self.default_answer}
+        if client_version is not None and client_version == payload['version']:
+            payload['unchanged'] = True
+            return payload
+        if self.current_questions:
+            payload['questions'] = self._questions_payload()
+
+        known = self._content_history.get(client_version) if client_version is not None else None
+        with self._content_lock:
+            version = self.content_version
+            prompt = self.current_prompt if self.has_content else ""
+            options = list(self.current_options)
+            rendered = self._rendered
+        if self.render_mode == 'server' and should_stream(prompt) and (known is None or rendered is None or rendered[0] != version):
+            # 大文档不一次性渲染，客户端通过 /api/stream 分片接收
+            payload['version'] = version
+            payload['delta'] = False
+            payload['stream'] = True
+            payload['options'] = [{'id': option_id, 'text': option} for option_id, option in zip(assign_block_ids(options), options)]
+            payload['predefined_options'] = options
+            return payload
+
+        version, blocks, option_ids, options = self._rendered_content()
+        payload['version'] = version
+        field = 'markdown' if self.render_mode == 'client' else 'html'
+        option_items = [{'id': option_id, 'text': option} for option_id, option in zip(option_ids, options)]
+
+        if known is None:
+            # 完整内容
+            payload['delta'] = False
+            if self.render_mode == 'server':
+                payload['prompt'] = self.current_prompt
+            payload['blocks'] = [{'id': block_id, field: content} for block_id, content in blocks]
+            payload['options'] = option_items
+            payload['predefined_options'] = options
+            return payload
+
+        known_blocks, known_option_ids = known
+        payload['delta'] = True
+        # 客户端已有的块只发送ID，用于保持顺序
+        payload['blocks'] = [
+            {'id': block_id} if block_id in known_blocks else {'id': block_id, field: content}
+            for block_id, content in blocks
+        ]
+        if option_ids != known_option_ids:
+            payload['options'] = option_items
+        return payload
 
     def setup_routes(self):
         @self.app.route('/')
         def index():
-            return render_template_string(self.get_html_template())
+            private_token = self.private_token if is_loopback(request.remote_addr) else ''
+            return render_template_string(self.get_html_template(), client_render=self.render_mode == 'client',
+                                          private_token=private_token)
 
         @self.app.route('/api/config')
         def get_config():
-            return jsonify({
-                'prompt': self.current_prompt,
-                'prompt_html': self.render_markdown(self.current_prompt) if self.has_content else "",
-                'predefined_options': self.current_options,
-                'persistent': self.persistent,
-                'has_content': self.has_content,
-                'initial_empty': self.initial_empty
-            })
+            self._report_status('opened')
+            return jsonify(self.get_content_payload(request.args.get('version', type=int)))
+
+        @self.app.route('/api/activity', methods=['POST'])
+        def report_activity():
+            """页面报告用户已开始输入，用于MCP进度心跳"""
+            self._report_status('typing')
+            return jsonify({'status': 'success'})
+
+        @self.app.route('/api/history')
+        def search_history():
+            """搜索以前的回答（仅限本机页面）"""
+            from history import get_history_store
+            if not self._private_request():
+                return jsonify({'status': 'error', 'message': '历史回答只能在本机查看'}), 403
+            started_at = time.perf_counter()
+            results = get_history_store().search(request.args.get('q', ''), request.args.get('limit', 20, type=int))
+            return jsonify({'results': results, 'elapsed_ms': round((time.perf_counter() - started_at) * 1000, 3)})
+
+        @self.app.route('/api/suggest')
+        def suggest_answers():
+            """以前的回答中以已输入内容开头的回答（prefix 为空时返回回答过相似问题的回答，仅限本机页面）"""
+            if not self._private_request():
+                return jsonify({'status': 'error', 'message': '回答建议只能在本机使用'}), 403
+            started_at = time.perf_counter()
+            index = get_suggestion_index()
+            question = request.args.get('question', type=int)
+            if question is not None and 0 <= question < len(self.current_questions):
+                prompt = self.current_questions[question]['question']
+            else:
+                prompt = self.current_prompt
+            results = index.suggest(request.args.get('prefix', ''), prompt) if index is not None else []
+            return jsonify({'suggestions': results, 'elapsed_ms': round((time.perf_counter() - started_at) * 1000, 3)})
+
+        @self.app.route('/api/attachments', methods=['POST'])
+        def create_attachment():
+            """把大段粘贴内容或页面中已缩小的图片（请求体）逐块写入附件，页面只保留附件标签（仅限本机页面）"""
+            refused = self._refuse_attachment()
+            if refused is not None:
+                return refused
+            name = os.path.basename(request.args.get('name') or 'paste.txt') or 'paste.txt'
+            mime_type = request.args.get('type', 'text/plain')
+            try:
+                if mime_type in IMAGE_MIME_TYPES:
+                    attachment = save_stream_attachment(
+                        request.stream, name, mime_type, MAX_IMAGE_BYTES,
+                        width=request.args.get('width', type=int), height=request.args.get('height', type=int))
+                elif mime_type == 'text/plain':
+                    attachment = save_stream_attachment(request.stream, name, max_size=MAX_TEXT_BYTES)
+                else:
+                    return jsonify({'status': 'error', 'message': f'不支持的附件类型: {mime_type}'}), 415
+            except AttachmentTooLarge as e:
+                return jsonify({'status': 'error', 'message': f'附件过大: {e}'}), 413
+            except OSError as e:
+                return jsonify({'status': 'error', 'message': f'保存附件失败: {e}'}), 500
+            self.attachments[attachment['id']] = attachment
+            return jsonify({'status': 'success', 'attachment': attachment})
+
+        @self.app.route('/api/uploads', methods=['POST'])
+        def start_upload():
+            """开始上传文件；同一个文件再次开始时返回已收到的字节数，页面从那里继续"""
+            refused = self._refuse_attachment()
+            if refused:
+                return refused
+            data = request.get_json(silent=True) or {}
+            try:
+                size = int(data.get('size', -1))
+            except (TypeError, ValueError):
+                size = -1
+            try:
+                result = self.upload_spool.start(str(data.get('name') or ''), size, str(data.get('type') or ''),
+                                                 str(data.get('last_modified') or ''), str(data.get('head_sha256') or ''),
+                                                 str(data.get('sha256') or ''))
+            except UploadError as e:
+                return jsonify({'status': 'error', 'message': str(e)}), e.status
+            except OSError as e:
+                return jsonify({'status': 'error', 'message': f'无法开始上传: {e}'}), 500
+            return self._upload_response(result)
+
+        @self.app.route('/api/uploads/<upload_id>', methods=['GET', 'PUT', 'DELETE'])
+        def upload_chunk(upload_id):
+            """GET 查询已收到的字节数；PUT ?offset=N 追加一块（X-Chunk-SHA256 为该块的校验和）；DELETE 放弃上传"""
+            if not self._private_request():
+                return jsonify({'status': 'error', 'message': '附件只能在本机页面中添加'}), 403
+            try:
+                if request.method == 'DELETE':
+                    self.upload_spool.cancel(upload_id)
+                    return jsonify({'status': 'success'})
+                if request.method == 'GET':
+                    return self._upload_response(self.upload_spool.status(upload_id))
+                offset = request.args.get('offset', type=int)
+                if offset is None:
+                    raise UploadError("Missing offset")
+                result = self.upload_spool.write_chunk(upload_id, offset, request.stream, request.content_length,
+                                                       request.headers.get('X-Chunk-SHA256'))
+            except UploadError as e:
+                return jsonify({'status': 'error', 'message': str(e), 'offset': e.offset}), e.status
+            return self._upload_response(result)
+
+        @self.app.route('/api/attachments/<attachment_id>', methods=['DELETE'])
+        def remove_attachment(attachment_id):
+            if not self._private_request():
+                return jsonify({'status': 'error', 'message': '附件只能在本机页面中管理'}), 403
+            if self.attachments.pop(attachment_id, None) is None:
+                return jsonify({'status': 'error', 'message': '附件不存在'}), 404
+            delete_attachment(attachment_id)
+            return jsonify({'status': 'success'})
+
+        @self.app.route('/api/stream')
+        def stream():
+            """流式输出大文档的渲染结果"""
+            version = request.args.get('version', type=int)
+            headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            return Response(stream_with_context(self.stream_content(version)), mimetype='text/event-stream', headers=headers)
 
         @self.app.route('/api/close', methods=['POST'])
         def close_interface():
@@ -82,10 +399,18 @@ class WebFeedbackUI:
 
         @self.app.route('/api/submit', methods=['POST'])
         def submit_feedback():
+            if self.session and not self.has_content:
+                return jsonify({'status': 'error', 'message': '当前没有等待回答的问题'}), 409
+
             data = request.json
+            if self.current_questions:
+                return self._submit_answers(data.get('answers') or [], data.get('attachments') or [])
+
             feedback_text = data.get('feedback_text', '').strip()
             selected_options = data.get('selected_options', [])
 
+            self._learn_answer(self.current_prompt, feedback_text)
+
             # Combine selected options and feedback text
             final_feedback_parts = []
 
@@ -100,25 +425,11 @@ class WebFeedbackUI:
             # Join with a newline if both parts exist
             final_feedback = "\n\n".join(final_feedback_parts)
 
-            self.feedback_result = {
-                'cursor_usage_opt': final_feedback
-            }
-
-            # 如果不是持续模式，关闭服务器
-            if not self.persistent:
-                threading.Timer(1.0, self.shutdown_server).start()
-                return jsonify({'status': 'success', 'message': '反馈已提交，服务器即将关闭'})
-            else:
-                # 持续模式下，清空内容并等待下一次调用
-                self.current_prompt = ""
-                self.current_options = []
-                self.has_content = False
-                return jsonify({
-                    'status': 'success',
-                    'message': '反馈已提交',
-                    'persistent': True,
-                    'clear_content': True
-                })
+            result = {'cursor_usage_opt': final_feedback}
+            attachments = self._submitted_attachments(data.get('attachments') or [])
+            if attachments:
+                result['attachments'] = attachments
+            return self._finish_submission(result)
 
         @self.app.route('/api/update', methods=['POST'])
         def update_content():
@@ -130,19 +441,97 @@ class WebFeedbackUI:
             new_prompt = data.get('prompt', '')
             new_options = data.get('predefined_options', [])
 
-            # 更新内容
-            self.current_prompt = new_prompt
-            self.current_options = new_options if new_options is not None else []
-            self.has_content = bool(new_prompt)
+            # 更新内容，响应中只包含相对上一版本变化的块数量，不再回传整段内容
+            with self._content_lock:
+                previous_version = self.content_version
+            self.set_content(new_prompt, new_options)
+            payload = self.get_content_payload(previous_version)
+            if payload.get('stream'):
+                # 大文档由页面分片获取，这里只切分块（不渲染）来统计变化的块
+                known = self._content_history.get(previous_version)
+                known_blocks = known[0] if known is not None else set()
+                changed_blocks = sum(1 for block_id, _ in prepare_blocks(new_prompt) if block_id not in known_blocks)
+            else:
+                changed_blocks = sum(1 for block in payload['blocks'] if 'html' in block or 'markdown' in block)
 
             return jsonify({
                 'status': 'success',
                 'message': '内容已更新',
-                'prompt': self.current_prompt,
-                'prompt_html': self.render_markdown(self.current_prompt) if self.has_content else "",
-                'predefined_options': self.current_options,
-                'has_content': self.has_content
+                'version': payload['version'],
+                'has_content': payload['has_content'],
+                'changed_blocks': changed_blocks,
+                'options_changed': 'options' in payload
+            })
+
+    def _upload_response(self, result: dict):
+        """上传完成时把附件加入当前回答"""
+        if 'attachment' in result:
+            self.attachments[result['attachment']['id']] = result['attachment']
+        return jsonify({'status': 'success', **result})
+
+    def _submitted_attachments(self, attachment_ids: list) -> List[dict]:
+        """提交中引用的本页面已保存的附件"""
+        return [self.attachments[attachment_id] for attachment_id in attachment_ids if attachment_id in self.attachments]
+
+    def _submit_answers(self, answers: list, attachment_ids: list):
+        """批量提问的提交：按问题顺序整理每个问题的选项和文字回答，页面中添加的附件属于整个表单"""
+        results = []
+        for index, question in enumerate(self.current_questions):
+            answer = answers[index] if index < len(answers) and isinstance(answers[index], dict) else {}
+            options = question.get('predefined_options') or []
+            results.append({
+                'question': question['question'],
+                'selected_options': [option for option in answer.get('selected_options', []) if option in options],
+                'feedback': str(answer.get('feedback_text', '')).strip(),
             })
+            self._learn_answer(question['question'], results[-1]['feedback'])
+        result = {'answers': results}
+        attachments = self._submitted_attachments(attachment_ids)
+        if attachments:
+            result['attachments'] = attachments
+        return self._finish_submission(result)
+
+    def _learn_answer(self, prompt: str, text: str):
+        """把输入的回答加入本进程已加载的建议索引（常驻会话中下一个问题就能用上）"""
+        index = loaded_suggestion_index()
+        if index is not None and text:
+            index.add(text, prompt)
+
+    def _finish_submission(self, result: dict):
+        """保存提交结果并唤醒等待者，单次模式下随后关闭服务器"""
+        with self._submitted:
+            self.feedback_result = result
+            self.attachments = {}
+            if self.persistent:
+                # 持续模式下，清空内容并等待下一次调用（在唤醒等待者之前清空，避免覆盖下一个问题）
+                self.set_content("", [])
+            self._submission_count += 1
+            self._submitted.notify_all()
+
+        # 如果不是持续模式，关闭服务器
+        if not self.persistent:
+            threading.Timer(1.0, self.shutdown_server).start()
+            return jsonify({'status': 'success', 'message': '反馈已提交，服务器即将关闭'})
+        else:
+            return jsonify({
+                'status': 'success',
+                'message': '反馈已提交',
+                'persistent': True,
+                'clear_content': True
+            })
+
+    def enable_request_profiling(self, profiler: ProfileSession):
+        """为每个请求启用cProfile采集（Flask请求运行在独立线程中）"""
+        @self.app.before_request
+        def start_request_profile():
+            g.profile_ctx = profiler.profile_thread()
+            g.profile_ctx.__enter__()
+
+        @self.app.teardown_request
+        def stop_request_profile(exc):
+            profile_ctx = g.pop('profile_ctx', None)
+            if profile_ctx is not None:
+                profile_ctx.__exit__(None, None, None)
 
     def shutdown_server(self):
         """Gracefully shutdown the Flask server"""
@@ -156,6 +545,7 @@ class WebFeedbackUI:
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <meta name="private-token" content="{{ private_token }}">
     <title>Cursor继续对话 - Web版</title>
     <style>
         * {
@@ -303,6 +693,12 @@ class WebFeedbackUI:
             border-radius: 16px 16px 0 0;
         }
 
+        /* 滚动到视口之外的内容块跳过布局和绘制，超长文档也能快速显示首屏 */
+        .md-block {
+            content-visibility: auto;
+            contain-intrinsic-size: auto 120px;
+        }
+
         .options-container {
             margin-bottom: 1.25rem;
             display: flex;
@@ -361,6 +757,215 @@ class WebFeedbackUI:
             line-height: 1.5;  /* 增加行高 */
         }
 
+        .option-filter {
+            width: 100%;
+            padding: 0.75rem 1rem;
+            font-size: 0.9375rem;
+            font-family: inherit;
+            background: rgba(255, 255, 255, 0.03);
+            color: #f5f5f7;
+            border: 0.5px solid rgba(255, 255, 255, 0.1);
+            border-radius: 12px;
+            margin-bottom: 0.75rem;
+        }
+
+        .option-filter:focus {
+            outline: none;
+            border-color: rgba(0, 122, 255, 0.6);
+        }
+
+        .virtual-viewport {
+            position: relative;
+            overflow-y: auto;
+            border: 0.5px solid rgba(255, 255, 255, 0.1);
+            border-radius: 12px;
+        }
+
+        .virtual-spacer {
+            position: relative;
+        }
+
+        .virtual-spacer .option-item {
+            position: absolute;
+            left: 0;
+            right: 0;
+            margin: 0;
+            border-radius: 0;
+            border-width: 0 0 0.5px 0;
+            backdrop-filter: none;
+            -webkit-backdrop-filter: none;
+            transition: none;
+        }
+
+        .virtual-spacer .option-item:hover {
+            transform: none;
+            box-shadow: none;
+        }
+
+        .virtual-spacer .option-item label {
+            white-space: nowrap;
+            overflow: hidden;
+            text-overflow: ellipsis;
+        }
+
+        .option-count {
+            font-size: 0.8125rem;
+            color: rgba(245, 245, 247, 0.6);
+            margin-top: 0.5rem;
+        }
+
+        [hidden] {
+            display: none !important;
+        }
+
+        /* 排队中的其他请求数量 */
+        .queue-badge {
+            margin-top: 0.5rem;
+            font-size: 0.8125rem;
+            color: #ff9f0a;
+        }
+
+        /* 等待超时倒计时 */
+        .countdown {
+            margin-top: 0.5rem;
+            font-size: 0.8125rem;
+            color: #8e8e93;
+        }
+
+        .countdown.urgent {
+            color: #ff453a;
+        }
+
+        /* 批量提问：每个问题一个分区，各自带选项和回答框 */
+        .question-item {
+            margin-bottom: 1.5rem;
+            padding-bottom: 1.25rem;
+            border-bottom: 0.5px solid rgba(255, 255, 255, 0.1);
+        }
+
+        .question-index {
+            font-size: 0.8125rem;
+            font-weight: 600;
+            color: #0a84ff;
+            margin-bottom: 0.5rem;
+        }
+
+        .question-item .feedback-textarea {
+            min-height: 96px;
+        }
+
+        /* 历史回答：搜索框和结果列表 */
+        .history-panel {
+            margin-bottom: 1rem;
+            padding: 0.75rem;
+            background: rgba(255, 255, 255, 0.03);
+            border: 0.5px solid rgba(255, 255, 255, 0.1);
+            border-radius: 12px;
+        }
+
+        .history-search {
+            width: 100%;
+            padding: 0.5rem 0.75rem;
+            font-size: 0.875rem;
+            background: rgba(255, 255, 255, 0.05);
+            color: #f5f5f7;
+            border: 0.5px solid rgba(255, 255, 255, 0.15);
+            border-radius: 8px;
+            outline: none;
+        }
+
+        .history-results {
+            max-height: 240px;
+            overflow-y: auto;
+            margin-top: 0.5rem;
+        }
+
+        .history-item {
+            padding: 0.5rem 0.625rem;
+            border-radius: 8px;
+            cursor: pointer;
+        }
+
+        .history-item:hover {
+            background: rgba(10, 132, 255, 0.12);
+        }
+
+        .history-prompt {
+            font-size: 0.75rem;
+            color: #8e8e93;
+            white-space: nowrap;
+            overflow: hidden;
+            text-overflow: ellipsis;
+        }
+
+        .history-answer {
+            font-size: 0.875rem;
+            color: #f5f5f7;
+            white-space: pre-wrap;
+            max-height: 4.5em;
+            overflow: hidden;
+        }
+
+        .history-empty {
+            font-size: 0.8125rem;
+            color: #8e8e93;
+            padding: 0.5rem 0.625rem;
+        }
+
+        /* 回答建议：输入时在回答框下方列出以前的回答 */
+        .suggestions {
+            margin: -0.75rem 0 1rem;
+            padding: 0.25rem;
+            background: rgba(28, 28, 30, 0.95);
+            border: 0.5px solid rgba(255, 255, 255, 0.15);
+            border-radius: 10px;
+        }
+
+        .suggestion-item {
+            padding: 0.375rem 0.625rem;
+            font-size: 0.875rem;
+            color: #f5f5f7;
+            border-radius: 6px;
+            cursor: pointer;
+            white-space: nowrap;
+            overflow: hidden;
+            text-overflow: ellipsis;
+        }
+
+        .suggestion-item.active,
+        .suggestion-item:hover {
+            background: rgba(10, 132, 255, 0.25);
+        }
+
+        /* 附件：大段粘贴内容保存为附件，回答框下方显示附件标签 */
+        .attachments {
+            display: flex;
+            flex-wrap: wrap;
+            gap: 0.5rem;
+            margin: -0.5rem 0 1rem;
+        }
+
+        .attachment-chip {
+            padding: 0.25rem 0.75rem;
+            font-size: 0.8125rem;
+            color: #f5f5f7;
+            background: rgba(255, 255, 255, 0.06);
+            border: 0.5px solid rgba(255, 255, 255, 0.2);
+            border-radius: 999px;
+            cursor: pointer;
+        }
+
+        .attachment-chip:hover {
+            border-color: #ff453a;
+        }
+
+        .attachment-chip img {
+            height: 1.5rem;
+            margin-right: 0.375rem;
+            vertical-align: middle;
+            border-radius: 4px;
+        }
+
         .separator {
             height: 0.5px;
             background: linear-gradient(90deg, transparent, rgba(255, 255, 255, 0.1), transparent);
@@ -655,6 +1260,8 @@ class WebFeedbackUI:
                 <div class="header-icon">💬</div>
                 Cursor继续对话
             </h1>
+            <div class="queue-badge" id="queue-badge" hidden></div>
+            <div class="countdown" id="countdown" hidden></div>
         </div>
 
         <!-- 无有效内容页面 -->
@@ -681,6 +1288,10 @@ class WebFeedbackUI:
                     加载中...
                 </div>
 
+                <div id="questions-container" style="display: none;">
+                    <!-- 批量提问时每个问题的表单将在这里动态加载 -->
+                </div>
+
                 <div class="options-container" id="options-container" style="display: none;">
                     <!-- 预定义选项将在这里动态加载 -->
                 </div>
@@ -693,14 +1304,30 @@ class WebFeedbackUI:
                     placeholder="请在此输入您的反馈内容..."
                 ></textarea>
 
+                <div class="suggestions" id="suggestions" hidden></div>
+
+                <div class="attachments" id="attachments" hidden></div>
+
                 <div class="shortcut-hint">
-                    按 Ctrl+Enter 快速提交反馈
+                    按 Ctrl+Enter 快速提交反馈，输入时 ↑↓ 选择建议、Tab 采用，Ctrl+Space 显示建议
+                </div>
+
+                <div class="history-panel" id="history-panel" hidden>
+                    <input class="history-search" id="history-search" type="search" placeholder="搜索以前的回答...">
+                    <div class="history-results" id="history-results"></div>
                 </div>
 
                 <div class="button-container">
+                    <button class="btn btn-secondary" id="history-btn">
+                        🕘 历史回答
+                    </button>
                     <button class="btn btn-secondary" id="insert-code-btn">
                         📋 插入代码
                     </button>
+                    <button class="btn btn-secondary" id="upload-btn">
+                        📎 添加文件
+                    </button>
+                    <input type="file" id="upload-input" multiple hidden>
                     <button class="btn btn-primary" id="submit-btn">
                         🚀 发送请求
                     </button>
@@ -711,14 +1338,20 @@ class WebFeedbackUI:
         </div>
     </div>
 
+    {% if client_render %}<script src="{{ url_for('static', filename='markdown.js') }}"></script>{% endif %}
     <script>
         let config = null;
+        let contentVersion = null;  // 页面当前显示的内容版本，轮询时用于获取增量更新
+        let contentStream = null;  // 正在接收的流式内容
 
         // 加载配置
         async function loadConfig() {
             try {
                 const response = await fetch('/api/config');
                 config = await response.json();
+                contentVersion = config.version;
+                updateQueueBadge(config.pending);
+                updateCountdown(config.countdown);
 
                 // 检查是否有有效内容
                 if (!config.has_content) {
@@ -742,48 +1375,434 @@ class WebFeedbackUI:
                 // 显示正常内容页面
                 showContentPage();
 
-                // 更新描述 - 使用Markdown渲染的HTML
-                const descriptionElement = document.getElementById('description');
-                if (config.prompt_html) {
-                    descriptionElement.innerHTML = config.prompt_html;
+                // 更新描述和预定义选项 - 使用按块渲染的Markdown HTML
+                updatePageContent(config);
+            } catch (error) {
+                console.error('加载配置失败:', error);
+                showStatus('加载配置失败', 'error');
+            }
+        }
+
+        // 预定义选项状态：每个选项带有稳定ID，选中项按ID记录，
+        // 这样虚拟列表回收行节点或增量更新选项时都能保留选中状态。
+        // 单个问题的选项和批量提问中每个问题的选项各有一份状态，prefix 区分勾选框的ID
+        const VIRTUAL_OPTIONS_THRESHOLD = 50;
+        const VIRTUAL_ROW_HEIGHT = 56;
+        const VIRTUAL_OVERSCAN = 6;
+
+        function newOptionState(items, selected, prefix) {
+            return { items, selected, prefix, visible: [], index: null, viewport: null, spacer: null, count: null, renderQueued: false };
+        }
+
+        let optionState = newOptionState([], new Set(), '');
+
+        // 选项筛选索引：预先小写化并按字符建立倒排表，继续输入时只在上次结果中过滤
+        function buildOptionIndex(options) {
+            const keys = options.map(option => option.toLowerCase());
+            const postings = new Map();
+            keys.forEach((key, index) => {
+                new Set(key).forEach(char => {
+                    if (!postings.has(char)) postings.set(char, []);
+                    postings.get(char).push(index);
+                });
+            });
+            return { keys, postings, lastQuery: '', lastMatches: keys.map((_, index) => index) };
+        }
+
+        function filterOptionIndex(index, rawQuery) {
+            const query = rawQuery.trim().toLowerCase();
+            let matches;
+            if (!query) {
+                matches = index.keys.map((_, i) => i);
+            } else {
+                let candidates;
+                if (index.lastQuery && query.includes(index.lastQuery)) {
+                    candidates = index.lastMatches;
                 } else {
-                    descriptionElement.textContent = config.prompt;
+                    candidates = null;
+                    new Set(query).forEach(char => {
+                        const posting = index.postings.get(char) || [];
+                        if (candidates === null || posting.length < candidates.length) candidates = posting;
+                    });
                 }
+                matches = candidates.filter(i => index.keys[i].includes(query));
+            }
+            index.lastQuery = query;
+            index.lastMatches = matches;
+            return matches;
+        }
+
+        function createOptionItem(state, item) {
+            const optionDiv = document.createElement('div');
+            optionDiv.className = 'option-item';
+            optionDiv.dataset.optionId = item.id;
+
+            const checkbox = document.createElement('input');
+            checkbox.type = 'checkbox';
+            checkbox.id = `option-${state.prefix}${item.id}`;
+            checkbox.value = item.text;
+            checkbox.checked = state.selected.has(item.id);
+            checkbox.addEventListener('change', () => {
+                if (checkbox.checked) {
+                    state.selected.add(item.id);
+                } else {
+                    state.selected.delete(item.id);
+                }
+                updateOptionCount(state);
+            });
 
-                // 加载预定义选项
-                if (config.predefined_options && config.predefined_options.length > 0) {
-                    const optionsContainer = document.getElementById('options-container');
-                    const separator = document.getElementById('separator');
+            const label = document.createElement('label');
+            label.htmlFor = checkbox.id;
+            label.textContent = item.text;
+            label.title = item.text;
 
-                    config.predefined_options.forEach((option, index) => {
-                        const optionDiv = document.createElement('div');
-                        optionDiv.className = 'option-item';
+            optionDiv.appendChild(checkbox);
+            optionDiv.appendChild(label);
+            return optionDiv;
+        }
+
+        // 渲染预定义选项，数量较多时只渲染可见窗口内的行
+        function renderOptions(items, keepSelected) {
+            const optionsContainer = document.getElementById('options-container');
+            const separator = document.getElementById('separator');
+            items = items || [];
+            const ids = new Set(items.map(item => item.id));
+            const selected = keepSelected ? new Set([...optionState.selected].filter(id => ids.has(id))) : new Set();
+            optionsContainer.innerHTML = '';
+            optionState = newOptionState(items, selected, '');
+
+            if (items.length === 0) {
+                optionsContainer.style.display = 'none';
+                separator.style.display = 'none';
+                return;
+            }
 
-                        const checkbox = document.createElement('input');
-                        checkbox.type = 'checkbox';
-                        checkbox.id = `option-${index}`;
-                        checkbox.value = option;
+            fillOptions(optionState, optionsContainer);
+            optionsContainer.style.display = 'block';
+            separator.style.display = 'block';
+        }
 
-                        const label = document.createElement('label');
-                        label.htmlFor = `option-${index}`;
-                        label.textContent = option;
+        function fillOptions(state, container) {
+            if (state.items.length > VIRTUAL_OPTIONS_THRESHOLD) {
+                buildVirtualOptions(state, container);
+            } else {
+                const fragment = document.createDocumentFragment();
+                state.items.forEach(item => fragment.appendChild(createOptionItem(state, item)));
+                container.appendChild(fragment);
+            }
+        }
 
-                        optionDiv.appendChild(checkbox);
-                        optionDiv.appendChild(label);
-                        optionsContainer.appendChild(optionDiv);
-                    });
+        // 增量更新选项：按ID复用已有节点，只创建新增的选项并移除消失的选项
+        function patchOptions(items) {
+            items = items || [];
+            const optionsContainer = document.getElementById('options-container');
+            const plainBefore = optionState.items.length > 0 && !optionState.viewport;
+            if (!plainBefore || items.length === 0 || items.length > VIRTUAL_OPTIONS_THRESHOLD) {
+                renderOptions(items, true);
+                return;
+            }
+
+            const ids = new Set(items.map(item => item.id));
+            optionState.selected = new Set([...optionState.selected].filter(id => ids.has(id)));
+            optionState.items = items;
+            reconcileChildren(optionsContainer, items, node => node.dataset.optionId, item => createOptionItem(optionState, item));
+        }
 
-                    optionsContainer.style.display = 'block';
-                    separator.style.display = 'block';
+        // 按ID顺序协调子节点：复用已有节点，必要时移动，删除多余节点
+        function reconcileChildren(container, items, keyOf, create) {
+            const existing = new Map();
+            Array.from(container.children).forEach(node => existing.set(keyOf(node), node));
+            Array.from(container.childNodes).forEach(node => {
+                if (node.nodeType !== Node.ELEMENT_NODE) node.remove();
+            });
+
+            let previous = null;
+            for (const item of items) {
+                let node = existing.get(item.id);
+                if (node) {
+                    existing.delete(item.id);
+                } else {
+                    node = create(item);
+                    if (!node) return false;
                 }
-            } catch (error) {
-                console.error('加载配置失败:', error);
-                showStatus('加载配置失败', 'error');
+                const expected = previous ? previous.nextSibling : container.firstChild;
+                if (node !== expected) container.insertBefore(node, expected);
+                previous = node;
             }
+            existing.forEach(node => node.remove());
+            return true;
+        }
+
+        function buildVirtualOptions(state, optionsContainer) {
+            const total = state.items.length;
+            state.index = buildOptionIndex(state.items.map(item => item.text));
+            state.visible = state.index.lastMatches;
+
+            const filterInput = document.createElement('input');
+            filterInput.type = 'text';
+            filterInput.className = 'option-filter';
+            filterInput.placeholder = `筛选 ${total} 个选项...`;
+
+            const viewport = document.createElement('div');
+            viewport.className = 'virtual-viewport';
+            viewport.style.height = `${VIRTUAL_ROW_HEIGHT * 8}px`;
+
+            const spacer = document.createElement('div');
+            spacer.className = 'virtual-spacer';
+            viewport.appendChild(spacer);
+
+            const count = document.createElement('div');
+            count.className = 'option-count';
+
+            state.viewport = viewport;
+            state.spacer = spacer;
+            state.count = count;
+
+            filterInput.addEventListener('input', () => {
+                state.visible = filterOptionIndex(state.index, filterInput.value);
+                viewport.scrollTop = 0;
+                scheduleVirtualRender(state);
+            });
+            viewport.addEventListener('scroll', () => scheduleVirtualRender(state), { passive: true });
+
+            optionsContainer.appendChild(filterInput);
+            optionsContainer.appendChild(viewport);
+            optionsContainer.appendChild(count);
+            renderVirtualRows(state);
+        }
+
+        function scheduleVirtualRender(state) {
+            if (state.renderQueued) return;
+            state.renderQueued = true;
+            requestAnimationFrame(() => {
+                state.renderQueued = false;
+                renderVirtualRows(state);
+            });
+        }
+
+        function renderVirtualRows(state) {
+            const { viewport, spacer, visible, items } = state;
+            if (!viewport) return;
+
+            spacer.style.height = `${visible.length * VIRTUAL_ROW_HEIGHT}px`;
+            const viewportHeight = viewport.clientHeight || VIRTUAL_ROW_HEIGHT * 8;
+            const first = Math.max(0, Math.floor(viewport.scrollTop / VIRTUAL_ROW_HEIGHT) - VIRTUAL_OVERSCAN);
+            const last = Math.min(visible.length, Math.ceil((viewport.scrollTop + viewportHeight) / VIRTUAL_ROW_HEIGHT) + VIRTUAL_OVERSCAN);
+
+            const fragment = document.createDocumentFragment();
+            for (let position = first; position < last; position++) {
+                const row = createOptionItem(state, items[visible[position]]);
+                row.style.top = `${position * VIRTUAL_ROW_HEIGHT}px`;
+                row.style.height = `${VIRTUAL_ROW_HEIGHT}px`;
+                fragment.appendChild(row);
+            }
+            spacer.replaceChildren(fragment);
+            updateOptionCount(state);
+        }
+
+        function updateOptionCount(state) {
+            if (!state.count) return;
+            state.count.textContent = `显示 ${state.visible.length} / ${state.items.length} 个选项，已选 ${state.selected.size} 个`;
+        }
+
+        function selectedOptionTexts(state) {
+            return state.items.filter(item => state.selected.has(item.id)).map(item => item.text);
+        }
+
+        function getSelectedOptions() {
+            return selectedOptionTexts(optionState);
+        }
+
+        function clearOptionSelection(state, container) {
+            state.selected.clear();
+            container.querySelectorAll('input[type="checkbox"]').forEach(cb => cb.checked = false);
+            if (state.viewport) renderVirtualRows(state);
+            updateOptionCount(state);
+        }
+
+        function clearSelectedOptions() {
+            clearOptionSelection(optionState, document.getElementById('options-container'));
+        }
+
+        function createBlockNode(block) {
+            const node = document.createElement('div');
+            node.className = 'md-block';
+            node.dataset.blockId = block.id;
+            // 客户端渲染模式下服务器只发送Markdown源码
+            node.innerHTML = block.html !== undefined ? block.html : FeedbackMarkdown.render(block.markdown);
+            return node;
+        }
+
+        // 流式接收大文档：服务器按分片推送渲染好的块，收到即追加显示
+        function streamContent(version) {
+            stopContentStream();
+            const descriptionElement = document.getElementById('description');
+            let first = true;
+            const source = new EventSource(`/api/stream?version=${version}`);
+            contentStream = source;
+
+            source.addEventListener('blocks', event => {
+                const data = JSON.parse(event.data);
+                if (first) {
+                    descriptionElement.innerHTML = '';
+                    first = false;
+                }
+                const fragment = document.createDocumentFragment();
+                data.blocks.forEach(block => fragment.appendChild(createBlockNode(block)));
+                descriptionElement.appendChild(fragment);
+            });
+            source.addEventListener('done', event => {
+                stopContentStream();
+                contentVersion = JSON.parse(event.data).version;
+            });
+            source.addEventListener('stale', () => {
+                // 接收过程中内容已变化，下一次轮询重新获取完整内容
+                stopContentStream();
+                contentVersion = null;
+            });
+            source.onerror = () => {
+                stopContentStream();
+                contentVersion = null;
+            };
+        }
+
+        function stopContentStream() {
+            if (contentStream) {
+                contentStream.close();
+                contentStream = null;
+            }
+        }
+
+        // 增量更新描述区域：每个Markdown块对应一个带ID的节点，只替换变化的块
+        function patchDescription(blocks) {
+            const descriptionElement = document.getElementById('description');
+            if (!descriptionElement.querySelector(':scope > .md-block')) {
+                descriptionElement.innerHTML = '';
+            }
+            return reconcileChildren(descriptionElement, blocks, node => node.dataset.blockId, block => {
+                if (block.html === undefined && block.markdown === undefined) return null;  // 本地缺少该块，需要重新拉取完整内容
+                return createBlockNode(block);
+            });
+        }
+
+        // 批量提问：所有问题显示在同一个表单中，一次提交全部回答
+        let questionState = { key: '', items: [] };
+
+        function createQuestionNode(question, index, total) {
+            const section = document.createElement('div');
+            section.className = 'question-item';
+
+            const title = document.createElement('div');
+            title.className = 'question-index';
+            title.textContent = `问题 ${index + 1} / ${total}`;
+            section.appendChild(title);
+
+            const description = document.createElement('div');
+            description.className = 'description markdown-content';
+            description.innerHTML = question.html !== undefined ? question.html : FeedbackMarkdown.render(question.markdown);
+            section.appendChild(description);
+
+            // 与单个问题相同：选项较多时显示筛选框，只渲染可见窗口内的行
+            const options = newOptionState(question.options, new Set(), `question-${index}-`);
+            const optionsContainer = document.createElement('div');
+            optionsContainer.className = 'options-container';
+            optionsContainer.hidden = question.options.length === 0;
+            fillOptions(options, optionsContainer);
+            section.appendChild(optionsContainer);
+
+            const textarea = document.createElement('textarea');
+            textarea.className = 'feedback-textarea';
+            textarea.placeholder = '请输入对该问题的回答...';
+            textarea.dataset.question = index;
+            section.appendChild(textarea);
+            return { section, options, optionsContainer, textarea };
+        }
+
+        // 问题列表不变时保留已填写的回答
+        function renderQuestions(questions) {
+            const container = document.getElementById('questions-container');
+            const batch = Boolean(questions && questions.length);
+            const key = batch ? questions.map(question => question.id).join(',') : '';
+            ['description', 'options-container', 'separator', 'feedback-text'].forEach(id => {
+                document.getElementById(id).hidden = batch;
+            });
+            container.style.display = batch ? 'block' : 'none';
+            if (key === questionState.key) return;
+
+            container.innerHTML = '';
+            questionState = { key, items: [] };
+            if (!batch) return;
+            const fragment = document.createDocumentFragment();
+            questions.forEach((question, index) => {
+                const item = createQuestionNode(question, index, questions.length);
+                questionState.items.push(item);
+                fragment.appendChild(item.section);
+            });
+            container.appendChild(fragment);
+        }
+
+        function getQuestionAnswers() {
+            return questionState.items.map(item => ({
+                selected_options: selectedOptionTexts(item.options),
+                feedback_text: item.textarea.value.trim()
+            }));
+        }
+
+        function clearQuestions() {
+            questionState.items.forEach(item => {
+                clearOptionSelection(item.options, item.optionsContainer);
+                item.textarea.value = '';
+            });
+        }
+
+        // 用户开始输入时通知服务器（每个内容版本只通知一次），MCP客户端据此显示进度
+        let typingReportedVersion = undefined;
+        function reportTyping() {
+            if (typingReportedVersion === contentVersion) return;
+            typingReportedVersion = contentVersion;
+            fetch('/api/activity', { method: 'POST' }).catch(() => {});
+        }
+
+        // 排队提示：回答完当前问题后会立即显示下一个
+        function updateQueueBadge(pending) {
+            const badge = document.getElementById('queue-badge');
+            badge.hidden = !pending;
+            badge.textContent = pending ? `还有 ${pending} 个请求排队等待回答` : '';
+        }
+
+        // 等待超时倒计时：到期后服务器自动使用默认回答并关闭当前问题
+        let countdownDeadline = null;
+        let countdownDefault = null;
+        let countdownTimer = null;
+        function updateCountdown(countdown) {
+            if (!countdown) {
+                countdownDeadline = null;
+                clearInterval(countdownTimer);
+                countdownTimer = null;
+                document.getElementById('countdown').hidden = true;
+                return;
+            }
+            countdownDeadline = Date.now() + countdown.remaining * 1000;
+            countdownDefault = countdown.default_answer;
+            if (!countdownTimer) countdownTimer = setInterval(renderCountdown, 1000);
+            renderCountdown();
+        }
+
+        function renderCountdown() {
+            const element = document.getElementById('countdown');
+            if (countdownDeadline === null) return;
+            const seconds = Math.max(0, Math.ceil((countdownDeadline - Date.now()) / 1000));
+            const minutes = Math.floor(seconds / 60);
+            const clock = `${minutes}:${String(seconds % 60).padStart(2, '0')}`;
+            const answer = countdownDefault ? `“${countdownDefault}”` : '默认回答';
+            element.hidden = false;
+            element.classList.toggle('urgent', seconds <= 30);
+            element.textContent = seconds > 0 ? `⏱ ${clock} 后未回答将自动回复${answer}` : `⏱ 已超时，已自动回复${answer}`;
         }
 
         // 显示无内容页面
         function showNoContentPage() {
+            clearAttachments();
             document.getElementById('content-container').style.display = 'none';
             document.getElementById('no-content-container').style.display = 'flex';
 
@@ -866,12 +1885,440 @@ class WebFeedbackUI:
             }
         }
 
+        // 历史回答：搜索以前的回答，点击后插入到最近使用的回答框
+        let lastTextarea = null;
+        // 本机页面才有令牌，用于访问历史回答等只限本机的接口
+        const PRIVATE_TOKEN = document.querySelector('meta[name="private-token"]').content;
+        const privateHeaders = { 'X-Feedback-Token': PRIVATE_TOKEN };
+        let historyTimer = null;
+        let historySeq = 0;
+        function toggleHistory() {
+            const panel = document.getElementById('history-panel');
+            panel.hidden = !panel.hidden;
+            if (!panel.hidden) {
+                document.getElementById('history-search').focus();
+                searchHistory();
+            }
+        }
+
+        function scheduleHistorySearch() {
+            clearTimeout(historyTimer);
+            historyTimer = setTimeout(searchHistory, 150);
+        }
+
+        async function searchHistory() {
+            const seq = ++historySeq;
+            const query = document.getElementById('history-search').value;
+            let data;
+            try {
+                const response = await fetch(`/api/history?q=${encodeURIComponent(query)}`, { headers: privateHeaders });
+                data = await response.json();
+            } catch (error) {
+                return;
+            }
+            if (seq !== historySeq) return;  // 输入已经变化，丢弃过时的结果
+            const container = document.getElementById('history-results');
+            container.replaceChildren();
+            if (!data.results.length) {
+                const empty = document.createElement('div');
+                empty.className = 'history-empty';
+                empty.textContent = query ? '没有找到匹配的回答' : '还没有历史回答';
+                container.appendChild(empty);
+                return;
+            }
+            for (const item of data.results) {
+                const node = document.createElement('div');
+                node.className = 'history-item';
+                node.title = item.prompt;
+                const prompt = document.createElement('div');
+                prompt.className = 'history-prompt';
+                prompt.textContent = item.prompt;
+                const answer = document.createElement('div');
+                answer.className = 'history-answer';
+                answer.textContent = item.answer;
+                node.append(prompt, answer);
+                node.addEventListener('click', () => insertHistoryAnswer(item.answer));
+                container.appendChild(node);
+            }
+        }
+
+        // 当前表单中最近获得焦点的回答框：批量提问时为某个问题的回答框，否则为单个问题的回答框
+        function answerTextarea() {
+            const candidates = questionState.items.length
+                ? questionState.items.map(item => item.textarea)
+                : [document.getElementById('feedback-text')];
+            return candidates.includes(lastTextarea) ? lastTextarea : candidates[0];
+        }
+
+        function insertHistoryAnswer(answer) {
+            const textarea = answerTextarea();
+            const start = textarea.selectionStart;
+            textarea.value = textarea.value.substring(0, start) + answer + textarea.value.substring(textarea.selectionEnd);
+            textarea.setSelectionRange(start + answer.length, start + answer.length);
+            textarea.focus();
+            reportTyping();
+        }
+
+        // 回答建议：以前的回答中以已输入内容开头的回答，列表显示在正在输入的回答框下方
+        const MAX_SUGGESTION_PREFIX = 200;
+        // 保留元素引用：列表会随回答框移动，批量问题重新渲染时可能被移出页面
+        const suggestionBox = document.getElementById('suggestions');
+        let suggestionSeq = 0;
+        let suggestionTarget = null;
+        let suggestionItems = [];
+        let activeSuggestion = -1;
+
+        function hideSuggestions() {
+            suggestionSeq++;
+            suggestionItems = [];
+            activeSuggestion = -1;
+            suggestionBox.hidden = true;
+        }
+
+        async function updateSuggestions(textarea, force) {
+            const prefix = textarea.value;
+            if (!PRIVATE_TOKEN || (!prefix.trim() && !force) || prefix.length > MAX_SUGGESTION_PREFIX) {
+                hideSuggestions();
+                return;
+            }
+            const seq = ++suggestionSeq;
+            const params = new URLSearchParams({ prefix });
+            if (textarea.dataset.question !== undefined) params.set('question', textarea.dataset.question);
+            let data;
+            try {
+                const response = await fetch(`/api/suggest?${params}`, { headers: privateHeaders });
+                data = await response.json();
+            } catch (error) {
+                return;
+            }
+            if (seq !== suggestionSeq || document.activeElement !== textarea) return;  // 输入已经变化
+            showSuggestions(textarea, data.suggestions || []);
+        }
+
+        function showSuggestions(textarea, items) {
+            if (!items.length) {
+                hideSuggestions();
+                return;
+            }
+            suggestionTarget = textarea;
+            suggestionItems = items;
+            activeSuggestion = -1;
+            suggestionBox.replaceChildren(...items.map((text, index) => {
+                const node = document.createElement('div');
+                node.className = 'suggestion-item';
+                node.textContent = text;
+                node.title = text;
+                // mousedown 先于回答框失去焦点触发
+                node.addEventListener('mousedown', event => {
+                    event.preventDefault();
+                    acceptSuggestion(index);
+                });
+                return node;
+            }));
+            textarea.after(suggestionBox);
+            suggestionBox.hidden = false;
+        }
+
+        function moveSuggestion(step) {
+            const count = suggestionItems.length;
+            activeSuggestion = (activeSuggestion + 1 + step + count + 1) % (count + 1) - 1;
+            suggestionBox.querySelectorAll('.suggestion-item').forEach((node, index) => {
+                node.classList.toggle('active', index === activeSuggestion);
+            });
+        }
+
+        function acceptSuggestion(index) {
+            const text = suggestionItems[index];
+            const textarea = suggestionTarget;
+            hideSuggestions();
+            if (text === undefined || !textarea) return;
+            textarea.value = text;
+            textarea.setSelectionRange(text.length, text.length);
+            textarea.focus();
+            reportTyping();
+        }
+
+        function handleSuggestionKey(event) {
+            if (event.target.tagName !== 'TEXTAREA') return false;
+            if (event.ctrlKey && event.key === ' ') {
+                updateSuggestions(event.target, true);
+                return true;
+            }
+            if (suggestionBox.hidden || event.target !== suggestionTarget) return false;
+            if (event.key === 'ArrowDown' || event.key === 'ArrowUp') {
+                moveSuggestion(event.key === 'ArrowDown' ? 1 : -1);
+            } else if (event.key === 'Tab' && !event.shiftKey) {
+                acceptSuggestion(Math.max(activeSuggestion, 0));
+            } else if (event.key === 'Enter' && !event.ctrlKey && activeSuggestion >= 0) {
+                acceptSuggestion(activeSuggestion);
+            } else if (event.key === 'Escape') {
+                hideSuggestions();
+            } else {
+                return false;
+            }
+            return true;
+        }
+
+        // 附件：超过阈值的粘贴内容上传为附件，回答框中不插入全文
+        let attachments = [];
+        let uploads = [];  // 正在上传的文件
+
+        function isLargePaste(text) {
+            const threshold = config && config.attachment_threshold;
+            return Boolean(PRIVATE_TOKEN) && Boolean(threshold) && text.length * 4 > threshold && new Blob([text]).size > threshold;
+        }
+
+        function formatSize(size) {
+            if (size < 1024) return `${size} B`;
+            if (size < 1024 * 1024) return `${(size / 1024).toFixed(1)} KB`;
+            return `${(size / 1024 / 1024).toFixed(1)} MB`;
+        }
+
+        async function attachText(text, name) {
+            showStatus('正在保存附件...', 'info');
+            try {
+                const response = await fetch(`/api/attachments?name=${encodeURIComponent(name)}`, {
+                    method: 'POST',
+                    headers: { ...privateHeaders, 'Content-Type': 'text/plain; charset=utf-8' },
+                    body: text
+                });
+                const data = await response.json();
+                if (!response.ok) {
+                    showStatus(data.message || '保存附件失败', 'error');
+                    return;
+                }
+                attachments.push(data.attachment);
+                renderAttachments();
+                showStatus('内容较大，已作为附件添加', 'success');
+            } catch (error) {
+                showStatus('保存附件失败，请重试', 'error');
+            }
+        }
+
+        // 图片：粘贴或拖入的图片先在浏览器中用 canvas 缩小到最大边长并重新编码（PNG 和 JPEG 中取较小的一种），
+        // 只上传缩小后的图片
+        function hasTransparency(context, width, height) {
+            const pixels = context.getImageData(0, 0, width, height).data;
+            for (let i = 3; i < pixels.length; i += 4) {
+                if (pixels[i] < 255) return true;
+            }
+            return false;
+        }
+
+        async function attachImage(file, name) {
+            const maxDimension = (config && config.image_max_dimension) || 1568;
+            const quality = ((config && config.image_quality) || 80) / 100;
+            let bitmap;
+            try {
+                bitmap = await createImageBitmap(file);
+            } catch (error) {
+                showStatus('无法读取图片', 'error');
+                return;
+            }
+            const scale = Math.min(1, maxDimension / Math.max(bitmap.width, bitmap.height));
+            const width = Math.max(1, Math.round(bitmap.width * scale));
+            const height = Math.max(1, Math.round(bitmap.height * scale));
+            const canvas = document.createElement('canvas');
+            canvas.width = width;
+            canvas.height = height;
+            const context = canvas.getContext('2d');
+            context.drawImage(bitmap, 0, 0, width, height);
+            bitmap.close();
+
+            const encode = (type, q) => new Promise(resolve => canvas.toBlob(resolve, type, q));
+            const candidates = [await encode('image/png')];
+            if (file.type === 'image/jpeg' || !hasTransparency(context, width, height)) {
+                candidates.push(await encode('image/jpeg', quality));  // JPEG 没有透明通道
+            }
+            const blob = candidates.filter(Boolean).reduce((best, candidate) => candidate.size < best.size ? candidate : best);
+            const extension = blob.type === 'image/jpeg' ? '.jpg' : '.png';
+            const params = new URLSearchParams({ name: name + extension, type: blob.type, width, height });
+            showStatus('正在保存图片...', 'info');
+            try {
+                const response = await fetch(`/api/attachments?${params}`, { method: 'POST', headers: privateHeaders, body: blob });
+                const data = await response.json();
+                if (!response.ok) {
+                    showStatus(data.message || '保存图片失败', 'error');
+                    return;
+                }
+                data.attachment.thumbnail = URL.createObjectURL(blob);
+                attachments.push(data.attachment);
+                renderAttachments();
+                showStatus(`图片已添加（${width}×${height}，${formatSize(blob.size)}）`, 'success');
+            } catch (error) {
+                showStatus('保存图片失败，请重试', 'error');
+            }
+        }
+
+        function imageFiles(dataTransfer) {
+            return Array.from(dataTransfer.files || []).filter(file => file.type.startsWith('image/'));
+        }
+
+        function renderAttachments() {
+            const container = document.getElementById('attachments');
+            container.replaceChildren(...attachments.map(attachment => {
+                const chip = document.createElement('button');
+                chip.type = 'button';
+                chip.className = 'attachment-chip';
+                if (attachment.thumbnail) {
+                    const thumbnail = document.createElement('img');
+                    thumbnail.src = attachment.thumbnail;
+                    thumbnail.alt = '';
+                    chip.append(thumbnail, `${attachment.name} · ${attachment.width}×${attachment.height} · ${formatSize(attachment.size)} ✕`);
+                } else {
+                    const lines = attachment.lines === undefined ? '' : ` · ${attachment.lines} 行`;
+                    chip.textContent = `📎 ${attachment.name} · ${formatSize(attachment.size)}${lines} ✕`;
+                }
+                chip.title = attachment.preview || (attachment.sha256 ? `SHA-256: ${attachment.sha256}` : '');
+                chip.addEventListener('click', () => removeAttachment(attachment.id));
+                return chip;
+            }), ...uploads.map(upload => {
+                const chip = document.createElement('button');
+                chip.type = 'button';
+                chip.className = 'attachment-chip';
+                const percent = upload.size ? Math.floor(upload.sent * 100 / upload.size) : 0;
+                chip.textContent = `⏫ ${upload.name} · ${percent}%${upload.retrying ? '（重新连接...）' : ''} ✕`;
+                chip.title = `${formatSize(upload.sent)} / ${formatSize(upload.size)}，点击取消上传`;
+                chip.addEventListener('click', () => cancelUpload(upload, true));
+                return chip;
+            }));
+            container.hidden = !attachments.length && !uploads.length;
+        }
+
+        async function removeAttachment(id) {
+            attachments.filter(attachment => attachment.id === id && attachment.thumbnail)
+                .forEach(attachment => URL.revokeObjectURL(attachment.thumbnail));
+            attachments = attachments.filter(attachment => attachment.id !== id);
+            renderAttachments();
+            try {
+                await fetch(`/api/attachments/${id}`, { method: 'DELETE', headers: privateHeaders });
+            } catch (error) {
+                // 附件文件由服务器定期清理
+            }
+        }
+
+        function clearAttachments() {
+            attachments.filter(attachment => attachment.thumbnail).forEach(attachment => URL.revokeObjectURL(attachment.thumbnail));
+            attachments = [];
+            uploads.forEach(upload => cancelUpload(upload, false));  // 保留已上传的部分，再次选择该文件时继续
+            renderAttachments();
+        }
+
+        // 上传文件：经过 SSH 隧道时连接可能中断，文件切成小块逐块上传，每块附带 SHA-256。
+        // 出错后等待一段时间，向服务器查询已收到的字节数，从断点继续；页面刷新后重新选择同一个文件也从断点继续
+        const UPLOAD_RETRY_DELAYS = [1000, 2000, 4000, 8000, 15000, 30000];
+
+        async function sha256Hex(blob) {
+            if (!window.crypto || !crypto.subtle) return null;  // 非安全上下文（用局域网 IP 打开页面）没有 crypto.subtle，不校验
+            const digest = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+            return Array.from(new Uint8Array(digest), byte => byte.toString(16).padStart(2, '0')).join('');
+        }
+
+        // 不超过该大小的文件在页面中计算整个文件的 SHA-256（需要把文件整个读入内存），服务器在上传完成时核对
+        const UPLOAD_FULL_HASH_MAX_BYTES = 64 * 1024 * 1024;
+
+        async function uploadRequest(upload, url, options = {}) {
+            const headers = { ...privateHeaders, ...(options.headers || {}) };
+            const response = await fetch(url, { ...options, headers, signal: upload.controller.signal });
+            const data = await response.json().catch(() => ({}));
+            return { response, data };
+        }
+
+        function isNetworkError(error) {
+            return error instanceof TypeError;  // fetch 在连接失败时抛出 TypeError
+        }
+
+        async function uploadFile(file) {
+            const maxBytes = config && config.upload_max_bytes;
+            if (maxBytes && file.size > maxBytes) {
+                showStatus(`${file.name} 超过上传大小上限 ${formatSize(maxBytes)}`, 'error');
+                return;
+            }
+            const upload = { name: file.name, size: file.size, sent: 0, retrying: false, controller: new AbortController() };
+            uploads.push(upload);
+            renderAttachments();
+            try {
+                // 文件开头的校验和是上传编号的一部分：文件名、大小和修改时间相同的不同文件不会续传到一起
+                const headSha256 = await sha256Hex(file.slice(0, config.upload_head_bytes));
+                if (!headSha256) throw new Error('浏览器不支持计算校验和，请通过 localhost 打开页面');
+                const fullSha256 = file.size <= UPLOAD_FULL_HASH_MAX_BYTES ? await sha256Hex(file) : null;
+                let { response, data } = await uploadRequest(upload, '/api/uploads', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({
+                        name: file.name, size: file.size, type: file.type, last_modified: String(file.lastModified),
+                        head_sha256: headSha256, sha256: fullSha256
+                    })
+                });
+                if (!response.ok) throw new Error(data.message || '无法开始上传');
+                upload.id = data.upload_id;
+                upload.sent = data.offset;
+                const chunkSize = data.chunk_size;
+                let retries = 0;
+                while (!data.attachment) {
+                    renderAttachments();
+                    try {
+                        const chunk = file.slice(upload.sent, upload.sent + chunkSize);
+                        const headers = { 'Content-Type': 'application/octet-stream' };
+                        const digest = await sha256Hex(chunk);
+                        if (digest) headers['X-Chunk-SHA256'] = digest;
+                        ({ response, data } = await uploadRequest(upload, `/api/uploads/${upload.id}?offset=${upload.sent}`,
+                            { method: 'PUT', headers, body: chunk }));
+                        if (response.ok) {
+                            upload.sent = data.offset;
+                            retries = 0;
+                            continue;
+                        }
+                        // 409：服务器收到的字节数与页面不一致；422：这一块在传输中损坏；5xx：服务器暂时无法写入
+                        if (response.status !== 409 && response.status !== 422 && response.status < 500) {
+                            throw new Error(data.message || '上传失败');
+                        }
+                    } catch (error) {
+                        if (!isNetworkError(error)) throw error;
+                    }
+                    if (retries >= UPLOAD_RETRY_DELAYS.length) throw new Error('连接多次中断');
+                    upload.retrying = true;
+                    renderAttachments();
+                    await new Promise(resolve => setTimeout(resolve, UPLOAD_RETRY_DELAYS[retries++]));
+                    upload.retrying = false;
+                    try {
+                        ({ response, data } = await uploadRequest(upload, `/api/uploads/${upload.id}`));
+                        if (response.status === 404) throw new Error('上传已失效，请重新选择文件');
+                        if (response.ok) upload.sent = data.offset;
+                    } catch (error) {
+                        if (!isNetworkError(error)) throw error;
+                        data = {};
+                    }
+                }
+                if (!attachments.some(attachment => attachment.id === data.attachment.id)) {
+                    attachments.push(data.attachment);
+                }
+                showStatus(`${file.name} 已上传（${formatSize(file.size)}）`, 'success');
+            } catch (error) {
+                if (!upload.controller.signal.aborted) showStatus(`上传 ${file.name} 失败：${error.message}`, 'error');
+            } finally {
+                uploads = uploads.filter(item => item !== upload);
+                renderAttachments();
+            }
+        }
+
+        function cancelUpload(upload, discard) {
+            upload.controller.abort();
+            uploads = uploads.filter(item => item !== upload);
+            renderAttachments();
+            if (discard && upload.id) {
+                fetch(`/api/uploads/${upload.id}`, { method: 'DELETE', headers: privateHeaders }).catch(() => {});
+            }
+        }
+
         // 插入代码功能 - 与GUI版本逻辑完全一致
         async function insertCodeFromClipboard() {
             try {
                 const text = await navigator.clipboard.readText();
-                if (text) {
-                    const textarea = document.getElementById('feedback-text');
+                if (text && isLargePaste(text)) {
+                    await attachText(text, 'clipboard.txt');
+                } else if (text) {
+                    const textarea = answerTextarea();
                     const cursorPos = textarea.selectionStart;
                     const currentText = textarea.value;
                     const textBefore = currentText.substring(0, cursorPos);
@@ -905,22 +2352,27 @@ class WebFeedbackUI:
 
         // 提交反馈
         async function submitFeedback() {
-            const feedbackText = document.getElementById('feedback-text').value.trim();
-            const selectedOptions = [];
+            if (uploads.length) {
+                showStatus('文件仍在上传，请等上传完成后再发送', 'error');
+                return;
+            }
+            if (questionState.items.length) {
+                const answers = getQuestionAnswers();
+                if (answers.every(answer => !answer.feedback_text && answer.selected_options.length === 0) && !attachments.length) {
+                    showStatus('请至少回答一个问题', 'error');
+                    return;
+                }
+                await postFeedback({ answers, attachments: attachments.map(attachment => attachment.id) });
+                return;
+            }
 
+            const feedbackText = document.getElementById('feedback-text').value.trim();
             // 获取选中的预定义选项
-            if (config && config.predefined_options) {
-                config.predefined_options.forEach((option, index) => {
-                    const checkbox = document.getElementById(`option-${index}`);
-                    if (checkbox && checkbox.checked) {
-                        selectedOptions.push(option);
-                    }
-                });
-            }
+            const selectedOptions = getSelectedOptions();
 
-            if (!feedbackText && selectedOptions.length === 0) {
-                // 如果是持续模式且没有任何输入，关闭持续模式
-                if (config && config.persistent) {
+            if (!feedbackText && selectedOptions.length === 0 && attachments.length === 0) {
+                // 如果是持续模式且没有任何输入，关闭持续模式（常驻会话中问题仍在等待回答，不关闭）
+                if (config && config.persistent && !config.session) {
                     showStatus('没有输入内容，持续模式结束...', 'info');
                     setTimeout(() => {
                         window.close();
@@ -932,6 +2384,14 @@ class WebFeedbackUI:
                 }
             }
 
+            await postFeedback({
+                feedback_text: feedbackText,
+                selected_options: selectedOptions,
+                attachments: attachments.map(attachment => attachment.id)
+            });
+        }
+
+        async function postFeedback(body) {
             try {
                 const submitBtn = document.getElementById('submit-btn');
                 submitBtn.disabled = true;
@@ -942,10 +2402,7 @@ class WebFeedbackUI:
                     headers: {
                         'Content-Type': 'application/json',
                     },
-                    body: JSON.stringify({
-                        feedback_text: feedbackText,
-                        selected_options: selectedOptions
-                    })
+                    body: JSON.stringify(body)
                 });
 
                 const result = await response.json();
@@ -954,8 +2411,10 @@ class WebFeedbackUI:
                     showStatus(result.message, 'success');
                     // 清空表单
                     document.getElementById('feedback-text').value = '';
+                    clearAttachments();
                     // 取消选中所有复选框
-                    document.querySelectorAll('input[type="checkbox"]').forEach(cb => cb.checked = false);
+                    clearSelectedOptions();
+                    clearQuestions();
 
                     // 检查是否为持续模式
                     if (result.persistent) {
@@ -1013,36 +2472,42 @@ class WebFeedbackUI:
             }
         }
 
-        // 内容轮询检查
+        // 内容轮询检查：携带当前版本号，服务器只返回变化的部分
         let pollingInterval = null;
         function startContentPolling() {
             if (pollingInterval) return; // 避免重复启动
 
             pollingInterval = setInterval(async () => {
+                if (contentStream) return;  // 流式内容接收完成前不轮询
                 try {
-                    const response = await fetch('/api/config');
+                    const query = contentVersion === null ? '' : `?version=${contentVersion}`;
+                    const response = await fetch(`/api/config${query}`);
                     const newConfig = await response.json();
+                    updateQueueBadge(newConfig.pending);
+                    updateCountdown(newConfig.countdown);
+                    if (newConfig.unchanged) return;
+
+                    const hadContent = config && config.has_content;
+                    config = Object.assign({}, config, newConfig);
 
                     // 检查是否有新内容
-                    if (newConfig.has_content && (!config || !config.has_content)) {
+                    if (newConfig.has_content && !hadContent) {
                         // 从无内容状态变为有内容状态
-                        config = newConfig;
                         showContentPage();
-                        updatePageContent();
+                        updatePageContent(newConfig);
                         showStatus('收到新的反馈请求！', 'success');
-                    } else if (!newConfig.has_content && config && config.has_content) {
+                    } else if (!newConfig.has_content && hadContent) {
                         // 从有内容状态变为无内容状态
-                        config = newConfig;
+                        stopContentStream();
+                        contentVersion = newConfig.version;
                         showNoContentPage();
                         disableSubmitButton();
-                    } else if (newConfig.has_content && config && config.has_content) {
+                    } else if (newConfig.has_content) {
                         // 内容更新
-                        if (newConfig.prompt !== config.prompt ||
-                            JSON.stringify(newConfig.predefined_options) !== JSON.stringify(config.predefined_options)) {
-                            config = newConfig;
-                            updatePageContent();
-                            showStatus('内容已更新！', 'success');
-                        }
+                        updatePageContent(newConfig);
+                        showStatus('内容已更新！', 'success');
+                    } else {
+                        contentVersion = newConfig.version;
                     }
                 } catch (error) {
                     console.error('轮询错误:', error);
@@ -1057,42 +2522,32 @@ class WebFeedbackUI:
             }
         }
 
-        // 更新页面内容
-        function updatePageContent() {
-            if (!config) return;
+        // 更新页面内容：只修补变化的Markdown块和选项
+        function updatePageContent(data) {
+            if (!data) return;
+            renderQuestions(data.questions);
 
-            // 更新提示内容
-            const descriptionElement = document.getElementById('description');
-            if (descriptionElement) {
-                if (config.prompt_html) {
-                    descriptionElement.innerHTML = config.prompt_html;
-                } else {
-                    descriptionElement.textContent = config.prompt;
-                }
+            if (data.stream) {
+                // 大文档：选项立即显示，内容分片流式接收
+                if (data.options) renderOptions(data.options, true);
+                contentVersion = null;
+                streamContent(data.version);
+                return;
             }
-
-            // 更新预定义选项
-            const optionsContainer = document.getElementById('options-container');
-            if (optionsContainer) {
-                optionsContainer.innerHTML = '';
-
-                if (config.predefined_options && config.predefined_options.length > 0) {
-                    config.predefined_options.forEach((option, index) => {
-                        const optionDiv = document.createElement('div');
-                        optionDiv.className = 'option-item';
-                        optionDiv.innerHTML = `
-                            <input type="checkbox" id="option-${index}" value="${option}">
-                            <label for="option-${index}">${option}</label>
-                        `;
-                        optionsContainer.appendChild(optionDiv);
-                    });
-                    optionsContainer.style.display = 'block';
-                    document.getElementById('separator').style.display = 'block';
+            stopContentStream();
+            if (data.blocks && !patchDescription(data.blocks)) {
+                // 增量数据引用了本地没有的块，下一次轮询拉取完整内容
+                contentVersion = null;
+                return;
+            }
+            if (data.options) {
+                if (data.delta) {
+                    patchOptions(data.options);
                 } else {
-                    optionsContainer.style.display = 'none';
-                    document.getElementById('separator').style.display = 'none';
+                    renderOptions(data.options);
                 }
             }
+            contentVersion = data.version;
         }
 
         // 事件监听器
@@ -1108,12 +2563,66 @@ class WebFeedbackUI:
 
             // 按钮事件
             document.getElementById('insert-code-btn').addEventListener('click', insertCodeFromClipboard);
+            const uploadInput = document.getElementById('upload-input');
+            document.getElementById('upload-btn').addEventListener('click', () => uploadInput.click());
+            uploadInput.addEventListener('change', () => {
+                Array.from(uploadInput.files).forEach(uploadFile);
+                uploadInput.value = '';
+            });
+            // 单个问题的回答框和批量提问中每个问题的回答框都可以粘贴或拖入附件
+            // 远程访问的页面没有令牌，不能添加附件，粘贴内容照常插入回答框
+            document.addEventListener('paste', event => {
+                if (event.target.tagName !== 'TEXTAREA' || !PRIVATE_TOKEN) return;
+                const images = imageFiles(event.clipboardData);
+                const text = event.clipboardData.getData('text/plain');
+                if (images.length && !text) {
+                    event.preventDefault();
+                    images.forEach(file => attachImage(file, 'screenshot'));
+                } else if (text && isLargePaste(text)) {
+                    event.preventDefault();
+                    attachText(text, 'paste.txt');
+                }
+            });
+            document.addEventListener('dragover', event => {
+                if (event.target.tagName === 'TEXTAREA' && PRIVATE_TOKEN && Array.from(event.dataTransfer.types).includes('Files')) event.preventDefault();
+            });
+            document.addEventListener('drop', event => {
+                if (event.target.tagName !== 'TEXTAREA' || !PRIVATE_TOKEN) return;
+                const files = Array.from(event.dataTransfer.files || []);
+                if (files.length) {
+                    event.preventDefault();
+                    files.forEach(file => file.type.startsWith('image/')
+                        ? attachImage(file, file.name.replace(/[.][^.]*$/, '') || 'image')
+                        : uploadFile(file));  // 其他文件原样分块上传
+                }
+            });
+            // 远程访问的页面没有令牌，不显示历史回答，也不能上传文件
+            if (!PRIVATE_TOKEN) {
+                document.getElementById('history-btn').style.display = 'none';
+                document.getElementById('upload-btn').style.display = 'none';
+            }
+            document.getElementById('history-btn').addEventListener('click', toggleHistory);
+            document.getElementById('history-search').addEventListener('input', scheduleHistorySearch);
+            document.addEventListener('focusin', event => {
+                if (event.target.tagName === 'TEXTAREA') lastTextarea = event.target;
+            });
             document.getElementById('submit-btn').addEventListener('click', submitFeedback);
             document.getElementById('close-btn').addEventListener('click', closeInterface);
+            document.addEventListener('input', event => {
+                if (event.target.tagName === 'TEXTAREA') {
+                    reportTyping();
+                    updateSuggestions(event.target, false);
+                }
+            });
+            document.addEventListener('focusout', event => {
+                if (event.target === suggestionTarget) hideSuggestions();
+            });
 
             // 键盘快捷键
             document.addEventListener('keydown', (event) => {
-                if (event.ctrlKey && event.key === 'Enter') {
+                if (handleSuggestionKey(event)) {
+                    event.preventDefault();
+                } else if (event.ctrlKey && event.key === 'Enter') {
                     event.preventDefault();
                     submitFeedback();
                 } else if (event.altKey && event.key === 'c') {
@@ -1133,14 +2642,64 @@ class WebFeedbackUI:
     def update_content(self, new_prompt: str, new_options: Optional[List[str]] = None):
         """更新页面内容（仅在持续模式下可用）"""
         if self.persistent:
-            self.current_prompt = new_prompt
-            self.current_options = new_options if new_options is not None else []
-            self.has_content = bool(new_prompt)
+            self.set_content(new_prompt, new_options)
             if new_prompt:
                 print(f"📝 内容已更新: {new_prompt[:50]}...")
             else:
                 print("📝 内容已清空，显示无有效内容页面")
 
+    def start_background(self):
+        """在后台线程中启动Web服务器（常驻会话使用，不向stdout输出任何内容）"""
+        import logging
+        from werkzeug.serving import make_server
+
+        # MCP服务器通过stdio通信，轮询请求的访问日志也不应输出
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        self._server = make_server(self.host, self.port, self.app, threaded=True)
+        threading.Thread(target=self._server.serve_forever, name="feedback-web-session", daemon=True).start()
+        preload_suggestion_index()
+
+    def _wake_waiters(self):
+        with self._submitted:
+            self._submitted.notify_all()
+
+    def ask(self, prompt: str, predefined_options: Optional[List[str]] = None,
+            questions: Optional[List[dict]] = None, cancellation: Optional[Cancellation] = None,
+            status: Optional[RequestStatus] = None, start_deadline: Optional[Callable[[], float]] = None,
+            default_answer: Optional[str] = None) -> dict:
+        """把问题（或一组批量问题）推送到已打开的页面，阻塞直到用户提交，返回反馈结果
+
+        start_deadline 在轮到这个问题显示时调用，开始等待计时并返回截止时间。
+        请求被取消（包括等待超时）时撤下问题，页面回到等待状态，并抛出 FeedbackCancelled。
+        """
+        cancelled = lambda: cancellation is not None and cancellation.cancelled
+        with self._ask_lock:
+            remove_callback = cancellation.add_callback(self._wake_waiters) if cancellation is not None else None
+            try:
+                with self._submitted:
+                    submissions = self._submission_count
+                    if cancelled():
+                        raise FeedbackCancelled("Feedback request was cancelled by the client")
+                    if status is not None:
+                        status.set('launched')
+                    self._request_status = status
+                    self._reported_state = None
+                    self.deadline = start_deadline() if start_deadline is not None else None
+                    self.default_answer = default_answer
+                    self.attachments = {}
+                    self.set_content(prompt, predefined_options, questions)
+                    self._submitted.wait_for(lambda: self._submission_count > submissions or cancelled())
+                    if self._submission_count > submissions:
+                        return self.feedback_result
+                    self.set_content("", [])
+                    raise FeedbackCancelled("Feedback request was cancelled by the client")
+            finally:
+                self._request_status = None
+                self.deadline = None
+                self.default_answer = None
+                if remove_callback is not None:
+                    remove_callback()
+
     def run(self) -> Dict[str, str]:
         """启动Web服务器并等待用户反馈"""
         mode_text = "持续模式" if self.persistent else "单次模式"
@@ -1155,18 +2714,32 @@ class WebFeedbackUI:
             print("⏳ 单次模式：等待用户反馈后自动关闭")
         print()
 
+        preload_suggestion_index()
         try:
             self.app.run(host=self.host, port=self.port, debug=False, use_reloader=False)
         except KeyboardInterrupt:
             pass
 
-        return self.feedback_result or {'cursor_usage_opt': ''}
+        if self.feedback_result:
+            return self.feedback_result
+        if self.current_questions:
+            return {'answers': [{'question': q['question'], 'selected_options': [], 'feedback': ''} for q in self.current_questions]}
+        return {'cursor_usage_opt': ''}
 
 def web_feedback_ui(prompt: str, predefined_options: Optional[List[str]] = None,
                    output_file: Optional[str] = None, host: str = "0.0.0.0",
-                   port: int = 8080) -> Optional[Dict[str, str]]:
+                   port: int = 8080, profiler: Optional[ProfileSession] = None,
+                   questions: Optional[List[dict]] = None, pending: int = 0,
+                   status_file: Optional[str] = None, deadline: Optional[float] = None,
+                   default_answer: Optional[str] = None) -> Optional[dict]:
     """启动Web版反馈界面"""
-    ui = WebFeedbackUI(prompt, predefined_options, host, port)
+    ui = WebFeedbackUI(prompt, predefined_options, host, port, questions=questions)
+    ui.pending = pending
+    ui.status_file = status_file
+    ui.deadline = deadline
+    ui.default_answer = default_answer
+    if profiler is not None and profiler.cprofile_enabled:
+        ui.enable_request_profiling(profiler)
     result = ui.run()
 
     if output_file and result:
@@ -1188,12 +2761,30 @@ if __name__ == "__main__":
     parser.add_argument("--output-file", help="将反馈结果保存为JSON文件的路径")
     parser.add_argument("--host", default="0.0.0.0", help="Web服务器监听地址")
     parser.add_argument("--port", type=int, default=8080, help="Web服务器监听端口")
+    parser.add_argument("--questions-file", help="批量提问：包含问题列表的JSON文件路径，指定后忽略 --prompt")
+    parser.add_argument("--pending", type=int, default=0, help="排在当前请求之后的请求数量")
+    parser.add_argument("--parent-pid", type=int, help="启动本进程的MCP服务器PID，该进程退出时本进程随之退出")
+    parser.add_argument("--status-file", help="写入界面进度（页面已打开、用户正在输入）的文件路径")
+    parser.add_argument("--deadline", type=float, help="等待上限（Unix时间戳），用于显示倒计时")
+    parser.add_argument("--default-answer", help="超时后使用的默认回答，显示在倒计时中")
     args = parser.parse_args()
 
-    predefined_options = [opt for opt in args.predefined_options.split("|||") if opt] if args.predefined_options else None
+    if args.parent_pid:
+        from lifecycle import bind_to_parent, register_session
+        bind_to_parent(args.parent_pid)
+        register_session("web", args.parent_pid, args.port)
 
-    result = web_feedback_ui(args.prompt, predefined_options, args.output_file, args.host, args.port)
+    predefined_options = [opt for opt in args.predefined_options.split("|||") if opt] if args.predefined_options else None
+    questions = None
+    if args.questions_file:
+        with open(args.questions_file, 'r', encoding='utf-8') as f:
+            questions = json.load(f)
+
+    with ProfileSession("web_ui") as profiler:
+        result = web_feedback_ui("" if questions else args.prompt, predefined_options, args.output_file,
+                                 args.host, args.port, profiler, questions, args.pending, args.status_file,
+                                 args.deadline, args.default_answer)
     if result:
-        print(f"\n收到反馈:\n{result['cursor_usage_opt']}")
+        print(f"\n收到反馈:\n{json.dumps(result, ensure_ascii=False, indent=2) if 'answers' in result else result['cursor_usage_opt']}")
     import sys
     sys.exit(0)